@@ -0,0 +1,11 @@
+"""
+Benchmarks for the orchestration layer
+
+Times the parts of the package that run around the ffmpeg and OCR work:
+subprocess scheduling, probing, crop detection, subtitle parsing, and the
+like, using small synthetic inputs generated with ffmpeg lavfi sources.
+Run with :code:`python -m video_utils.benchmarks`; results are JSON so that
+runs can be saved and compared against a baseline; see
+:mod:`video_utils.benchmarks.suite`.
+
+"""
@@ -0,0 +1,529 @@
+"""
+Load tests of job scheduling using stand-in tools
+
+Runs hundreds of simulated jobs through the PopenPool, the Plex DVR
+watchdog, or the MakeMKV watchdog with every external tool replaced by a
+shim (see :mod:`video_utils.benchmarks.shims`), and reports throughput and
+queue latency as JSON.
+
+Each test runs in a child interpreter with the shims first on the PATH and
+HOME set to a scratch directory. This way tools located when modules are
+imported resolve to the shims, and the caches, queue files, logs, and Plex
+token of the user are never touched.
+
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from subprocess import run
+
+from .shims import ShimTools, read_calls
+
+# Environment variable holding shim directory in the child interpreter
+SHIMS_ENV = 'VIDEO_UTILS_SHIMS'
+# File in the work directory the child interpreter writes results to
+RESULT_FILE = 'result.json'
+# Seconds between checks for finished files in watchdog tests
+POLL = 0.01
+# Date used in simulated Plex DVR recording names; Plex puts the air date
+# in names of shows without season/episode information, so no metadata is
+# downloaded
+AIR_DATE = '2024-01-01 20 00 00'
+
+
+def load_test(
+    kind: str = 'pool',
+    njobs: int = 200,
+    latency: float | list[float] = 0.05,
+    threads: int = 4,
+    settle: float = 0.01,
+    timeout: float = 600.0,
+    workdir: str | None = None,
+) -> dict:
+    """
+    Run load test in a sandboxed child interpreter
+
+    Arguments:
+        None
+
+    Keyword arguments:
+        kind (str) : Test to run; one of 'pool', 'plex_dvr', 'makemkv'
+        njobs (int) : Number of jobs or files to simulate
+        latency (float, list) : Seconds each tool call takes; may be a
+            [min, max] pair for random latencies
+        threads (int) : Number of threads of the PopenPool
+        settle (float) : Seconds the watchdogs wait for file size to stop
+            changing; real watchdogs wait much longer
+        timeout (float) : Seconds to wait for all jobs to finish
+        workdir (str) : Directory for shims and scratch files. Default is
+            a temporary directory that is removed when done
+
+    Returns:
+        dict : Test settings and results; see :func:`summarize`
+
+    """
+
+    tmpdir = None
+    if workdir is None:
+        workdir = tmpdir = tempfile.mkdtemp(prefix='video_utils_load_')
+
+    try:
+        shims = ShimTools(os.path.join(workdir, 'bin'), latency=latency)
+        home = os.path.join(workdir, 'home')
+        os.makedirs(home, exist_ok=True)
+
+        env = os.environ.copy()
+        env['PATH'] = os.pathsep.join([shims.dirname, env.get('PATH', '')])
+        env['HOME'] = home
+        env[SHIMS_ENV] = shims.dirname
+
+        cmd = [
+            sys.executable, '-m', f"{__package__}.loadtest",
+            '--child', kind,
+            '--njobs', str(njobs),
+            '--threads', str(threads),
+            '--settle', str(settle),
+            '--timeout', str(timeout),
+            '--workdir', workdir,
+        ]
+        # Output of the tools and the package goes to stderr so that only
+        # results are written to stdout
+        proc = run(cmd, env=env, stdout=sys.stderr, check=False)
+        try:
+            with open(
+                os.path.join(workdir, RESULT_FILE),
+                mode='r',
+                encoding='utf8',
+            ) as iid:
+                result = json.load(iid)
+        except (OSError, ValueError):
+            result = {'error': f"test failed with code {proc.returncode}"}
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return {
+        'kind': kind,
+        'njobs': njobs,
+        'latency': latency,
+        'threads': threads,
+        **result,
+    }
+
+
+def summarize(
+    submitted: dict,
+    started: dict,
+    finished: dict,
+) -> dict:
+    """
+    Compute throughput and latency statistics of jobs
+
+    Arguments:
+        submitted (dict) : Time each job was submitted, keyed by job
+        started (dict) : Time first tool of each job started
+        finished (dict) : Time each job finished
+
+    Returns:
+        dict : Number of jobs completed, elapsed time, throughput (jobs per
+            second), and percentiles of queue latency (submit to start) and
+            turnaround (submit to finish) in seconds
+
+    """
+
+    done = [key for key in submitted if key in finished]
+    if not done:
+        return {'completed': 0}
+
+    t_start = min(submitted.values())
+    elapsed = max(finished[key] for key in done) - t_start
+    queue = [
+        started[key] - submitted[key]
+        for key in done
+        if key in started
+    ]
+    turnaround = [finished[key] - submitted[key] for key in done]
+    return {
+        'completed': len(done),
+        'elapsed': round(elapsed, 4),
+        'throughput': round(len(done) / elapsed, 3) if elapsed > 0 else None,
+        'queue_latency': _percentiles(queue),
+        'turnaround': _percentiles(turnaround),
+    }
+
+
+def pool_load(njobs: int, threads: int, shims_dir: str) -> dict:
+    """
+    Push no-op ffmpeg jobs through a PopenPool
+
+    Queue latency is from the call to popen_async() to the start of the
+    tool, so it includes the time to start the shim; this startup time,
+    measured outside of the pool, is reported as spawn_latency.
+
+    Arguments:
+        njobs (int) : Number of jobs to run
+        threads (int) : Number of threads of the pool
+        shims_dir (str) : Directory of the shims
+
+    Returns:
+        dict : Results; see :func:`summarize`
+
+    """
+
+    from ..utils.subproc_pool import PopenPool
+
+    spawn = []
+    for i in range(5):
+        t_ref = time.time()
+        run(['ffmpeg', '-i', f"spawn{i}", '-f', 'null', '-'], check=False)
+        spawn.append(t_ref)
+    spawn = [
+        call['start'] - spawn[int(call['args'][1][5:])]
+        for call in read_calls(shims_dir)
+        if call['args'][1].startswith('spawn')
+    ]
+
+    pool = PopenPool(threads=threads)
+    submitted = {}
+    procs = []
+    for i in range(njobs):
+        key = f"job{i}"
+        submitted[key] = time.time()
+        procs.append(
+            pool.popen_async(
+                ['ffmpeg', '-i', key, '-f', 'null', '-'],
+                threads=1,
+            )
+        )
+    for proc in procs:
+        proc.wait()
+    pool.close()
+
+    started, finished = {}, {}
+    for call in read_calls(shims_dir):
+        key = call['args'][1]
+        if key in submitted:
+            started[key] = call['start']
+            finished[key] = call['end']
+
+    return {
+        **summarize(submitted, started, finished),
+        'spawn_latency': _percentiles(spawn),
+    }
+
+
+def makemkv_load(
+    njobs: int,
+    threads: int,
+    settle: float,
+    timeout: float,
+    workdir: str,
+    shims_dir: str,
+) -> dict:
+    """
+    Drop simulated MakeMKV output files into a watched directory
+
+    Arguments:
+        njobs (int) : Number of files
+        threads (int) : Number of threads of the pool
+        settle (float) : Seconds to wait for file size to stop changing
+        timeout (float) : Seconds to wait for all files to be converted
+        workdir (str) : Directory for input and output files
+        shims_dir (str) : Directory of the shims
+
+    Returns:
+        dict : Results; see :func:`summarize`
+
+    """
+
+    from .. import POPENPOOL
+    from ..watchdogs import base
+    from ..watchdogs.makemkv import MakeMKV_Watchdog
+
+    base.SLEEP = settle
+    POPENPOOL.threads = threads
+
+    indir = os.path.join(workdir, 'makemkv')
+    outdir = os.path.join(workdir, 'library')
+    os.makedirs(indir, exist_ok=True)
+    os.makedirs(outdir, exist_ok=True)
+
+    watchdog = MakeMKV_Watchdog(indir, outdir=outdir, threads=1)
+
+    submitted = {}
+    for i in range(njobs):
+        fpath = os.path.join(indir, f"Title {i:04d}.mkv")
+        _write_input(fpath)
+        submitted[fpath] = time.time()
+
+    finished = _wait_outputs(
+        submitted,
+        lambda fpath: os.path.splitext(os.path.basename(fpath))[0] + '.',
+        outdir,
+        timeout,
+    )
+    _stop(watchdog)
+    return summarize(
+        submitted,
+        _first_calls(shims_dir, submitted),
+        finished,
+    )
+
+
+def plex_dvr_load(
+    njobs: int,
+    threads: int,
+    settle: float,
+    timeout: float,
+    workdir: str,
+    shims_dir: str,
+) -> dict:
+    """
+    Simulate Plex DVR recordings finishing in a watched library
+
+    Each recording is written to a .grab directory and then moved into the
+    library, as Plex does when a recording finishes.
+
+    Arguments:
+        njobs (int) : Number of recordings
+        threads (int) : Number of threads of the pool
+        settle (float) : Seconds to wait for file size to stop changing
+        timeout (float) : Seconds to wait for all files to be converted
+        workdir (str) : Directory for the simulated library
+        shims_dir (str) : Directory of the shims
+
+    Returns:
+        dict : Results; see :func:`summarize`
+
+    """
+
+    from .. import POPENPOOL
+    from ..watchdogs import plex_dvr
+    from ..watchdogs.plex_dvr import PlexDVRWatchdog
+
+    plex_dvr.SLEEP = settle
+    POPENPOOL.threads = threads
+
+    library = os.path.join(workdir, 'TV Shows')
+    show_dir = os.path.join(library, 'Evening News', 'Season 2024')
+    os.makedirs(show_dir, exist_ok=True)
+    # Directories are made before the watchdog starts; files in a directory
+    # created after may be written before the directory is being watched
+    grabs = [os.path.join(library, '.grab', f"{i:08x}") for i in range(njobs)]
+    for grab in grabs:
+        os.makedirs(grab, exist_ok=True)
+
+    watchdog = PlexDVRWatchdog(
+        library,
+        logdir=os.path.join(workdir, 'logs'),
+        threads=1,
+        comdetect=True,
+        no_srt=True,
+    )
+
+    submitted = {}
+    for i, grab in enumerate(grabs):
+        fname = f"Evening News - {AIR_DATE} - Part {i:04d}.ts"
+        _write_input(os.path.join(grab, fname))
+        fpath = os.path.join(show_dir, fname)
+        os.rename(os.path.join(grab, fname), fpath)
+        submitted[fpath] = time.time()
+
+    finished = _wait_outputs(
+        submitted,
+        lambda fpath: os.path.splitext(os.path.basename(fpath))[0] + '.',
+        show_dir,
+        timeout,
+        ext='.mp4',
+    )
+    _stop(watchdog)
+    return summarize(
+        submitted,
+        _first_calls(shims_dir, submitted),
+        finished,
+    )
+
+
+def _write_input(fpath: str) -> None:
+    """
+    Create input file for a simulated job
+
+    The path is written into the file so that no two inputs have the same
+    content; otherwise results cached by content (e.g., comskip) would be
+    reused between jobs.
+
+    """
+
+    data = fpath.encode()
+    with open(fpath, mode='wb') as oid:
+        oid.write(data + bytes(max(4096 - len(data), 0)))
+
+
+def _wait_outputs(
+    submitted: dict,
+    prefix,
+    outdir: str,
+    timeout: float,
+    ext: str = '.mp4',
+) -> dict:
+    """Wait for output file of each input to appear; get time seen"""
+
+    prefixes = {prefix(fpath): fpath for fpath in submitted}
+    finished = {}
+    t_end = time.time() + timeout
+    while len(finished) < len(submitted) and time.time() < t_end:
+        for _, _, fnames in os.walk(outdir):
+            for fname in fnames:
+                if not fname.endswith(ext):
+                    continue
+                for pre, fpath in prefixes.items():
+                    if fname.startswith(pre) and fpath not in finished:
+                        finished[fpath] = time.time()
+        time.sleep(POLL)
+    return finished
+
+
+def _first_calls(shims_dir: str, submitted: dict) -> dict:
+    """Start time of first tool called for each input file"""
+
+    started = {}
+    for call in sorted(read_calls(shims_dir), key=lambda c: c['start']):
+        for arg in call['args']:
+            if arg in submitted and arg not in started:
+                started[arg] = call['start']
+    return started
+
+
+def _stop(watchdog) -> None:
+    """Stop watchdog threads as if the process was sent SIGTERM"""
+
+    from ..utils import _sigtermEvent
+
+    _sigtermEvent.set()
+    watchdog.join()
+
+
+def _percentiles(values: list[float]) -> dict | None:
+    """Median, 90th and 99th percentile, and maximum of values"""
+
+    if not values:
+        return None
+    if len(values) == 1:
+        return {
+            key: round(values[0], 4)
+            for key in ('p50', 'p90', 'p99', 'max')
+        }
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {
+        'p50': round(statistics.median(values), 4),
+        'p90': round(cuts[89], 4),
+        'p99': round(cuts[98], 4),
+        'max': round(max(values), 4),
+    }
+
+
+def _child(args) -> dict:
+    """Run test inside the sandbox set up by load_test()"""
+
+    shims_dir = os.environ[SHIMS_ENV]
+    if args.child == 'pool':
+        return pool_load(args.njobs, args.threads, shims_dir)
+
+    func = makemkv_load if args.child == 'makemkv' else plex_dvr_load
+    return func(
+        args.njobs,
+        args.threads,
+        args.settle,
+        args.timeout,
+        args.workdir,
+        shims_dir,
+    )
+
+
+def cli():
+    """Run load test from the command line"""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            'Load test job scheduling with stand-in tools in place of '
+            'ffmpeg, mediainfo, comskip, etc. Results are written as JSON.'
+        ),
+    )
+    parser.add_argument(
+        'kind',
+        nargs='?',
+        default='pool',
+        choices=('pool', 'plex_dvr', 'makemkv'),
+        help='What to load test',
+    )
+    parser.add_argument(
+        '-n', '--njobs',
+        type=int,
+        default=200,
+        help='Number of jobs or files to simulate',
+    )
+    parser.add_argument(
+        '-l', '--latency',
+        type=float,
+        nargs='+',
+        default=[0.05],
+        help='Seconds each tool call takes; give two values for a range',
+    )
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=4,
+        help='Number of threads of the PopenPool',
+    )
+    parser.add_argument(
+        '--settle',
+        type=float,
+        default=0.01,
+        help='Seconds watchdogs wait for file size to stop changing',
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=600.0,
+        help='Seconds to wait for all jobs to finish',
+    )
+    parser.add_argument(
+        '--workdir',
+        type=str,
+        help='Directory for shims and scratch files; kept after the run',
+    )
+    parser.add_argument('--child', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = _child(args)
+        with open(
+            os.path.join(args.workdir, RESULT_FILE),
+            mode='w',
+            encoding='utf8',
+        ) as oid:
+            json.dump(result, oid)
+        return
+
+    latency = args.latency[0] if len(args.latency) == 1 else args.latency
+    result = load_test(
+        kind=args.kind,
+        njobs=args.njobs,
+        latency=latency,
+        threads=args.threads,
+        settle=args.settle,
+        timeout=args.timeout,
+        workdir=args.workdir,
+    )
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write(os.linesep)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,431 @@
+"""
+Stand-in command line tools for load testing
+
+The ShimTools class creates a directory of executables named after the
+tools the package runs (ffmpeg, mediainfo, comskip, ...) and puts it first
+on the PATH. Each executable sleeps for a set latency, creates whatever
+output files the real tool would have, prints output the package can parse
+(e.g., mediainfo and ffprobe JSON), and exits with a set code. Every call is
+logged with its start and end times so that scheduling throughput and
+queue latency can be measured without running any real encodes.
+
+The latency, exit code, failure rate, output size, and output text of each
+tool are set through :meth:`ShimTools.configure`; settings are read by the
+shims on every call, so they can be changed while a test is running.
+
+This module only uses the standard library; each shim runs this file as a
+script so that calls do not pay the cost of importing the package.
+
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+
+# Tools the package runs as subprocesses
+TOOLS = (
+    'ffmpeg',
+    'ffprobe',
+    'mediainfo',
+    'comskip',
+    'mkvextract',
+    'mkvmerge',
+    'dovi_tool',
+    'hdr10plus_tool',
+    'ccextractor',
+)
+# Settings used for any tool without its own
+DEFAULTS = {
+    'latency': 0.0,
+    'exitcode': 0,
+    'fail_rate': 0.0,
+    'fail_exitcode': 1,
+    'output_size': 4096,
+    'duration': 1800.0,
+}
+CONFIG_FILE = 'config.json'
+CALLS_FILE = 'calls.jsonl'
+LAUNCHER = '#!/bin/sh\nexec "{python}" "{script}" {tool} "{dirname}" "$@"\n'
+
+
+class ShimTools:
+    """
+    Directory of stand-in tools, put first on PATH while in use
+
+    Use as a context manager; the PATH is restored on exit, and the
+    directory removed if it was created as a temporary directory.
+
+    """
+
+    def __init__(
+        self,
+        dirname: str | None = None,
+        tools: tuple[str] = TOOLS,
+        **defaults,
+    ):
+        """
+        Arguments:
+            None
+
+        Keyword arguments:
+            dirname (str) : Directory to create shims in. Default is a new
+                temporary directory
+            tools (tuple) : Names of tools to create shims for
+            **defaults : Settings for all tools; see :meth:`configure`
+
+        Returns:
+            A ShimTools instance
+
+        """
+
+        self._tmpdir = dirname is None
+        self.dirname = (
+            tempfile.mkdtemp(prefix='video_utils_shims_')
+            if dirname is None else
+            dirname
+        )
+        self.tools = tools
+        self._path = None
+
+        os.makedirs(self.dirname, exist_ok=True)
+        self._config = {'default': {**DEFAULTS, **defaults}, 'tools': {}}
+        self._write_config()
+        for tool in self.tools:
+            self._write_shim(tool)
+
+    def __enter__(self):
+        self._path = os.environ.get('PATH', '')
+        os.environ['PATH'] = os.pathsep.join([self.dirname, self._path])
+        return self
+
+    def __exit__(self, *args):
+        if self._path is not None:
+            os.environ['PATH'] = self._path
+            self._path = None
+        if self._tmpdir:
+            shutil.rmtree(self.dirname, ignore_errors=True)
+
+    def configure(self, tool: str | None = None, **settings) -> None:
+        """
+        Change settings of the shims
+
+        Arguments:
+            tool (str) : Name of the tool to change settings for. Default
+                is to change the settings for all tools
+
+        Keyword arguments:
+            latency (float, list) : Seconds each call takes; may be a
+                [min, max] pair for a uniformly distributed latency
+            exitcode (int) : Exit code of the tool
+            fail_rate (float) : Fraction of calls that fail, exiting with
+                fail_exitcode instead
+            fail_exitcode (int) : Exit code of failed calls
+            output_size (int) : Size, in bytes, of output files created
+            duration (float) : Length, in seconds, of the media reported by
+                mediainfo and ffprobe
+            stdout (str) : Text to write to stdout instead of the default
+            stderr (str) : Text to write to stderr
+            edl (str) : Contents of EDL files written by comskip
+
+        Returns:
+            None
+
+        """
+
+        if tool is None:
+            self._config['default'].update(settings)
+        else:
+            self._config['tools'].setdefault(tool, {}).update(settings)
+        self._write_config()
+
+    def calls(self) -> list[dict]:
+        """
+        Get information about all calls to the shims
+
+        Returns:
+            list : Dicts with the tool name, arguments, process id, start
+                and end time (seconds since epoch), and exit code
+
+        """
+
+        return read_calls(self.dirname)
+
+    def _write_config(self) -> None:
+        """Write settings atomically so running shims never see part"""
+
+        fpath = os.path.join(self.dirname, CONFIG_FILE)
+        with open(f"{fpath}.tmp", mode='w', encoding='utf8') as oid:
+            json.dump(self._config, oid)
+        os.replace(f"{fpath}.tmp", fpath)
+
+    def _write_shim(self, tool: str) -> None:
+        """Write launcher that runs this file for the tool"""
+
+        fpath = os.path.join(self.dirname, tool)
+        with open(fpath, mode='w', encoding='utf8') as oid:
+            oid.write(
+                LAUNCHER.format(
+                    python=sys.executable,
+                    script=os.path.abspath(__file__),
+                    tool=tool,
+                    dirname=self.dirname,
+                )
+            )
+        os.chmod(fpath, 0o755)
+
+
+def read_calls(dirname: str) -> list[dict]:
+    """
+    Read log of calls to shims in directory
+
+    Arguments:
+        dirname (str) : Directory of the shims
+
+    Returns:
+        list : Information about each call; see :meth:`ShimTools.calls`
+
+    """
+
+    fpath = os.path.join(dirname, CALLS_FILE)
+    if not os.path.isfile(fpath):
+        return []
+    calls = []
+    with open(fpath, mode='r', encoding='utf8') as iid:
+        for line in iid:
+            try:
+                calls.append(json.loads(line))
+            except ValueError:
+                continue
+    return calls
+
+
+def shim(tool: str, dirname: str, args: list[str]) -> int:
+    """
+    Act as a tool: wait, create outputs, print output, and log the call
+
+    Arguments:
+        tool (str) : Name of the tool
+        dirname (str) : Directory of the shims, holding the settings
+        args (list) : Command line arguments to the tool
+
+    Returns:
+        int : Exit code
+
+    """
+
+    start = time.time()
+    with open(os.path.join(dirname, CONFIG_FILE), encoding='utf8') as iid:
+        config = json.load(iid)
+    settings = {**config['default'], **config['tools'].get(tool, {})}
+
+    latency = settings['latency']
+    if isinstance(latency, list):
+        latency = random.uniform(*latency)
+    time.sleep(max(latency, 0.0))
+
+    exitcode = settings['exitcode']
+    if random.random() < settings['fail_rate']:
+        exitcode = settings['fail_exitcode']
+
+    if exitcode == 0:
+        for fpath in _outputs(tool, args):
+            _write_output(tool, fpath, settings)
+
+    stdout = settings.get('stdout')
+    if stdout is None:
+        stdout = _stdout(tool, args, settings)
+    if stdout:
+        sys.stdout.write(stdout)
+        sys.stdout.flush()
+    if settings.get('stderr'):
+        sys.stderr.write(settings['stderr'])
+        sys.stderr.flush()
+
+    record = {
+        'tool': tool,
+        'args': args,
+        'pid': os.getpid(),
+        'start': start,
+        'end': time.time(),
+        'exitcode': exitcode,
+    }
+    # One write call with O_APPEND so lines from shims running at the same
+    # time are not interleaved
+    fid = os.open(
+        os.path.join(dirname, CALLS_FILE),
+        os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+        0o644,
+    )
+    try:
+        os.write(fid, (json.dumps(record) + '\n').encode())
+    finally:
+        os.close(fid)
+
+    return exitcode
+
+
+def _outputs(tool: str, args: list[str]) -> list[str]:
+    """Files the real tool would create for the arguments"""
+
+    if tool == 'ffmpeg':
+        if len(args) < 2 or args[-2:] == ['null', '-']:
+            return []
+        if '-version' in args or args[-1] == '-':
+            return []
+        if args[-1].startswith(('pipe:', '/dev/')):
+            return []
+        return [args[-1]]
+
+    if tool == 'comskip':
+        outdir = None
+        for arg in args:
+            if arg.startswith('--output='):
+                outdir = arg.split('=', 1)[1]
+        infiles = [arg for arg in args if not arg.startswith('-')]
+        if not infiles:
+            return []
+        base = os.path.splitext(os.path.basename(infiles[0]))[0]
+        outdir = outdir or os.path.dirname(infiles[0])
+        return [os.path.join(outdir, f"{base}.edl")]
+
+    if tool == 'mkvextract':
+        return [
+            arg.split(':', 1)[1]
+            for arg in args
+            if ':' in arg and arg.split(':', 1)[0].isdigit()
+        ]
+
+    if tool in ('mkvmerge', 'dovi_tool', 'hdr10plus_tool', 'ccextractor'):
+        for i, arg in enumerate(args[:-1]):
+            if arg in ('-o', '--output'):
+                return [args[i + 1]]
+
+    return []
+
+
+def _write_output(tool: str, fpath: str, settings: dict) -> None:
+    """Create output file of the tool"""
+
+    if tool == 'comskip':
+        duration = settings['duration']
+        edl = settings.get('edl')
+        if edl is None:
+            edl = ''.join(
+                f"{duration * frac:0.2f}\t{duration * frac + 120:0.2f}\t0\n"
+                for frac in (0.3, 0.6)
+            )
+        data = edl.encode()
+    else:
+        data = bytes(settings['output_size'])
+
+    try:
+        with open(fpath, mode='wb') as oid:
+            oid.write(data)
+    except OSError:
+        pass
+
+
+def _stdout(tool: str, args: list[str], settings: dict) -> str:
+    """Default output of the tool that the package parses"""
+
+    duration = settings['duration']
+    infile = args[-1] if args else ''
+    try:
+        size = os.path.getsize(infile)
+    except OSError:
+        size = settings['output_size']
+
+    if tool == 'ffmpeg':
+        if '-version' in args:
+            return 'ffmpeg version shim\n'
+        if '-progress' in args:
+            return (
+                f"frame={round(duration * 30)}\n"
+                f"out_time_us={round(duration * 1e6)}\n"
+                "speed=10x\n"
+                "progress=end\n"
+            )
+        return ''
+
+    if tool == 'mediainfo':
+        fmt = 'MPEG-TS' if infile.endswith('.ts') else 'Matroska'
+        return json.dumps({
+            'media': {
+                '@ref': infile,
+                'track': [
+                    {
+                        '@type': 'General',
+                        'Format': fmt,
+                        'FileSize': str(size),
+                        'Duration': f"{duration:0.3f}",
+                    },
+                    {
+                        '@type': 'Video',
+                        'StreamOrder': '0',
+                        'ID': '1',
+                        'Format': 'AVC',
+                        'Width': '1920',
+                        'Height': '1080',
+                        'FrameRate': '29.970',
+                        'ScanType': 'Progressive',
+                        'BitDepth': '8',
+                        'StreamSize': str(size // 2),
+                        'Duration': f"{duration:0.3f}",
+                    },
+                    {
+                        '@type': 'Audio',
+                        'StreamOrder': '1',
+                        'ID': '2',
+                        'Format': 'AC-3',
+                        'Channels': '6',
+                        'BitRate': '384000',
+                        'Language_String': 'English',
+                        'Language_String2': 'en',
+                        'Language_String3': 'eng',
+                        'Duration': f"{duration:0.3f}",
+                    },
+                ],
+            },
+        })
+
+    if tool == 'ffprobe':
+        return json.dumps({
+            'format': {
+                'filename': infile,
+                'format_name': 'matroska,webm',
+                'duration': f"{duration:0.6f}",
+                'size': str(size),
+                'start_time': '0.000000',
+            },
+            'streams': [
+                {
+                    'index': 0,
+                    'codec_type': 'video',
+                    'codec_name': 'h264',
+                    'width': 1920,
+                    'height': 1080,
+                    'pix_fmt': 'yuv420p',
+                    'r_frame_rate': '30000/1001',
+                    'avg_frame_rate': '30000/1001',
+                },
+                {
+                    'index': 1,
+                    'codec_type': 'audio',
+                    'codec_name': 'ac3',
+                    'channels': 6,
+                    'tags': {'language': 'eng'},
+                },
+            ],
+            'chapters': [],
+            'frames': [],
+        })
+
+    return ''
+
+
+if __name__ == '__main__':
+    sys.exit(shim(sys.argv[1], sys.argv[2], sys.argv[3:]))
@@ -0,0 +1,469 @@
+"""
+Benchmarks of the orchestration layer
+
+Each benchmark is a function registered with the :func:`benchmark`
+decorator. It is called once with a working directory, where it creates
+its synthetic inputs, and returns the callable that is timed. Results are
+returned as a dict that can be dumped to JSON and compared against a
+baseline with :func:`compare`.
+
+"""
+
+import logging
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+from subprocess import check_output
+from threading import Thread
+from typing import Callable, NamedTuple
+
+from .. import __version__
+from . import synthetic
+
+# Default number of times each benchmark is timed
+REPEAT = 5
+# Default fractional slow down of the median reported as a regression
+THRESHOLD = 0.10
+
+
+class Benchmark(NamedTuple):
+    """A registered benchmark"""
+
+    name: str
+    func: Callable
+    number: int
+    requires: tuple[str]
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str, number: int = 1, requires: tuple[str] = ()):
+    """
+    Register function as a benchmark
+
+    Arguments:
+        name (str) : Name of the benchmark in the results
+
+    Keyword arguments:
+        number (int) : Number of calls per timing; times are reported
+            per call
+        requires (tuple) : Command line utilities that must be installed;
+            the benchmark is skipped if any are missing
+
+    Returns:
+        Decorator
+
+    """
+
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name, func, number, tuple(requires))
+        return func
+
+    return decorator
+
+
+@benchmark('nlock.uncontended', number=1000)
+def bench_nlock(workdir: str) -> Callable:
+    """Acquire and release NLock with no other users"""
+
+    from ..utils import NLock
+
+    lock = NLock(threads=4)
+
+    def func():
+        lock.acquire(threads=2)
+        lock.release(threads=2)
+
+    return func
+
+
+@benchmark('nlock.contended')
+def bench_nlock_contended(workdir: str) -> Callable:
+    """Four threads acquiring and releasing more threads than are free"""
+
+    from ..utils import NLock
+
+    lock = NLock(threads=4)
+
+    def worker():
+        for _ in range(250):
+            lock.acquire(threads=3)
+            lock.release(threads=3)
+
+    def func():
+        workers = [Thread(target=worker) for _ in range(4)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    return func
+
+
+@benchmark('popen_pool.schedule', requires=('true',))
+def bench_popen_pool(workdir: str) -> Callable:
+    """Start 50 no-op processes through a two thread PopenPool"""
+
+    from ..utils.subproc_pool import PopenPool
+
+    pool = PopenPool(threads=2)
+
+    def func():
+        procs = [
+            pool.popen_async(['true'], threads=1)
+            for _ in range(50)
+        ]
+        for proc in procs:
+            proc.wait()
+
+    return func
+
+
+@benchmark('cropdetect', requires=('ffmpeg',))
+def bench_cropdetect(workdir: str) -> Callable:
+    """Crop detection on letterboxed video"""
+
+    from ..utils.ffmpeg_utils import cropdetect
+
+    size = (640, 480)
+    fpath = synthetic.letterboxed_video(
+        os.path.join(workdir, 'letterboxed.mkv'),
+        size=size,
+    )
+
+    def func():
+        return cropdetect(
+            fpath,
+            size,
+            seg_len=2,
+            threads=1,
+            samples=4,
+            duration=30.0,
+        )
+
+    return func
+
+
+@benchmark('mediainfo.parse', number=5, requires=('ffmpeg', 'mediainfo'))
+def bench_mediainfo(workdir: str) -> Callable:
+    """Run and parse mediainfo on file with video, audio, and subtitles"""
+
+    from ..mediainfo import mediainfo
+
+    srt = synthetic.srt_file(os.path.join(workdir, 'media.srt'), nsubs=10)
+    fpath = synthetic.letterboxed_video(
+        os.path.join(workdir, 'media.mkv'),
+        duration=30.0,
+        audio_tracks=3,
+        subtitles=srt,
+    )
+
+    def func():
+        return mediainfo(fpath, cache=False)
+
+    return func
+
+
+@benchmark('srt.parse_adjust')
+def bench_srt(workdir: str) -> Callable:
+    """Parse SRT file with 1000 subtitles and shift their timing"""
+
+    from ..subtitles.srt_utils import SRTsubs
+
+    fpath = synthetic.srt_file(os.path.join(workdir, 'subs.srt'))
+
+    def func():
+        subs = SRTsubs(fpath)
+        subs.adjust_timing(1500)
+
+    return func
+
+
+@benchmark('pgs.display_sets')
+def bench_pgs(workdir: str) -> Callable:
+    """Generate segments and display sets from PGS file"""
+
+    from ..subtitles.pgs_to_srt import PgsParser
+
+    fpath = synthetic.pgs_file(os.path.join(workdir, 'subs.sup'))
+
+    def func():
+        parser = PgsParser(fpath, 'eng')
+        return sum(1 for _ in parser.gen_display_sets())
+
+    return func
+
+
+@benchmark('audio_delay', requires=('ffmpeg',))
+def bench_audio_delay(workdir: str) -> Callable:
+    """Find delay between two 20 second stereo tracks"""
+
+    from ..audio.audio_delay import audio_delay
+
+    file1 = synthetic.delayed_audio(os.path.join(workdir, 'audio1.wav'))
+    file2 = synthetic.delayed_audio(
+        os.path.join(workdir, 'audio2.wav'),
+        delay=0.5,
+    )
+
+    def func():
+        return audio_delay(file1, file2, limit=20)
+
+    return func
+
+
+@benchmark('ffmetadata.save', number=20)
+def bench_ffmetadata(workdir: str) -> Callable:
+    """Write FFMetaData file with 200 chapters"""
+
+    from datetime import timedelta
+    from ..utils.ffmpeg_utils import FFMetaData
+
+    meta = FFMetaData()
+    meta.add_metadata(title='Benchmark', artist='video_utils')
+    for i in range(200):
+        meta.add_chapter(
+            timedelta(seconds=i * 60),
+            timedelta(seconds=(i + 1) * 60),
+            f"Chapter {i + 1:02d}",
+        )
+    fpath = os.path.join(workdir, 'ffmetadata.txt')
+
+    def func():
+        meta.save(fpath)
+
+    return func
+
+
+@benchmark('comremove.show_segments', number=100)
+def bench_show_segments(workdir: str) -> Callable:
+    """Read comskip EDL file and convert it to show segments"""
+
+    from ..comremove import read_edl, show_segments
+
+    fpath = synthetic.edl_file(os.path.join(workdir, 'comskip.edl'))
+
+    def func():
+        return show_segments(read_edl(fpath), file_length=3600.0)
+
+    return func
+
+
+def run_benchmarks(
+    names: list[str] | None = None,
+    repeat: int = REPEAT,
+    workdir: str | None = None,
+) -> dict:
+    """
+    Run benchmarks and collect timings
+
+    Arguments:
+        None
+
+    Keyword arguments:
+        names (list) : Names of benchmarks to run; default is all
+        repeat (int) : Number of times to time each benchmark
+        workdir (str) : Directory for synthetic inputs. Default is a
+            temporary directory that is removed when done
+
+    Returns:
+        dict : Information about the environment and, under 'results',
+            the timings of each benchmark by name. Times are in seconds
+            per call; skipped benchmarks have a 'skipped' reason instead
+
+    """
+
+    log = logging.getLogger(__name__)
+
+    tmpdir = None
+    if workdir is None:
+        workdir = tmpdir = tempfile.mkdtemp(prefix='video_utils_bench_')
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {}
+    try:
+        for name in (names or BENCHMARKS):
+            bench = BENCHMARKS.get(name)
+            if bench is None:
+                log.error('No benchmark named : %s', name)
+                continue
+            log.info('Running benchmark : %s', name)
+            results[name] = _run_one(bench, repeat, workdir)
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'ffmpeg': _cli_version('ffmpeg', '-version'),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    threshold: float = THRESHOLD,
+) -> list[dict]:
+    """
+    Find benchmarks that got slower than a baseline
+
+    Arguments:
+        current (dict) : Output of :func:`run_benchmarks`
+        baseline (dict) : Output of an earlier :func:`run_benchmarks`
+
+    Keyword arguments:
+        threshold (float) : Fractional increase in median time that is
+            counted as a regression
+
+    Returns:
+        list : One dict per regression with the benchmark name, baseline
+            and current median, and ratio of the two
+
+    """
+
+    regressions = []
+    for name, result in current.get('results', {}).items():
+        base = baseline.get('results', {}).get(name, {})
+        if 'median' not in result or 'median' not in base:
+            continue
+        if base['median'] <= 0:
+            continue
+        ratio = result['median'] / base['median']
+        if ratio > 1.0 + threshold:
+            regressions.append({
+                'name': name,
+                'baseline': base['median'],
+                'current': result['median'],
+                'ratio': round(ratio, 3),
+            })
+    return regressions
+
+
+def _run_one(bench: Benchmark, repeat: int, workdir: str) -> dict:
+    """Set up and time one benchmark"""
+
+    missing = [cli for cli in bench.requires if shutil.which(cli) is None]
+    if missing:
+        return {'skipped': f"missing {', '.join(missing)}"}
+
+    try:
+        func = bench.func(workdir)
+        func()  # Warm up; e.g., imports and caches
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(bench.number):
+                func()
+            times.append((time.perf_counter() - start) / bench.number)
+    except Exception as err:
+        logging.getLogger(__name__).exception('Benchmark failed : %s', err)
+        return {'skipped': f"failed: {err}"}
+
+    return {
+        'number': bench.number,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def _cli_version(cli: str, flag: str) -> str | None:
+    """First line of version output of CLI"""
+
+    if shutil.which(cli) is None:
+        return None
+    try:
+        out = check_output([cli, flag], universal_newlines=True)
+    except Exception:
+        return None
+    return out.splitlines()[0] if out else None
+
+
+def cli():
+    """Run benchmarks from the command line"""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=(
+            'Benchmark the orchestration layer of video_utils using '
+            'synthetic inputs. Results are written as JSON.'
+        ),
+    )
+    parser.add_argument(
+        'names',
+        nargs='*',
+        help=f"Benchmarks to run; choices: {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        help='File to write JSON results to; default is stdout',
+    )
+    parser.add_argument(
+        '-b', '--baseline',
+        type=str,
+        help=(
+            'JSON results from an earlier run. Exit status is one (1) if '
+            'any benchmark is slower than this by more than threshold'
+        ),
+    )
+    parser.add_argument(
+        '-t', '--threshold',
+        type=float,
+        default=THRESHOLD,
+        help='Fractional slow down of median time counted as a regression',
+    )
+    parser.add_argument(
+        '-r', '--repeat',
+        type=int,
+        default=REPEAT,
+        help='Number of times to time each benchmark',
+    )
+    parser.add_argument(
+        '--workdir',
+        type=str,
+        help='Directory for synthetic inputs; kept after the run',
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        names=args.names or None,
+        repeat=args.repeat,
+        workdir=args.workdir,
+    )
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf8') as oid:
+            json.dump(results, oid, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write(os.linesep)
+
+    if not args.baseline:
+        return
+
+    with open(args.baseline, mode='r', encoding='utf8') as iid:
+        baseline = json.load(iid)
+    regressions = compare(results, baseline, threshold=args.threshold)
+    for reg in regressions:
+        sys.stderr.write(
+            f"REGRESSION {reg['name']}: {reg['baseline']:.6f} s -> "
+            f"{reg['current']:.6f} s ({reg['ratio']:.2f}x){os.linesep}"
+        )
+    if regressions:
+        sys.exit(1)
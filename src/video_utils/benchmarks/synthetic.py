@@ -0,0 +1,279 @@
+"""
+Synthetic inputs for benchmarks
+
+Video and audio are generated with the ffmpeg lavfi sources, so no media
+files need to be shipped. Subtitle (SRT and PGS) and comskip EDL files are
+written directly, as ffmpeg cannot encode PGS subtitles.
+
+"""
+
+import os
+import struct
+from subprocess import run, DEVNULL, STDOUT
+
+# PGS timestamps are in units of a 90 kHz clock
+PGS_CLOCK = 90000
+# Frame rate code for 23.976 fps in PGS presentation composition segments
+PGS_FRAME_RATE = 0x10
+
+
+def letterboxed_video(
+    fpath: str,
+    duration: float = 30.0,
+    size: tuple[int, int] = (640, 480),
+    bar: int = 60,
+    audio_tracks: int = 2,
+    subtitles: str | None = None,
+) -> str:
+    """
+    Create video with black bars at top and bottom
+
+    Arguments:
+        fpath (str) : Path of file to create; format is set by extension
+
+    Keyword arguments:
+        duration (float) : Length of the video in seconds
+        size (tuple) : Width and height of the video, including bars
+        bar (int) : Height of each black bar in pixels
+        audio_tracks (int) : Number of audio tracks to add; each is a sine
+            wave with a different frequency
+        subtitles (str) : Path to SRT file to add as subtitle track
+
+    Returns:
+        str : Path to the file created
+
+    """
+
+    width, height = size
+    cmd = [
+        'ffmpeg', '-nostdin', '-y', '-v', 'error',
+        '-f', 'lavfi',
+        '-i', f"testsrc2=size={width}x{height - 2 * bar}:rate=24",
+    ]
+    for i in range(audio_tracks):
+        cmd.extend([
+            '-f', 'lavfi',
+            '-i', f"sine=frequency={220 * (i + 1)}:sample_rate=48000",
+        ])
+    if subtitles:
+        cmd.extend(['-i', subtitles])
+
+    cmd.extend([
+        '-t', str(duration),
+        '-vf', f"pad={width}:{height}:0:{bar}:black",
+        '-map', '0:v',
+    ])
+    for i in range(audio_tracks):
+        cmd.extend(['-map', f"{i + 1}:a"])
+    if subtitles:
+        cmd.extend(['-map', f"{audio_tracks + 1}:s"])
+
+    cmd.extend([
+        '-c:v', 'libx264', '-preset', 'ultrafast',
+        '-c:a', 'aac', '-ac', '2',
+        fpath,
+    ])
+    _ffmpeg(cmd)
+    return fpath
+
+
+def delayed_audio(
+    fpath: str,
+    duration: float = 20.0,
+    delay: float = 0.0,
+) -> str:
+    """
+    Create stereo WAV file of noise, optionally delayed
+
+    The noise is seeded, so files made with different delays contain the
+    same signal shifted in time.
+
+    Arguments:
+        fpath (str) : Path of WAV file to create
+
+    Keyword arguments:
+        duration (float) : Length of the audio in seconds
+        delay (float) : Seconds of silence before the noise starts
+
+    Returns:
+        str : Path to the file created
+
+    """
+
+    delay_ms = round(delay * 1000)
+    cmd = [
+        'ffmpeg', '-nostdin', '-y', '-v', 'error',
+        '-f', 'lavfi',
+        '-i', 'anoisesrc=color=pink:seed=42:sample_rate=48000',
+        '-af', f"aformat=channel_layouts=stereo,adelay={delay_ms}|{delay_ms}",
+        '-t', str(duration),
+        '-c:a', 'pcm_s16le',
+        fpath,
+    ]
+    _ffmpeg(cmd)
+    return fpath
+
+
+def srt_file(fpath: str, nsubs: int = 1000, spacing: float = 3.0) -> str:
+    """
+    Write SRT file with numbered subtitles
+
+    Arguments:
+        fpath (str) : Path of SRT file to create
+
+    Keyword arguments:
+        nsubs (int) : Number of subtitles
+        spacing (float) : Seconds between start of each subtitle
+
+    Returns:
+        str : Path to the file created
+
+    """
+
+    with open(fpath, mode='w', encoding='utf8') as oid:
+        for i in range(nsubs):
+            start = i * spacing + 0.5
+            end = start + spacing * 0.8
+            oid.write(f"{i + 1}{os.linesep}")
+            oid.write(
+                f"{_srt_time(start)} --> {_srt_time(end)}{os.linesep}"
+            )
+            oid.write(f"Subtitle number {i + 1}{os.linesep}")
+            oid.write(f"Second line of subtitle{os.linesep}{os.linesep}")
+    return fpath
+
+
+def pgs_file(
+    fpath: str,
+    nsubs: int = 500,
+    spacing: float = 3.0,
+    size: tuple[int, int] = (1920, 1080),
+    image: tuple[int, int] = (600, 60),
+) -> str:
+    """
+    Write PGS (.sup) file with one image per subtitle
+
+    Each subtitle is a display set that shows a striped image followed by
+    a display set that clears it, as found on Blu-ray discs.
+
+    Arguments:
+        fpath (str) : Path of PGS file to create
+
+    Keyword arguments:
+        nsubs (int) : Number of subtitles
+        spacing (float) : Seconds between start of each subtitle
+        size (tuple) : Width and height of the video
+        image (tuple) : Width and height of each subtitle image
+
+    Returns:
+        str : Path to the file created
+
+    """
+
+    width, height = image
+    xpos = (size[0] - width) // 2
+    ypos = size[1] - height - 40
+    rle = _pgs_rle(width, height)
+    palette = (
+        bytes([0, 16, 128, 128, 0])
+        + bytes([1, 235, 128, 128, 255])
+    )
+    window = struct.pack('>BBHHHH', 1, 0, xpos, ypos, width, height)
+
+    with open(fpath, mode='wb') as oid:
+        for i in range(nsubs):
+            start = round((i * spacing + 0.5) * PGS_CLOCK)
+            end = start + round(spacing * 0.8 * PGS_CLOCK)
+
+            # Display set showing the subtitle
+            pcs = struct.pack(
+                '>HHBHBBBB',
+                size[0], size[1], PGS_FRAME_RATE, 2 * i, 0x80, 0, 0, 1,
+            ) + struct.pack('>HBBHH', 0, 0, 0, xpos, ypos)
+            ods = struct.pack(
+                '>HBB', 0, 0, 0xC0,
+            ) + (len(rle) + 4).to_bytes(3, 'big') + struct.pack(
+                '>HH', width, height,
+            ) + rle
+            oid.write(_pgs_segment(0x16, start, pcs))
+            oid.write(_pgs_segment(0x17, start, window))
+            oid.write(_pgs_segment(0x14, start, bytes([0, 0]) + palette))
+            oid.write(_pgs_segment(0x15, start, ods))
+            oid.write(_pgs_segment(0x80, start, b''))
+
+            # Display set clearing the subtitle
+            pcs = struct.pack(
+                '>HHBHBBBB',
+                size[0], size[1], PGS_FRAME_RATE, 2 * i + 1, 0, 0, 0, 0,
+            )
+            oid.write(_pgs_segment(0x16, end, pcs))
+            oid.write(_pgs_segment(0x17, end, window))
+            oid.write(_pgs_segment(0x80, end, b''))
+    return fpath
+
+
+def edl_file(
+    fpath: str,
+    length: float = 3600.0,
+    nbreaks: int = 6,
+    break_length: float = 180.0,
+) -> str:
+    """
+    Write comskip style EDL file with evenly spaced commercial breaks
+
+    Arguments:
+        fpath (str) : Path of EDL file to create
+
+    Keyword arguments:
+        length (float) : Length of the recording in seconds
+        nbreaks (int) : Number of commercial breaks
+        break_length (float) : Length of each break in seconds
+
+    Returns:
+        str : Path to the file created
+
+    """
+
+    step = length / (nbreaks + 1)
+    with open(fpath, mode='w', encoding='utf8') as oid:
+        for i in range(1, nbreaks + 1):
+            start = i * step
+            oid.write(
+                f"{start:0.2f}\t{start + break_length:0.2f}\t0{os.linesep}"
+            )
+    return fpath
+
+
+def _ffmpeg(cmd: list[str]) -> None:
+    """Run ffmpeg command, raising RuntimeError on failure"""
+
+    proc = run(cmd, stdout=DEVNULL, stderr=STDOUT, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to create synthetic input : {cmd[-1]}")
+
+
+def _srt_time(seconds: float) -> str:
+    """Format seconds as SRT timestamp"""
+
+    millis = round(seconds * 1000)
+    hours, millis = divmod(millis, 3600000)
+    mins, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{mins:02d}:{secs:02d},{millis:03d}"
+
+
+def _pgs_segment(seg_type: int, pts: int, data: bytes) -> bytes:
+    """Build PGS segment with header"""
+
+    return struct.pack('>2sIIBH', b'PG', pts, pts, seg_type, len(data)) + data
+
+
+def _pgs_rle(width: int, height: int) -> bytes:
+    """Run length encode image of alternating background/text stripes"""
+
+    row = bytearray()
+    for line in range(height):
+        color = 1 if (line // 4) % 2 else 0
+        row.extend([0, 0xC0 | (width >> 8), width & 0xFF, color])
+        row.extend([0, 0])
+    return bytes(row)
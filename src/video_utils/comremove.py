@@ -15,9 +15,11 @@ from datetime import timedelta
 
 from . import __version__, config, POPENPOOL
 from .utils import MAXTHREADS
+from .utils.cache import SQLiteCache, content_key
 from .utils.check_cli import check_cli
-from .utils.ffmpeg_utils import get_video_length, FFMetaData
+from .utils.ffmpeg_utils import get_video_length, write_ffconcat, FFMetaData
 from .utils.handlers import RotatingFile
+from .utils.timing import timed
 
 try:
     COMSKIP = check_cli('comskip')
@@ -27,6 +29,14 @@ except:
     )
     COMSKIP = None
 
+# Commercials starting within this many seconds of the start of the file
+# are treated as starting at the beginning of the file
+MIN_START = 1.0
+# Show segment after the last commercial is only kept if at least this long
+MIN_TRAILING = 5.0
+# Commercial breaks found by comskip, keyed by contents of video and ini file
+EDL_CACHE = SQLiteCache('comskip', max_entries=1000)
+
 
 # Following code may be useful for fixing issues with audio in
 # video files that cut out
@@ -100,6 +110,7 @@ class ComRemove:
         in_file: str,
         chapters: bool = False,
         name: str = '',
+        edl_file: str | None = None,
     ) -> bool:
         """
         Main method for commercial identification and removal.
@@ -113,6 +124,10 @@ class ComRemove:
                 commercial break chapter info for FFmpeg.
             name (str): Name of series or movie (Plex convention). Required
                 if trying to use specific comskip.ini file
+            edl_file (str): Path to .edl file with commercial breaks that
+                were already found; e.g., by
+                :class:`video_utils.live_comdetect.LiveComDetect`. If set,
+                comskip is not run. The file is removed when done.
 
         Returns:
             If chapters is True, returns string to ffmpeg metadata file on
@@ -127,13 +142,13 @@ class ComRemove:
         self.__fileext = os.path.splitext(in_file)[-1]
 
         # Set some default values
-        edl_file = None
         tmp_files = None
         cut_file = None
         status = False
 
         # Attempt to run comskip and get edl file path
-        edl_file = self.comskip(in_file, name=name)
+        if edl_file is None:
+            edl_file = self.comskip(in_file, name=name)
 
         # If no valid edl_file, then just return the status
         if edl_file is None:
@@ -148,10 +163,15 @@ class ComRemove:
             status = self.comchapter(in_file, edl_file)
             file_remove(edl_file)
         else:
-            # Want to cut out the commericals from the video file
-            tmp_files = self.comcut(in_file, edl_file)
-            if tmp_files:
-                cut_file = self.comjoin(tmp_files)
+            # Want to cut out the commericals from the video file; try
+            # single pass cut, falling back to cutting segments to
+            # temporary files and then joining them
+            cut_file = self.comcut_concat(in_file, edl_file)
+            if cut_file is None:
+                tmp_files = self.comcut(in_file, edl_file)
+                if tmp_files:
+                    cut_file = self.comjoin(tmp_files)
+            file_remove(edl_file)
             if cut_file:
                 self.check_size(in_file, cut_file)
                 status = True
@@ -161,16 +181,28 @@ class ComRemove:
 
         return status
 
-    def comskip(self, in_file: str, name: str = '') -> str | None:
+    @timed('comskip')
+    def comskip(
+        self,
+        in_file: str,
+        name: str = '',
+        cache: bool = True,
+    ) -> str | None:
         """
         Locate commerical breaks in the input file
 
+        Results are cached using the contents of the input file and of the
+        comskip.ini file, so comskip is not run again for a file it has
+        already been run on with the same settings; e.g., when a job is
+        retried or a recording is reprocessed.
+
         Arguments:
             in_file (str): Full path of file to run comskip on
 
         Keyword arguments:
             name (str): Name of series or movie (Plex convention). Required
                 if trying to use specific comskip.ini file
+            cache (bool): If False, ignore cached results and run comskip
 
         Returns:
             Path to .edl file produced by comskip IF the
@@ -192,9 +224,10 @@ class ComRemove:
         if self.__fileext is None:
             self.__fileext = os.path.splitext(in_file)[-1]
 
+        ini = self._get_ini(name=name)
         cmd = self._comskip.copy()
         cmd.append(f'--threads={self.threads}')
-        cmd.append(f'--ini={self._get_ini(name=name)}')
+        cmd.append(f'--ini={ini}')
 
         # Get file path with no extension
         tmp_file = os.path.splitext(in_file)[0]
@@ -202,6 +235,17 @@ class ComRemove:
         txt_file = f"{tmp_file}.txt"
         logo_file = f"{tmp_file}.logo.txt"
 
+        key = [content_key(in_file), ini and content_key(ini)]
+        if key[0] is None:
+            cache = False
+        if cache:
+            edl = EDL_CACHE.get(key)
+            if edl is not None:
+                self.__log.info('Using cached comskip results')
+                with open(edl_file, mode='w') as oid:
+                    oid.write(edl)
+                return edl_file
+
         cmd.append(f"--output={self.__outdir}")
         cmd.extend([in_file, self.__outdir])
         self.__log.debug('comskip command: %s', ' '.join(cmd))
@@ -235,8 +279,13 @@ class ComRemove:
             )
             edl_file = self.convert_txt(txt_file, edl_file)
         file_remove(txt_file, logo_file)
+
+        if key[0] is not None and edl_file and os.path.isfile(edl_file):
+            with open(edl_file, mode='r') as fid:
+                EDL_CACHE.set(key, fid.read())
         return edl_file
 
+    @timed('comchapter')
     def comchapter(self, in_file: str, edl_file: str) -> str:
         """
         Create ffmpeg metadata file with chapter information for commercials.
@@ -272,39 +321,34 @@ class ComRemove:
         file_length = get_video_length(in_file)
 
         ffmeta = FFMetaData()
-        with open(edl_file, mode='r') as fid:
-            info = fid.readline()
-            while info:
-                # Get the start and ending times of the commercial as float
-                com_start, com_end = map(float, info.split()[:2])
-                # If the start of the commercial is NOT near the very
-                # beginning of the file
-                if com_start > 1.0:
-                    # From seg_start to com_start is NOT commercial
-                    title = show_seg.format(segment)
-                    ffmeta.add_chapter(seg_start, com_start, title)
-                    self.__log.debug(
-                        '%s - %0.2f to %0.2f s',
-                        title, seg_start, com_start
-                    )
-                    # From com_start to com_end is commercial
-                    title = com_seg.format(commercial)
-                    ffmeta.add_chapter(com_start, com_end, title)
-                    self.__log.debug(
-                        '%s - %0.2f to %0.2f s',
-                        title, com_start, com_end,
-                    )
-                    # Increment counters
-                    segment += 1
-                    commercial += 1
-
-                # The start of the next segment of the show is the end time
-                # of the current commerical break
-                seg_start = com_end
-                info = fid.readline()
+        for com_start, com_end in read_edl(edl_file):
+            # If the start of the commercial is NOT near the very
+            # beginning of the file
+            if com_start > MIN_START:
+                # From seg_start to com_start is NOT commercial
+                title = show_seg.format(segment)
+                ffmeta.add_chapter(seg_start, com_start, title)
+                self.__log.debug(
+                    '%s - %0.2f to %0.2f s',
+                    title, seg_start, com_start
+                )
+                # From com_start to com_end is commercial
+                title = com_seg.format(commercial)
+                ffmeta.add_chapter(com_start, com_end, title)
+                self.__log.debug(
+                    '%s - %0.2f to %0.2f s',
+                    title, com_start, com_end,
+                )
+                # Increment counters
+                segment += 1
+                commercial += 1
+
+            # The start of the next segment of the show is the end time
+            # of the current commerical break
+            seg_start = com_end
 
         # If the time differences is greater than a few seconds
-        if (file_length - seg_start) >= 5.0:
+        if (file_length - seg_start) >= MIN_TRAILING:
             ffmeta.add_chapter(
                 seg_start,
                 file_length,
@@ -315,6 +359,132 @@ class ComRemove:
 
         return metafile
 
+    def comsegments(
+        self,
+        in_file: str,
+        name: str = '',
+        edl_file: str | None = None,
+    ) -> list[tuple[float, float | None]] | None:
+        """
+        Identify the show segments of a file without cutting it
+
+        Runs comskip and converts the commercial breaks to show segments
+        that can be passed to a transcode, so that commercials are dropped
+        during the encode rather than in separate cut and join passes. The
+        same sanity check as check_size() is applied, using the duration of
+        the show segments in place of the size of the cut file.
+
+        Arguments:
+            in_file (str): Full path of file to run commercial detection on
+
+        Keyword arguments:
+            name (str): Name of series or movie (Plex convention). Required
+                if trying to use specific comskip.ini file
+            edl_file (str): Path to .edl file with commercial breaks that
+                were already found. If set, comskip is not run. The file is
+                removed when done.
+
+        Returns:
+            list: (start, end) times, in seconds, of the show segments; end
+                of the last segment is None, meaning the end of the file.
+                A single (0.0, None) segment is returned if no commercials
+                were found or if too much would be removed. Returns None if
+                comskip failed.
+
+        """
+
+        self.__outdir = os.path.dirname(in_file)
+        self.__fileext = os.path.splitext(in_file)[-1]
+
+        if edl_file is None:
+            edl_file = self.comskip(in_file, name=name)
+
+        self.__outdir = None
+        self.__fileext = None
+
+        if edl_file is None:
+            return None
+
+        breaks = read_edl(edl_file)
+        file_remove(edl_file)
+        if len(breaks) == 0:
+            return [(0.0, None)]
+
+        file_length = get_video_length(in_file)
+        segments = show_segments(breaks, file_length)
+        if file_length:
+            kept = sum(
+                (file_length if end is None else end) - start
+                for start, end in segments
+            )
+            if not 1.1 > kept / file_length > 0.5:
+                self.__log.info(
+                    'Show segments looked odd (too long/too short); '
+                    'keeping commercials: %0.1f s of %0.1f s',
+                    kept,
+                    file_length,
+                )
+                return [(0.0, None)]
+
+        return segments
+
+    @timed('comcut')
+    def comcut_concat(self, in_file: str, edl_file: str) -> str | None:
+        """
+        Cut commercials out of file in a single pass
+
+        An ffconcat script listing the show segments of the input file,
+        as inpoint/outpoint pairs, is passed to the ffmpeg concat demuxer.
+        The file with no commercials is then written with one read of the
+        input and no intermediate files.
+
+        Arguments:
+            in_file (str): Full path of file to remove commercials from
+            edl_file (str): Full path of .edl file produced by comskip
+
+        Returns:
+            str: Path to file with no commercials if successful. Else,
+                returns None.
+
+        """
+
+        self.__log.info('Cutting out commercials')
+        segments = show_segments(
+            read_edl(edl_file),
+            get_video_length(in_file),
+        )
+        if len(segments) == 0:
+            self.__log.warning('No show segments found in EDL file')
+            return None
+
+        concat_file = os.path.join(self.__outdir, 'tmp_nocom.ffconcat')
+        write_ffconcat(
+            concat_file,
+            [(in_file, start, end) for start, end in segments],
+        )
+
+        outfile = f"tmp_nocom{self.__fileext}"
+        outfile = os.path.join(self.__outdir, outfile)
+        cmd = [
+            'ffmpeg', '-nostdin', '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', concat_file,
+            '-c', 'copy',
+            '-map', '0',
+            outfile,
+        ]
+        proc = POPENPOOL.popen_async(cmd)
+        proc.wait()
+        file_remove(concat_file)
+        if proc.returncode == 0:
+            return outfile
+
+        self.__log.warning('Failed to cut commercials in single pass')
+        file_remove(outfile)
+        return None
+
+    @timed('comcut')
     def comcut(self, in_file: str, edl_file: str) -> list[str] | None:
         """
         Method to create intermediate files that do NOT contain comercials.
@@ -339,9 +509,9 @@ class ComRemove:
         # of the recording
         seg_start = timedelta(seconds=0.0)
 
-        with open(edl_file, 'r') as fid:
+        group = POPENPOOL.group()
+        with group, open(edl_file, 'r') as fid:
             info = fid.readline()
-            procs = []
             while info:
                 com_start, com_end = info.split()[:2]
                 com_start = timedelta(seconds=float(com_start))
@@ -360,9 +530,7 @@ class ComRemove:
                     ]
                     cmd = cmd_base + cmd
                     tmpfiles.append(outfile)
-                    procs.append(
-                        POPENPOOL.popen_async(cmd, threads=1)
-                    )
+                    group.popen_async(cmd, threads=1)
 
                 # The start of the next segment of the show is the end time
                 # of the current commerical break
@@ -370,9 +538,8 @@ class ComRemove:
                 info = fid.readline()
                 fnum += 1
 
-        POPENPOOL.wait()
         # If one or more of the process failed
-        if sum(p.returncode for p in procs) != 0:
+        if any(code != 0 for code in group.returncodes):
             self.__log.critical('There was an error cutting out commericals!')
             file_remove(*tmpfiles)
             tmpfiles = None
@@ -381,6 +548,7 @@ class ComRemove:
         file_remove(edl_file)
         return tmpfiles
 
+    @timed('comjoin')
     def comjoin(self, tmpfiles: list[str]) -> str | None:
         """
         Join intermediate files that do NOT contain comercials into one file
@@ -542,6 +710,68 @@ class ComRemove:
         return f"{num:.1f}Y{suffix}"
 
 
+def read_edl(edl_file: str) -> list[tuple[float, float]]:
+    """
+    Read commercial breaks from EDL file
+
+    Arguments:
+        edl_file (str): Full path of .edl file produced by comskip
+
+    Keyword arguments:
+        None
+
+    Returns:
+        list: (start, end) times, in seconds, of the commercial breaks
+
+    """
+
+    breaks = []
+    with open(edl_file, mode='r') as fid:
+        for line in fid:
+            info = line.split()
+            if len(info) < 2:
+                continue
+            breaks.append((float(info[0]), float(info[1])))
+    return breaks
+
+
+def show_segments(
+    breaks: list[tuple[float, float]],
+    file_length: float | None = None,
+) -> list[tuple[float, float | None]]:
+    """
+    Convert commercial breaks to show segments
+
+    Arguments:
+        breaks (list): (start, end) times of commercial breaks; see
+            read_edl()
+
+    Keyword arguments:
+        file_length (float): Length of the file in seconds. The segment
+            after the last commercial is only kept if it is at least
+            MIN_TRAILING seconds long. If not set, it is always kept.
+
+    Returns:
+        list: (start, end) times, in seconds, of the show segments; end of
+            the last segment is None, meaning the end of the file
+
+    """
+
+    segments = []
+    seg_start = 0.0
+    for com_start, com_end in breaks:
+        # If the start of the commercial is NOT near the very beginning
+        # of the file; from seg_start to com_start is NOT commercial
+        if com_start > MIN_START:
+            segments.append((seg_start, com_start))
+        seg_start = com_end
+
+    if file_length is None or (file_length - seg_start) >= MIN_TRAILING:
+        segments.append((seg_start, None))
+
+    return segments
+
+
 def file_remove(*args) -> None:
     """
     Delete any number of files
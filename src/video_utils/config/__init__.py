@@ -21,6 +21,9 @@ APPDIR = os.path.join(HOME, 'Library', 'Application Support', PKGNAME)
 CACHEDIR = os.path.join(APPDIR, 'cache')
 LOGDIR = os.path.join(APPDIR, 'Logs')
 PLEXTOKEN = os.path.join(APPDIR, '.plextoken')
+PROBECACHE = os.path.join(APPDIR, 'probe_cache.sqlite')
+# Default file for stage timing records, if enabled; see utils.timing
+TIMINGLOG = os.path.join(LOGDIR, 'timing.jsonl')
 CONFIG = os.path.join(HOME, f'.{PKGNAME}.yml')
 
 
@@ -134,7 +137,8 @@ BASEPARSER.add_argument(
     default=75,
     help=(
         "Set to limit CPU usage. Set to 0 to disable CPU limiting. "
-        "Has no effect if cpulimit CLI is not installed."
+        "Has no effect if cpulimit CLI is not installed, or on Linux, "
+        "where processes are pinned to dedicated cores instead."
     ),
 )
 BASEPARSER.add_argument(
@@ -161,6 +165,22 @@ BASEPARSER.add_argument(
     action="store_true",
     help="Set to disbale conversion of VobSub(s) to SRT",
 )
+BASEPARSER.add_argument(
+    "--segments",
+    type=int,
+    help=(
+        "Set to split video into this many segments that are transcoded "
+        "in parallel and then joined. Ignored for HDR content."
+    ),
+)
+BASEPARSER.add_argument(
+    "--adaptive",
+    action="store_true",
+    help=(
+        "Set to adjust the number of threads used for processing based on "
+        "system load; e.g., playback transcodes by Plex Media Server."
+    ),
+)
 BASEPARSER.add_argument(
     "--loglevel",
     type=int,
@@ -0,0 +1,285 @@
+"""
+Commercial detection on recordings that are still in progress
+
+The LiveComDetect class runs ffmpeg over a file while it is being written,
+following the end of the file as it grows, and looks for the black frames
+and silence that separate commercials from each other and from the show.
+By the time the recording finishes, only the last few seconds remain to be
+analysed, so the commercial breaks are known almost as soon as the file is
+complete, rather than after a full comskip pass over the recording.
+
+The breaks are written to an EDL file in the same format as comskip so that
+they can be used in place of comskip output; see
+:meth:`video_utils.comremove.ComRemove.remove_commercials`.
+
+"""
+
+import logging
+import os
+import re
+import tempfile
+from threading import Thread, Event
+
+from . import POPENPOOL
+from .config import get_comskip_log
+from .comremove import MIN_TRAILING
+from .utils import isRunning
+from .utils.ffmpeg_utils import get_video_length
+from .utils.handlers import RotatingFile
+
+# Seconds ffmpeg waits for the file to grow before assuming recording is done
+RW_TIMEOUT = 30.0
+# Minimum duration (seconds) of black frames between spots
+BLACK_MIN = 0.1
+# Minimum duration (seconds) of silence between spots
+SILENCE_MIN = 0.1
+# Noise level below which audio is considered silent
+SILENCE_NOISE = '-50dB'
+# Black frames and silence within this many seconds are treated as one
+OVERLAP = 0.5
+# Standard lengths (seconds) of commercial spots
+SPOT_LENGTHS = (10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+# Spot may differ from a standard length by this many seconds
+SPOT_TOLERANCE = 1.0
+# Shortest run of spots (seconds) considered a commercial break
+MIN_BREAK = 45.0
+# Minimum number of spots in a commercial break
+MIN_SPOTS = 2
+
+BLACK = re.compile(r'black_start:\s*([\d.]+)\s+black_end:\s*([\d.]+)')
+SILENCE_START = re.compile(r'silence_start:\s*(-?[\d.]+)')
+SILENCE_END = re.compile(r'silence_end:\s*([\d.]+)')
+TIME = re.compile(r'time=\s*(\d+):(\d+):([\d.]+)')
+
+
+class LiveComDetect(Thread):
+    """
+    Detect commercial breaks while a file is being written
+
+    The file is read through the ffmpeg file protocol with the follow
+    option, so ffmpeg waits for more data at the end of the file instead of
+    stopping. Once no data has been written for RW_TIMEOUT seconds, ffmpeg
+    exits; if the recording has not been marked finished by then, ffmpeg is
+    restarted from where it stopped.
+
+    """
+
+    def __init__(self, fpath: str, comskip_log: str | None = None):
+        """
+        Arguments:
+            fpath (str) : Path to the file being recorded
+
+        Keyword arguments:
+            comskip_log (str) : File to write ffmpeg output to. Default
+                is the comskip log for this class
+
+        Returns:
+            A LiveComDetect instance
+
+        """
+
+        super().__init__(daemon=True)
+        self.__log = logging.getLogger(__name__)
+        self.__finished = Event()
+        self.fpath = fpath
+        self.comskip_log = (
+            comskip_log or get_comskip_log(self.__class__.__name__)
+        )
+        self.blacks = []
+        self.silences = []
+        self.analysed = 0.0
+        self.proc = None
+        self._offset = 0.0
+        self._silence_start = None
+
+    def finish(self) -> None:
+        """Mark the recording as finished; no restart once ffmpeg exits"""
+
+        self.__finished.set()
+
+    def result(self, timeout: float | None = None) -> str | None:
+        """
+        Wait for analysis to finish and write the EDL file
+
+        Arguments:
+            None
+
+        Keyword arguments:
+            timeout (float) : Seconds to wait for analysis of the end of
+                the recording. Default is to wait forever
+
+        Returns:
+            str : Path to EDL file with the commercial breaks, or None if
+                the whole recording could not be analysed
+
+        """
+
+        self.finish()
+        self.join(timeout)
+        if self.is_alive():
+            self.__log.warning('Live detection not finished; stopping')
+            if self.proc is not None:
+                self.proc.kill()
+            return None
+
+        length = get_video_length(self.fpath)
+        if not length or self.analysed < length - MIN_TRAILING:
+            self.__log.warning(
+                'Live detection covered %0.1f s of %s s; not using it',
+                self.analysed,
+                length,
+            )
+            return None
+
+        breaks = commercial_breaks(self.blacks, self.silences)
+        self.__log.info(
+            'Live detection found %d commercial breaks',
+            len(breaks),
+        )
+
+        fid, edl_file = tempfile.mkstemp(suffix='.edl')
+        with os.fdopen(fid, mode='w') as oid:
+            for start, end in breaks:
+                oid.write(f"{start:0.2f}\t{end:0.2f}\t0{os.linesep}")
+        return edl_file
+
+    def run(self):
+        """Run ffmpeg over the file until the recording is finished"""
+
+        self.__log.info('Starting live commercial detection : %s', self.fpath)
+        while isRunning():
+            self._offset = self.analysed
+            self.proc = POPENPOOL.popen_async(
+                self._command(),
+                threads=None,
+                stderr=RotatingFile(self.comskip_log, callback=self._parse),
+                universal_newlines=True,
+            )
+            self.proc.wait()
+            if self.__finished.is_set() or self.proc.returncode != 0:
+                break
+            self.__log.debug(
+                'No data for %0.0f s; restarting at %0.1f s',
+                RW_TIMEOUT,
+                self.analysed,
+            )
+
+        self.__log.info(
+            'Live commercial detection done at %0.1f s : %s',
+            self.analysed,
+            self.fpath,
+        )
+
+    def _command(self) -> list[str]:
+        """Build ffmpeg command to analyse file from current offset"""
+
+        seek = ["-ss", f"{self._offset:0.3f}"] if self._offset > 0 else []
+        return [
+            "ffmpeg", "-nostdin", "-hide_banner",
+            "-threads", "1",
+            "-follow", "1",
+            "-rw_timeout", str(int(RW_TIMEOUT * 1e6)),
+            *seek,
+            "-i", f"file:{self.fpath}",
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-vf", f"blackdetect=d={BLACK_MIN}",
+            "-af", f"silencedetect=n={SILENCE_NOISE}:d={SILENCE_MIN}",
+            "-f", "null", "-",
+        ]
+
+    def _parse(self, line: str) -> None:
+        """Collect black frames, silence, and progress from ffmpeg output"""
+
+        offset = self._offset
+        match = BLACK.search(line)
+        if match:
+            start, end = (float(val) + offset for val in match.groups())
+            self.blacks.append((start, end))
+            return
+
+        match = SILENCE_START.search(line)
+        if match:
+            self._silence_start = max(float(match.group(1)), 0.0) + offset
+            return
+
+        match = SILENCE_END.search(line)
+        if match:
+            if self._silence_start is not None:
+                self.silences.append(
+                    (self._silence_start, float(match.group(1)) + offset)
+                )
+            self._silence_start = None
+            return
+
+        match = TIME.search(line)
+        if match:
+            hour, mins, sec = match.groups()
+            self.analysed = max(
+                self.analysed,
+                int(hour) * 3600 + int(mins) * 60 + float(sec) + offset,
+            )
+
+
+def commercial_breaks(
+    blacks: list[tuple[float, float]],
+    silences: list[tuple[float, float]],
+) -> list[tuple[float, float]]:
+    """
+    Find commercial breaks from black frames and silence
+
+    Spots within a commercial break are separated by black frames that
+    coincide with silence. Each such point is a candidate boundary, and a
+    run of boundaries separated by standard spot lengths (SPOT_LENGTHS)
+    that spans at least MIN_BREAK seconds is treated as a commercial break.
+
+    Arguments:
+        blacks (list) : (start, end) times of black frames
+        silences (list) : (start, end) times of silence
+
+    Keyword arguments:
+        None
+
+    Returns:
+        list : (start, end) times, in seconds, of commercial breaks
+
+    """
+
+    points = []
+    for black_start, black_end in sorted(blacks):
+        for silence_start, silence_end in silences:
+            if (
+                silence_start - OVERLAP <= black_end
+                and black_start <= silence_end + OVERLAP
+            ):
+                points.append((black_start + black_end) / 2.0)
+                break
+
+    breaks = []
+    i = 0
+    while i < len(points):
+        # Follow boundaries a spot length apart, skipping any black frames
+        # and silence within a spot
+        run = [i]
+        for j in range(i + 1, len(points)):
+            length = points[j] - points[run[-1]]
+            if length > SPOT_LENGTHS[-1] + SPOT_TOLERANCE:
+                break
+            if is_spot(length):
+                run.append(j)
+        start, end = points[run[0]], points[run[-1]]
+        if len(run) > MIN_SPOTS and end - start >= MIN_BREAK:
+            breaks.append((start, end))
+            i = run[-1] + 1
+        else:
+            i += 1
+
+    return breaks
+
+
+def is_spot(length: float) -> bool:
+    """Check if length, in seconds, is that of a commercial spot"""
+
+    return any(
+        abs(length - spot) <= SPOT_TOLERANCE
+        for spot in SPOT_LENGTHS
+    )
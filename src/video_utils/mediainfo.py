@@ -7,7 +7,10 @@ import logging
 import json
 from subprocess import check_output
 
-from .utils.ffmpeg_utils import get_hdr_opts
+from .utils.cache import SQLiteCache, file_key
+from .utils.ffmpeg_utils import ProbeResult, get_hdr_opts, probe
+
+PROBE_CACHE = SQLiteCache('mediainfo')
 
 
 class MediaInfo:
@@ -45,12 +48,26 @@ class MediaInfo:
     def infile(self, value):
         """Set the input file path"""
         self.__infile = value
+        self.__probe = None
         if self.__infile is None:
             self.__mediainfo = None
         else:
             self.__mediainfo = mediainfo(value)
 #          self.__parse_output()
 
+    @property
+    def probe(self) -> ProbeResult | None:
+        """
+        Stream, format, chapter, and first frame information from ffprobe
+
+        The file is probed on first access and the result reused after that.
+
+        """
+
+        if self.__probe is None and self.__infile is not None:
+            self.__probe = probe(self.__infile)
+        return self.__probe
+
     @property
     def format(self) -> str | None:
         """Full name of file format; e.g., MPEG-4, Matroska"""
@@ -457,7 +474,7 @@ class MediaInfo:
 
         # x265_opts = ["pools=none", f"crf={crf}"]
         x265_opts = [f"crf={crf}"]
-        hdr_opts = get_hdr_opts(self.infile)
+        hdr_opts = get_hdr_opts(self.infile, probe_result=self.probe)
         if hdr_opts is None:
             return ["-x265-params", ":".join(x265_opts)]
 
@@ -686,16 +703,34 @@ def set_resolution(video_height: int) -> tuple[int]:
     return 2160, 20
 
 
-def mediainfo(fname: str) -> dict:
+def mediainfo(fname: str, cache: bool = True) -> dict:
     """
     Parse mediainfo JSON output
 
     Parse the JSON formatted output of the mediainfo
     command into a format that is similar to that
-    parsed from the OLDXML style
+    parsed from the OLDXML style. Parsed output is
+    cached on disk, keyed on the identity of the file
+    (device, inode, size, and modification time), so
+    that an unchanged file is only probed once.
+
+    Arguments:
+        fname (str) : Path of file to run mediainfo on
+
+    Keyword arguments:
+        cache (bool) : If set, use the on-disk probe cache
+
+    Returns:
+        dict : Lists of track information keyed by track type
 
     """
 
+    key = file_key(fname) if cache else None
+    if key is not None:
+        out = PROBE_CACHE.get(key)
+        if out is not None:
+            return out
+
     cmd = ['mediainfo', '--Full', '--Output=JSON', fname]
     res = check_output(cmd)
     data = json.loads(res)
@@ -712,4 +747,32 @@ def mediainfo(fname: str) -> dict:
     for val in out.values():
         val.sort(key=lambda x: x.get('@typeorder', 0))
 
+    if key is not None:
+        PROBE_CACHE.set(key, out)
+
     return out
+
+
+def invalidate_mediainfo(fname: str | None = None) -> None:
+    """
+    Remove entries from the mediainfo probe cache
+
+    Arguments:
+        None.
+
+    Keyword arguments:
+        fname (str) : Path of file to remove from cache. If not set,
+            the entire cache is cleared
+
+    Returns:
+        None.
+
+    """
+
+    if fname is None:
+        PROBE_CACHE.clear()
+        return
+
+    key = file_key(fname)
+    if key is not None:
+        PROBE_CACHE.invalidate(key)
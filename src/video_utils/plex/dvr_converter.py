@@ -72,7 +72,12 @@ class DVRconverter(VideoConverter):
         self.destructive = destructive
         self.log = logging.getLogger(__name__)
 
-    def convert(self, infile: str, section: str = 'TV Shows') -> tuple:
+    def convert(
+        self,
+        infile: str,
+        section: str = 'TV Shows',
+        edl_file: str | None = None,
+    ) -> tuple:
         """
         Method to actually post process Plex DVR files.
 
@@ -86,6 +91,9 @@ class DVRconverter(VideoConverter):
 
         Keyword Arguments:
             section (str): Name of Plex Media Server Library file is part of
+            edl_file (str): Path to .edl file with commercial breaks that
+                were found while the file was recording; comskip is not
+                run if set
 
         Returns:
             int: Returns success of transocde
@@ -131,6 +139,7 @@ class DVRconverter(VideoConverter):
                 fname,
                 metadata=metadata,
                 chapters=not self.destructive,
+                edl_file=edl_file,
             )
 
             self._clean_up(fname)
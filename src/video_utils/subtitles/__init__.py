@@ -9,7 +9,12 @@ subtitles from OpenSubtitles.com
 """
 
 import logging
+from functools import partial
 
+from .. import POPENPOOL
+from ..utils import thread_check
+from ..utils.subproc_pool import NORMAL
+from ..utils.timing import span
 from .vobsub_to_srt import vobsub_to_srt
 from .pgs_to_srt import pgs_to_srt
 
@@ -23,12 +28,23 @@ def sub_to_srt(out_file: str, text_info: list[dict], **kwargs) -> list[str]:
     is used to convert either format to SRT using the vobsub_to_srt
     and pgs_to_srt functions, respectively.
 
+    Each stream is converted as a job in the global PopenPool so that all
+    streams are converted at the same time. PGS conversions hold an equal
+    share of the threads for OCR, while VobSub conversions only wait on
+    the vobsub2srt processes they run in the pool.
+
     Arguments:
         out_file (str) : Base path and name for the output video file.
         text_info (list) : List of dicts containing information about
             text streams in video file.
 
     Keyword arguments:
+        threads (int) : Total number of threads to use for PGS conversion.
+            Default is the number of threads allowed by the pool
+        job_class (str) : Job class of the conversion jobs and processes
+            in the pool. Default is 'normal'
+        priority (int) : Priority of the conversion jobs and processes
+            within their job class. Default is zero (0)
         **kwargs : Passed directory to the converter functions.
 
     Returns:
@@ -38,18 +54,56 @@ def sub_to_srt(out_file: str, text_info: list[dict], **kwargs) -> list[str]:
     """
 
     log = logging.getLogger(__name__)
-    files = []
+    streams = []
     for info in text_info:
         fmt = info.get('format', '')
-        if fmt == 'PGS':
-            res, fname = pgs_to_srt(out_file, info, **kwargs)
-        elif fmt == 'VobSub':
-            res, fname = vobsub_to_srt(out_file, info, **kwargs)
+        if fmt in ('PGS', 'VobSub'):
+            streams.append(info)
         else:
             log.info("Format not supported : %s", fmt)
-            continue
+    if len(streams) == 0:
+        return []
+
+    threads = kwargs.pop('threads', None) or POPENPOOL.threads
+    threads, *_ = thread_check(threads // len(streams))
+    job = {
+        'job_class': kwargs.pop('job_class', NORMAL),
+        'priority': kwargs.pop('priority', 0),
+    }
+
+    with POPENPOOL.group() as group:
+        for info in streams:
+            if info['format'] == 'PGS':
+                func = partial(pgs_to_srt, threads=threads)
+                nthreads = threads
+            else:
+                func = partial(vobsub_to_srt, **job)
+                nthreads = None
+            group.submit(
+                _convert,
+                func,
+                out_file,
+                info,
+                threads=nthreads,
+                **job,
+                **kwargs,
+            )
 
+    files = []
+    for future in group:
+        try:
+            res, fname = future.result()
+        except Exception as err:
+            log.error('Failed to convert subtitles to SRT : %s', err)
+            continue
         if res <= 1:
             files.append(fname)
 
     return files
+
+
+def _convert(func, out_file: str, info: dict, **kwargs) -> tuple:
+    """Run converter for one stream, timing it as a span"""
+
+    with span('sub_to_srt', format=info['format'], language=info.get('lang3')):
+        return func(out_file, info, **kwargs)
@@ -8,6 +8,7 @@ import os
 from subprocess import run, STDOUT, DEVNULL
 
 from ..utils.check_cli import check_cli
+from ..utils.timing import timed
 
 CLINAME = 'ccextractor'
 try:
@@ -40,6 +41,7 @@ def dir_list(path: str):
             yield path
 
 
+@timed('ccextract')
 def ccextract(
     in_file: str,
     out_base: str,
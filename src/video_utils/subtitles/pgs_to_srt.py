@@ -8,14 +8,18 @@ Makes use of pgsrip package to make a
 
 import logging
 import os
+import mmap
+import struct
 import typing
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from pgsrip.media_path import MediaPath, Language
 from pgsrip.pgs import (
     SEGMENT_TYPE,
     SegmentType,
     DisplaySet,
-    from_hex,
 )
 from pgsrip.ripper import (
     logger,
@@ -24,14 +28,36 @@ from pgsrip.ripper import (
     PgsSubtitleItem,
     PgsToSrtRipper,
 )
-from pysrt import SubRipFile
+from pysrt import SubRipFile, SubRipItem
 
+from .. import POPENPOOL
+from ..utils.cache import SQLiteCache
 from .srt_utils import srt_cleanup
 
 PGS_HEADER = 13
+# Magic number, segment type, and segment size from segment header
+PGS_HEADER_FMT = struct.Struct('>2s8xBH')
+# Segment class by segment type number
+SEGMENT_CLASS = {key.value: val for key, val in SEGMENT_TYPE.items()}
+# Text of subtitle images already run through OCR, keyed by bitmap_key()
+OCR_CACHE = SQLiteCache('ocr', max_entries=50000)
+# Start method of OCR worker processes; forking a threaded process is unsafe
+MP_START_METHOD = (
+    'forkserver'
+    if 'forkserver' in multiprocessing.get_all_start_methods() else
+    'spawn'
+)
+# OCR settings for strips converted in this process; see _init_ocr_worker()
+_OCR_WORKER = {}
 
 
-def pgs_to_srt(out_file, text_info, delete_source=False, **kwargs):
+def pgs_to_srt(
+    out_file,
+    text_info,
+    delete_source=False,
+    threads=None,
+    **kwargs,
+):
     """
     Convert PGS (.sup) to SRT
 
@@ -41,6 +67,11 @@ def pgs_to_srt(out_file, text_info, delete_source=False, **kwargs):
         lang (str) : 2-character code for subtitle
             language.
 
+    Keyword arguments:
+        delete_source (bool) : Delete the PGS file after conversion
+        threads (int) : Number of processes to run OCR in. Default is
+            the number of threads allowed by the global subprocess pool
+
     """
 
     log = logging.getLogger(__name__)
@@ -54,17 +85,59 @@ def pgs_to_srt(out_file, text_info, delete_source=False, **kwargs):
         return 2, sup_file
 
     log.info("Parsing PGS file : %s", sup_file)
-    parse = PgsParser(sup_file, text_info.get('lang3', 'und'))
+    lang = text_info.get('lang3', 'und')
+    parse = PgsParser(sup_file, lang)
     opts = Options()
     pgs = Pgs(parse.media_path, opts, b'', '')
-    pgs._items = list(parse.gen_pgs_subtitle_items())
-    if len(pgs._items) == 0:
+    items = list(parse.gen_pgs_subtitle_items())
+    if len(items) == 0:
         log.warning("No subtitles found in PGS file, removing : %s", sup_file)
         rmfile(sup_file, srt_file)
         return 2, ''
 
-    log.info("Converting images to SRT")
-    srt = MyPgsToSrtRipper(pgs, opts).rip(None)
+    # Only OCR one item of each unique image not already in the cache
+    groups = {}
+    for item in items:
+        key = bitmap_key(item, lang) or id(item)
+        groups.setdefault(key, []).append(item)
+    pending = []
+    for key, group in groups.items():
+        text = OCR_CACHE.get(key) if isinstance(key, str) else None
+        if text is None:
+            pending.append((key, group))
+            continue
+        for item in group:
+            item.text = text
+    log.info(
+        "Images to convert : %d of %d (%d cached)",
+        len(pending),
+        len(items),
+        len(groups) - len(pending),
+    )
+
+    srt = SubRipFile(path=str(pgs.media_path.translate(extension='srt')))
+    if len(pending) > 0:
+        log.info("Converting images to SRT")
+        pgs._items = [group[0] for _, group in pending]
+        ocr = MyPgsToSrtRipper(
+            pgs,
+            opts,
+            workers=threads or POPENPOOL.threads,
+        ).rip(None)
+        texts = {sub.start.ordinal: sub.text for sub in ocr}
+        for key, group in pending:
+            text = texts.get(group[0].start.ordinal)
+            if text is None:
+                continue
+            if isinstance(key, str):
+                OCR_CACHE.set(key, text)
+            for item in group:
+                item.text = text
+
+    for item in items:
+        if item.text:
+            srt.append(SubRipItem(0, item.start, item.end, item.text))
+    srt.clean_indexes()
     if len(srt) == 0:
         log.warning("No subtitles converted to SRT : %s", sup_file)
         rmfile(srt_file)
@@ -109,6 +182,25 @@ class MPath(MediaPath):
 
 class MyPgsToSrtRipper(PgsToSrtRipper):
 
+    def __init__(self, pgs, options, workers=1):
+        """
+        Arguments:
+            pgs (Pgs) : Subtitle items to convert
+            options (Options) : Ripper options
+
+        Keyword arguments:
+            workers (int) : Number of processes to run OCR in. Strips of
+                images are sent to the processes, so this only helps
+                when there are more subtitles than fit in one strip
+
+        """
+
+        super().__init__(pgs, options)
+        self.workers = max(workers or 1, 1)
+        # Each worker runs its own tesseract, so keep each to one thread
+        if self.workers > 1:
+            self.omp_thread_limit = 1
+
     def process(
         self,
         subs,
@@ -118,6 +210,7 @@ class MyPgsToSrtRipper(PgsToSrtRipper):
         max_width,
         oem,
         psm,
+        executor=None,
     ):
         """
         Slightly smarter processing
@@ -127,9 +220,12 @@ class MyPgsToSrtRipper(PgsToSrtRipper):
         run super().process() on the subtitles. Any unprocessed subtitles are
         returned as a list.
 
+        When an executor is given, the strips are OCRed in its processes and
+        the results merged back in the order of the strips.
+
         """
 
-        remaining = []
+        strips = []
         nn = len(items)
         ii = 0
         while ii < nn:
@@ -143,18 +239,25 @@ class MyPgsToSrtRipper(PgsToSrtRipper):
                     break
                 to_process.append(item)
                 ii += 1
+            strips.append(to_process)
 
-            remaining.extend(
-                super().process(
-                    subs,
-                    to_process,
-                    post_process,
-                    confidence,
-                    max_width,
-                    oem,
-                    psm,
+        args = (post_process, confidence, max_width, oem, psm)
+        remaining = []
+        if executor is None or len(strips) < 2:
+            for to_process in strips:
+                remaining.extend(
+                    super().process(subs, to_process, *args)
                 )
-            )
+            return remaining
+
+        futures = [
+            executor.submit(_ocr_strip, to_process, *args)
+            for to_process in strips
+        ]
+        for future in futures:
+            sub_items, strip_remaining = future.result()
+            subs.extend(sub_items)
+            remaining.extend(strip_remaining)
         return remaining
 
     def rip(self, post_process: typing.Callable[[str], str]):
@@ -177,31 +280,52 @@ class MyPgsToSrtRipper(PgsToSrtRipper):
             self.max_tess_width,
         )
 
-        remaining = self.process(
-            subs,
-            self.pgs.items,
-            post_process,
-            confidence,
-            max_width,
-            oem,
-            psm,
+        # Workers are given the OCR settings once, then only the items of
+        # each strip, so the other items and their images are not copied.
+        # This runs in a pool job alongside other threads, which are not
+        # safe to fork, so workers are started from a forkserver
+        executor = (
+            ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(MP_START_METHOD),
+                initializer=_init_ocr_worker,
+                initargs=(StripRipper(self),),
+            )
+            if self.workers > 1 else
+            None
         )
-
-        while len(remaining) > 0 and confidence > 0:
-            if len(remaining) < 20:
-                confidence = 0
-            else:
-                confidence -= 5
-
+        try:
             remaining = self.process(
                 subs,
-                remaining,
+                self.pgs.items,
                 post_process,
                 confidence,
                 max_width,
                 oem,
                 psm,
+                executor=executor,
             )
+
+            while len(remaining) > 0 and confidence > 0:
+                if len(remaining) < 20:
+                    confidence = 0
+                else:
+                    confidence -= 5
+
+                remaining = self.process(
+                    subs,
+                    remaining,
+                    post_process,
+                    confidence,
+                    max_width,
+                    oem,
+                    psm,
+                    executor=executor,
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
         if len(remaining) > 0:
             logger.warning('Subtitles were not ripped: %r', remaining)
 
@@ -210,10 +334,40 @@ class MyPgsToSrtRipper(PgsToSrtRipper):
         return subs
 
 
+class StripRipper(PgsToSrtRipper):
+    """
+    OCR settings of a ripper, without its subtitle items
+
+    Holds only what PgsToSrtRipper.process() needs to convert a strip of
+    items, so that it is small enough to send to worker processes.
+
+    """
+
+    def __init__(self, ripper):
+        """
+        Arguments:
+            ripper (PgsToSrtRipper) : Ripper to copy settings from
+
+        """
+
+        self.pgs = None
+        self.gap = ripper.gap
+        self.language_code = ripper.language_code
+        self.tessdata_dir = ripper.tessdata_dir
+        self.omp_thread_limit = ripper.omp_thread_limit
+        # Temporary files are written to a folder of the Pgs object
+        self.keep_temp_files = False
+
+
 class PgsParser:
     """
     Parse information from PGS file
 
+    The file is memory mapped and segments are built from memoryview slices
+    of the map, so no segment data is copied while parsing. The offset of
+    every display set is indexed on first use, so that display sets and
+    subtitle items can be generated for any range of the file.
+
     """
 
     def __init__(self, pgs, lang):
@@ -221,49 +375,205 @@ class PgsParser:
         self.log = logging.getLogger(__name__)
         self.pgs = pgs
         self.media_path = MPath(pgs, lang)
+        self._data = None
+        self._offsets = None
+
+    def __len__(self):
+        """Number of display sets in the file"""
+
+        return len(self.display_set_offsets)
+
+    @property
+    def data(self) -> memoryview:
+        """Contents of the PGS file, mapped into memory on first use"""
+
+        if self._data is None:
+            with open(self.pgs, 'rb') as iid:
+                try:
+                    data = mmap.mmap(iid.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:  # Cannot map empty file
+                    data = b''
+            self._data = memoryview(data)
+        return self._data
+
+    @property
+    def display_set_offsets(self) -> list[int]:
+        """Byte offset of the start of each display set in the file"""
+
+        if self._offsets is None:
+            self._offsets = []
+            start = 0
+            for offset, seg_type, size in self._walk(0, len(self.data)):
+                if seg_type == SegmentType.END.value:
+                    self._offsets.append(start)
+                    start = offset + size
+        return self._offsets
+
+    def gen_segments(self, start: int = 0, end: int | None = None):
+        """
+        Generate segments from PGS file
 
-    def gen_segments(self):
-        """Generate segments from PGS file"""
+        Keyword arguments:
+            start (int) : Byte offset of first segment
+            end (int) : Byte offset to stop at. Default is end of file
+
+        """
 
         self.log.debug('Generating PGS segments')
-        with open(self.pgs, 'rb') as iid:
-            info = iid.read(PGS_HEADER)
-            while info:
-                if info[:2] != b'PG':
-                    break
-                if len(info) < PGS_HEADER:
-                    break
+        data = self.data
+        end = len(data) if end is None else min(end, len(data))
+        for offset, seg_type, size in self._walk(start, end):
+            yield SEGMENT_CLASS[seg_type](data[offset:offset + size])
+
+    def gen_display_sets(self, start: int = 0, stop: int | None = None):
+        """
+        Generate DisplaySet(s) from PGS file
 
-                segment_type = SEGMENT_TYPE[SegmentType(info[10])]
-                size = from_hex(info[-2:])
-                yield segment_type(info + iid.read(size))
-                info = iid.read(PGS_HEADER)
+        Keyword arguments:
+            start (int) : Index of first display set
+            stop (int) : Index of display set to stop before. Default is
+                to generate through end of file
 
-    def gen_display_sets(self):
-        """Generate DisplaySet(s) from PGS file"""
+        """
 
         self.log.debug('Generating display sets')
-        index = 0
+        offsets = self.display_set_offsets
+        if start >= len(offsets):
+            return
+        end = None if stop is None or stop >= len(offsets) else offsets[stop]
+
+        data = self.data
+        end = len(data) if end is None else end
+        index = start
         segments = []
-        for seg in self.gen_segments():
-            segments.append(seg)
-            if seg.type == SegmentType.END:
+        for offset, seg_type, size in self._walk(offsets[start], end):
+            segments.append(
+                SEGMENT_CLASS[seg_type](data[offset:offset + size])
+            )
+            if seg_type == SegmentType.END.value:
                 yield DisplaySet(index, segments)
                 segments = []
                 index += 1
 
-    def gen_pgs_subtitle_items(self):
-        """Generate PgsSubtitleItem(s) from PGS file"""
+    def gen_pgs_subtitle_items(self, start: int = 0, stop: int | None = None):
+        """
+        Generate PgsSubtitleItem(s) from PGS file
+
+        Items are made of a display set that shows a subtitle and the sets
+        that follow it up to the next set that shows one. The index of each
+        item is the index of its first display set.
+
+        Keyword arguments:
+            start (int) : Index of display set to start at; items that
+                started before it are skipped
+            stop (int) : Index of display set to stop before; the last item
+                may include sets after it. Default is through end of file
+
+        """
 
         self.log.debug('Generating subtitle items')
-        index = 0
         sets = []
-        for dis_set in self.gen_display_sets():
-            if sets and dis_set.is_start():
-                yield PgsSubtitleItem(index, self.media_path, sets)
-                sets = []
-                index += 1
-            sets.append(dis_set)
+        for dis_set in self.gen_display_sets(start):
+            if dis_set.is_start():
+                if sets:
+                    yield PgsSubtitleItem(sets[0].index, self.media_path, sets)
+                    sets = []
+                if stop is not None and dis_set.index >= stop:
+                    return
+            if sets or dis_set.is_start():
+                sets.append(dis_set)
+        if sets:
+            yield PgsSubtitleItem(sets[0].index, self.media_path, sets)
+
+    def _walk(self, start: int, end: int):
+        """Generate offset, type, and size of segments from segment headers"""
+
+        unpack = PGS_HEADER_FMT.unpack_from
+        data = self.data
+        offset = start
+        while offset + PGS_HEADER <= end:
+            magic, seg_type, size = unpack(data, offset)
+            if magic != b'PG':
+                self.log.warning('Invalid PGS segment at byte : %d', offset)
+                break
+            size += PGS_HEADER
+            yield offset, seg_type, size
+            offset += size
+
+
+def bitmap_key(item: PgsSubtitleItem, lang: str) -> str | None:
+    """
+    Build cache key identifying the image of a subtitle
+
+    The key is a hash of the decoded image, as passed to OCR, cropped to
+    the rows and columns that differ from the background. Images that
+    differ only in palette entries that render the same, or in the amount
+    of padding around the text, share a key.
+
+    Arguments:
+        item (PgsSubtitleItem) : Subtitle to build key for
+        lang (str) : Language of the subtitle; OCR results depend on it
+
+    Returns:
+        str : The language, size, and hash of the image, or None if the
+            image could not be decoded
+
+    """
+
+    try:
+        data = item.image.data
+    except Exception:
+        return None
+    if data.size == 0:
+        return None
+
+    mask = data != data[0, 0]
+    rows = mask.any(axis=1).nonzero()[0]
+    cols = mask.any(axis=0).nonzero()[0]
+    if rows.size > 0:
+        data = data[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    digest = hashlib.blake2b(data.tobytes(), digest_size=16)
+    return f"{lang}:{data.shape[1]}x{data.shape[0]}:{digest.hexdigest()}"
+
+
+def _init_ocr_worker(ripper):
+    """
+    Set OCR settings for strips converted in a worker process
+
+    Arguments:
+        ripper (StripRipper) : OCR settings
+
+    """
+
+    _OCR_WORKER['ripper'] = ripper
+
+
+def _ocr_strip(items, post_process, confidence, max_width, oem, psm):
+    """
+    OCR one strip of subtitle items in a worker process
+
+    Uses the settings given to _init_ocr_worker(). Subtitles are added to
+    a new SubRipFile as the one from the parent process cannot be shared.
+
+    Returns:
+        tuple : List of SubRipItem(s) converted and list of
+            PgsSubtitleItem(s) that were not
+
+    """
+
+    subs = SubRipFile()
+    remaining = PgsToSrtRipper.process(
+        _OCR_WORKER['ripper'],
+        subs,
+        items,
+        post_process,
+        confidence,
+        max_width,
+        oem,
+        psm,
+    )
+    return list(subs), remaining
 
 
 def rmfile(*args):
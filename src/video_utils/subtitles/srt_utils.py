@@ -11,6 +11,8 @@ import os
 import re
 from datetime import datetime, timedelta
 
+from pysrt import SubRipFile, SubRipItem, SubRipTime
+
 EIGHTH_NOTE = '\xe2\x99\xaa'
 LEFT_SINGLE_QUOTE = '\xe2\x80\x98'
 
@@ -167,6 +169,64 @@ class SRTsubs():
                     fid.write(os.linesep)
 
 
+def srt_cut(
+    fname: str,
+    segments: list[tuple[float, float | None]],
+) -> int:
+    """
+    Keep only subtitles in given segments of the video
+
+    Used when parts of a video (e.g., commercials) are cut out so that
+    the subtitles match the cut video. Subtitles are trimmed to the
+    segments they overlap and moved so that the segments follow one
+    another; a subtitle that spans a cut is split in two.
+
+    Arguments:
+        fname (str): Path to SRT file. This file will be overwritten.
+        segments (list): (start, end) times, in seconds, of the parts of
+            the video that are kept. End may be None for the end of the
+            video.
+
+    Returns:
+        int : Number of subtitles kept
+
+    """
+
+    log = logging.getLogger(__name__)
+    subs = SubRipFile.open(fname, encoding='utf8')
+
+    cut = SubRipFile(path=fname, encoding='utf8')
+    elapsed = 0.0  # Length of cut video before the segment
+    for seg_start, seg_end in segments:
+        seg_end = float('inf') if seg_end is None else seg_end
+        offset = elapsed - seg_start
+        for sub in subs:
+            start = max(sub.start.ordinal / 1000.0, seg_start)
+            end = min(sub.end.ordinal / 1000.0, seg_end)
+            if end <= start:
+                continue
+            cut.append(
+                SubRipItem(
+                    0,
+                    SubRipTime.from_ordinal(round((start + offset) * 1000)),
+                    SubRipTime.from_ordinal(round((end + offset) * 1000)),
+                    sub.text,
+                )
+            )
+        elapsed += seg_end - seg_start
+
+    log.debug(
+        'Kept %d of %d subtitles in %d segments : %s',
+        len(cut),
+        len(subs),
+        len(segments),
+        fname,
+    )
+    cut.clean_indexes()
+    cut.save(fname, encoding='utf8')
+    return len(cut)
+
+
 def srt_cleanup(fname, **kwargs) -> int:
     """
     Fix some known bad characters in SRT file
@@ -8,6 +8,7 @@ import os
 from subprocess import call, DEVNULL, STDOUT
 
 from ..utils.check_cli import check_cli
+from ..utils.timing import timed
 
 CLINAME = 'mkvextract'
 try:
@@ -78,6 +79,7 @@ def gen_sub_info(out_base: str, stream: dict) -> dict | None:
     return None
 
 
+@timed('subtitle_extract')
 def subtitle_extract(
     in_file: str,
     out_base: str,
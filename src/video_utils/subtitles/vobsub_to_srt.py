@@ -6,8 +6,9 @@ Utilities for converting VobSubs to SRT
 import logging
 import os
 
+from .. import POPENPOOL
 from ..utils.check_cli import check_cli
-from ..utils.subproc_pool import PopenThread
+from ..utils.subproc_pool import NORMAL
 from .srt_utils import srt_cleanup
 
 CLINAME = 'vobsub2srt'
@@ -23,6 +24,8 @@ def vobsub_to_srt(
     text_info: dict | None,
     delete_source: bool = False,
     cpulimit: int | None = None,
+    job_class: str = NORMAL,
+    priority: int = 0,
     **kwargs,
 ) -> tuple:
     """
@@ -35,7 +38,11 @@ def vobsub_to_srt(
         None
 
     Keyword arguments:
-        None
+        delete_source (bool): Delete the VobSub files after conversion
+        cpulimit (int): Percentage of CPU to allow vobsub2srt to use;
+            default is the limit of the global subprocess pool
+        job_class (str): Job class of the vobsub2srt process in the pool
+        priority (int): Priority of the process within its job class
 
     Returns:
         int: Updates vobsub_status and creates/updates list of VobSubs that
@@ -74,8 +81,13 @@ def vobsub_to_srt(
         cmd.extend(['--lang', text_info['lang2']])
     cmd.append(basename)
 
-    proc = PopenThread(cmd, cpulimit=cpulimit)
-    proc.start()
+    proc = POPENPOOL.popen_async(
+        cmd,
+        threads=1,
+        cpulimit=cpulimit,
+        job_class=job_class,
+        priority=priority,
+    )
     proc.wait()
     if proc.returncode != 0:
         return 2, ''
@@ -7,7 +7,8 @@ files.
 """
 import logging
 
-from threading import Lock, Event
+from collections import deque
+from threading import Lock, Condition, Event
 from multiprocessing import cpu_count
 
 MAXTHREADS = max(1, cpu_count() - 1)  # Max threads in one less than total
@@ -74,63 +75,34 @@ class NLock:
     than one (1). This allows locking for processes that require more than one
     thread to run.
 
-    Note:
-        This is not perfect and, because of how events are 'queued', more
-        threads than specified could start. For example, say 2 threads are
-        allowed in the NLock object:
-        code-block::
-
-           LOCK = NLock(2)
-
-        Now, image two (2) processes, each requiring one (1) thread, acquire
-        the lock
-        code-block::
-
-           if LOCK.acquire( threads = 1 ):
-             ...process1...
-           if LOCK.acquire( threads = 1 ):
-             ...process2...
-
-        While those are running, say a third (3rd) process that requries
-        two (2) threads tries to get the lock
-        code-block::
-
-            if LOCK.acquire( threads = 2 ):
-              ...process3...
-
-        Now, this call to acquire() for process3 will block, but only until
-        one (1) of the single threaded processes finish (process1 or process2).
-        Say process1 is very long running and process2 is fairly short.
-        In this case, process2 will finish, releasing the lock, allowing
-        process3 to start.
-
-        The issue in this case is that the NLock object has now allowed
-        three (3) threads to run instead of only allowing two (2).
-
-        This issue will only be encountered if acquire is called with varying
-        thread counts.
+    Waiters are admitted in the order they called acquire(), and a waiter is
+    only admitted once the number of threads it requests is free, so the
+    number of threads in use never exceeds the number allowed. The one
+    exception is a request for more threads than are allowed, which is
+    admitted once no other threads are in use so that it cannot block
+    forever. Waiters are woken as soon as threads are released.
 
     """
 
-    __n = 0
-    __threads = 0
-
     def __init__(self, threads=None):
         self.log = logging.getLogger(__name__)
-        self.__lock1 = Lock()
-        self.__lock2 = Lock()
+        self.__cond = Condition(Lock())
+        self.__waiters = deque()
+        self.__n = 0
+        self.__threads = 0
         self.threads = threads
 
     @property
     def n(self):
-        """Count of threads trying to acquire lock"""
+        """Count of threads currently acquired"""
 
         return self.__n
 
-    @n.setter
-    def n(self, val):
+    @property
+    def waiting(self):
+        """Count of callers waiting to acquire lock"""
 
-        self.__set_n(val)
+        return len(self.__waiters)
 
     @property
     def threads(self):
@@ -141,18 +113,11 @@ class NLock:
     @threads.setter
     def threads(self, val):
 
-        self.__set_threads(val)
-
-    @classmethod
-    def __set_threads(cls, val):
-
         val, maxt = thread_check(val)
-        cls.__threads = maxt if val is None else val
-
-    @classmethod
-    def __set_n(cls, val):
-
-        cls.__n = val
+        with self.__cond:
+            self.__threads = maxt if val is None else val
+            # Number allowed may have increased, so check waiters
+            self.__cond.notify_all()
 
     def __enter__(self, *args, **kwargs):
         self.acquire(*args, **kwargs)
@@ -163,9 +128,9 @@ class NLock:
     def locked(self):
         """Returns True if locked, False otherwise"""
 
-        return self.__lock2.locked()
+        return self.__n >= self.__threads
 
-    def acquire(self, *args, **kwargs):
+    def acquire(self, blocking=True, timeout=-1, threads=None):
         """
         Allows for n grabs to lock
 
@@ -175,39 +140,46 @@ class NLock:
         forever unless keywords are passed
 
         Arguments:
-            *args: Accepts all inputs from threading.Lock.aquire()
+            blocking (bool): If False, do not block if the lock cannot be
+                acquired immediately; see threading.Lock.acquire()
 
         Keyword arguments:
+            timeout (float): Maximum time to block for; a negative value
+                blocks forever. See threading.Lock.acquire()
             threads (int): Specifies the number of 'locks' to acquire.
-                default 1.
                 When using this class to block number of processes,
                 this is used when a process will use more than one
-                thread.
-            **kwargs: All other keywords for threading.Lock.aquire()
+                thread. If not an int, lock is not acquired and True is
+                returned.
 
         Returns:
             bool: True if lock acquired, False otherwise
 
         """
 
-        threads = kwargs.pop('threads', None)
         if not isinstance(threads, int):
             return True
 
         threads = max(threads, 1)
-
-        # Increment number of locks to grab
-        with self.__lock1:
-            self.n += threads
-            check = self.n >= self.threads
-
-        # If check is true and fail to acqurie the lock
-        if check and not self.__lock2.acquire(*args, **kwargs):
-            with self.__lock1:
-                self.n -= threads  # Decement n grabs
-            return False
-
-        return True
+        if not blocking:
+            timeout = 0
+        elif timeout is None or timeout < 0:
+            timeout = None
+
+        ticket = object()
+        with self.__cond:
+            self.__waiters.append(ticket)
+            acquired = self.__cond.wait_for(
+                lambda: self.__can_acquire(ticket, threads),
+                timeout=timeout,
+            )
+            self.__waiters.remove(ticket)
+            if acquired:
+                self.__n += threads
+            # The next waiter in line may now be at the head
+            self.__cond.notify_all()
+
+        return acquired
 
     def release(self, threads=None):
         """
@@ -218,27 +190,24 @@ class NLock:
 
         Keyword arguments:
             threads (int): Specifies the number of 'locks' to release.
-                default 1.
-                When using this class to block number of processes,
-                this is used when a process will use more than one
-                thread.
+                This should match the value passed to acquire(). If not an
+                int, nothing is released.
+
         Returns:
             None
 
         """
 
-        # Get lock1 to ensure no other process changes __n
-        with self.__lock1:
-            if not isinstance(threads, int):
-                threads = 1
-            threads = max(threads, 1)
-
-            if self.n < threads:
-                self.n = 0
-            else:
-                # Decrement __n by threads
-                self.n -= threads
-
-            # If lock2 is locked
-            if self.__lock2.locked():
-                self.__lock2.release()
+        if not isinstance(threads, int):
+            return
+
+        with self.__cond:
+            self.__n = max(self.__n - max(threads, 1), 0)
+            self.__cond.notify_all()
+
+    def __can_acquire(self, ticket, threads):
+        """Check if waiter is first in line and requested threads are free"""
+
+        if self.__waiters[0] is not ticket:
+            return False
+        return self.__n == 0 or self.__n + threads <= self.__threads
@@ -0,0 +1,288 @@
+"""
+On-disk cache for expensive results
+
+A small key/value store backed by SQLite. Values are stored as JSON and
+entries are evicted in least-recently-used order once the cache grows
+beyond a set number of entries. Each cache lives in its own table so a
+single database file can hold several caches.
+
+"""
+
+import logging
+import os
+import re
+import json
+import hashlib
+import time
+import sqlite3
+from contextlib import contextmanager
+from threading import Lock
+
+from ..config import PROBECACHE
+
+# Default maximum number of entries to keep in a cache table
+MAX_ENTRIES = 10000
+# Time (seconds) to wait for database lock held by another process
+DB_TIMEOUT = 30.0
+# Valid table names
+TABLEPAT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+# Number of blocks, spread over the file, hashed by content_key()
+SAMPLE_BLOCKS = 16
+# Size (bytes) of each block hashed by content_key()
+SAMPLE_SIZE = 64 * 1024
+
+
+def file_key(fpath: str) -> tuple[int] | None:
+    """
+    Build cache key identifying a file on disk
+
+    The key changes whenever the file is replaced or modified, so stale
+    entries are never returned for a changed file.
+
+    Arguments:
+        fpath (str) : Path to file
+
+    Keyword arguments:
+        None.
+
+    Returns:
+        tuple : The (device, inode, size, mtime_ns) of the file, or None
+            if the file could not be stat'ed
+
+    """
+
+    try:
+        info = os.stat(fpath)
+    except OSError:
+        return None
+    return (info.st_dev, info.st_ino, info.st_size, info.st_mtime_ns)
+
+
+def content_key(
+    fpath: str,
+    samples: int = SAMPLE_BLOCKS,
+    block_size: int = SAMPLE_SIZE,
+) -> str | None:
+    """
+    Build cache key identifying the contents of a file
+
+    Unlike file_key(), the key does not depend on the path, inode, or
+    modification time of the file, so it is the same for a copy, hard link,
+    or renamed version of the file. Only the size and a hash of blocks
+    sampled evenly through the file, always including the first and last
+    block, are used, so the key is fast to compute for large files.
+
+    Arguments:
+        fpath (str) : Path to file
+
+    Keyword arguments:
+        samples (int) : Number of blocks to hash
+        block_size (int) : Size, in bytes, of each block
+
+    Returns:
+        str : The size and hash of the file, or None if the file could not
+            be read
+
+    """
+
+    try:
+        size = os.path.getsize(fpath)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(fpath, mode='rb') as fid:
+            if size <= samples * block_size:
+                digest.update(fid.read())
+            else:
+                step = (size - block_size) / (samples - 1)
+                for i in range(samples):
+                    fid.seek(int(i * step))
+                    digest.update(fid.read(block_size))
+    except OSError:
+        return None
+    return f"{size}:{digest.hexdigest()}"
+
+
+class SQLiteCache:
+    """LRU key/value cache stored in SQLite database"""
+
+    def __init__(
+        self,
+        table: str,
+        dbfile: str = PROBECACHE,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        """
+        Arguments:
+            table (str) : Name of table to store entries in
+
+        Keyword arguments:
+            dbfile (str) : Path to SQLite database file
+            max_entries (int) : Maximum number of entries to keep; least
+                recently used entries are removed beyond this
+
+        Returns:
+            A SQLiteCache instance
+
+        """
+
+        if not TABLEPAT.match(table):
+            raise ValueError(f"Invalid table name : {table}")
+
+        self.__log = logging.getLogger(__name__)
+        self.__lock = Lock()
+        self.table = table
+        self.dbfile = dbfile
+        self.max_entries = max_entries
+        self.__ready = False
+
+    def get(self, key):
+        """
+        Get value from the cache
+
+        Arguments:
+            key : JSON serializable key for the entry
+
+        Keyword arguments:
+            None.
+
+        Returns:
+            The cached value, or None if not in cache
+
+        """
+
+        key = self._key(key)
+        with self.__lock:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        f"SELECT value FROM {self.table} WHERE key = ?",
+                        (key,),
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    conn.execute(
+                        f"UPDATE {self.table} SET atime = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                return json.loads(row[0])
+            except Exception as err:
+                self.__log.debug('Cache lookup failed : %s', err)
+        return None
+
+    def set(self, key, value) -> bool:
+        """
+        Add or replace value in the cache
+
+        Arguments:
+            key : JSON serializable key for the entry
+            value : JSON serializable value to store
+
+        Keyword arguments:
+            None.
+
+        Returns:
+            bool : True if value stored, False otherwise
+
+        """
+
+        key = self._key(key)
+        with self.__lock:
+            try:
+                value = json.dumps(value)
+                with self._connect() as conn:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self.table} "
+                        "(key, value, atime) VALUES (?, ?, ?)",
+                        (key, value, time.time()),
+                    )
+                    self._evict(conn)
+            except Exception as err:
+                self.__log.debug('Cache store failed : %s', err)
+                return False
+        return True
+
+    def invalidate(self, key) -> None:
+        """
+        Remove entry from the cache
+
+        Arguments:
+            key : JSON serializable key for the entry
+
+        Keyword arguments:
+            None.
+
+        Returns:
+            None.
+
+        """
+
+        key = self._key(key)
+        with self.__lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        f"DELETE FROM {self.table} WHERE key = ?",
+                        (key,),
+                    )
+            except Exception as err:
+                self.__log.debug('Cache invalidate failed : %s', err)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache"""
+
+        with self.__lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute(f"DELETE FROM {self.table}")
+            except Exception as err:
+                self.__log.debug('Cache clear failed : %s', err)
+
+    def _key(self, key) -> str:
+        """Serialize key to string for use in the database"""
+
+        return json.dumps(key)
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open connection to the database
+
+        A new connection is opened for every operation so that the cache
+        may be used from any thread. The connection is committed and closed
+        on exit and the table is created on first use.
+
+        """
+
+        if not self.__ready:
+            os.makedirs(os.path.dirname(self.dbfile), exist_ok=True)
+
+        conn = sqlite3.connect(self.dbfile, timeout=DB_TIMEOUT)
+        try:
+            with conn:
+                if not self.__ready:
+                    conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                        "key TEXT PRIMARY KEY, "
+                        "value TEXT NOT NULL, "
+                        "atime REAL NOT NULL)"
+                    )
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {self.table}_atime "
+                        f"ON {self.table} (atime)"
+                    )
+                    self.__ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Remove least recently used entries beyond max_entries"""
+
+        if not isinstance(self.max_entries, int) or self.max_entries < 1:
+            return
+
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY atime DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
@@ -8,16 +8,27 @@ import os
 import time
 import re
 import json
+import copy
+import tempfile
 from datetime import datetime, timedelta
+from threading import Thread, Lock
 from subprocess import Popen, run, check_output, PIPE, STDOUT, DEVNULL
 
 import numpy as np
 
 from .. import POPENPOOL
 from . import isRunning
+from .cache import SQLiteCache, file_key
+from .timing import timed
 
 # Regex pattern for locating file duration in ffmpeg ouput
 PROGPAT = re.compile(r'time=(\d{2}:\d{2}:\d{2}.\d{2})')
+# Regex pattern for a 'key=value' line of '-progress' output; the stats
+# lines ffmpeg writes to stderr have several 'key=value' pairs on a line
+PROGRESS_LINE = re.compile(
+    r'^(frame|fps|stream_\d+_\d+_q|bitrate|total_size|out_time_us|'
+    r'out_time_ms|out_time|dup_frames|drop_frames|speed|progress)=([^=]*)$'
+)
 # Regex pattern for extracting crop information
 CROPPAT = re.compile(r'(?:crop=(-?\d+):(-?\d+):(-?\d+):(-?\d+))')
 # Regex pattern for video resolution
@@ -28,11 +39,6 @@ DURPAT = re.compile(r'Duration: ([^,]*)')
 # String formatter for conversion progress
 ESTCOMP = 'Estimated Completion Time: %s'
 
-# Array for conversion of hour/minutes/seconds to total seconds
-TOSEC = np.array([3600, 60, 1], dtype=np.float32)
-# Base numpy chunk
-CHUNK = np.full((128, 4), np.nan)
-
 # Default time_base for chapters
 TIME_BASE = '1/1000000000'
 # Padding before beginning of chapter
@@ -40,9 +46,22 @@ PREROLL = -1.0
 # Padding after end of chapter
 POSTROLL = 1.0
 
+# Number of video packets to read when locating keyframe near given time
+KEYFRAME_PACKETS = 8
+# Seconds of video packets to read when locating keyframe after given time
+KEYFRAME_WINDOW = 15.0
+# Minimum length (seconds) of a segment for segmented transcoding
+MIN_SEGMENT = 60.0
+# Number of packets to decode when probing for first video frame
+PROBE_PACKETS = 32
+# On-disk cache of ffprobe output
+PROBE_CACHE = SQLiteCache('ffprobe')
+
 # Threshold for cropping. If the ratio of crop size to original is >= this
 # value, no cropping done. The width and height are check separately
 CROPTHRES = 0.95
+# Number of segments to sample across video for crop detection
+CROP_SAMPLES = 8
 
 # Format for FFMETADATA file header
 HEADERFMT = ';FFMETADATA{}' + os.linesep
@@ -139,10 +158,11 @@ class FFMetaData:
         if len(args) == 1:
             chapter = args[0]
         elif len(args) == 3:
-            if isinstance(args[0], timedelta):
-                start = args[0].total_seconds()
-            if isinstance(args[1], timedelta):
-                end = args[1].total_seconds()
+            start, end = args[:2]
+            if isinstance(start, timedelta):
+                start = start.total_seconds()
+            if isinstance(end, timedelta):
+                end = end.total_seconds()
 
             chapter = Chapter()
             time_base = kwargs.get('time_base', TIME_BASE)
@@ -408,11 +428,113 @@ class Chapter:
             self.start_time += offset  # Offset start time
 
 
+class ProbeResult:
+    """
+    Results of probing a media file with ffprobe
+
+    Wraps the stream, format, chapter, and first video frame information
+    returned by :func:`probe` so that all of this information is collected
+    from a single ffprobe call.
+
+    """
+
+    def __init__(self, data: dict | None = None):
+        self._data = data if isinstance(data, dict) else {}
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} : {len(self.streams)} stream(s), "
+            f"{len(self._data.get('chapters', []))} chapter(s)>"
+        )
+
+    @property
+    def data(self) -> dict:
+        """Raw ffprobe JSON output"""
+
+        return self._data
+
+    @property
+    def streams(self) -> list[dict]:
+        """Information for all streams in the file"""
+
+        return self._data.get('streams', [])
+
+    @property
+    def format(self) -> dict:
+        """Container information"""
+
+        return self._data.get('format', {})
+
+    @property
+    def duration(self) -> float | None:
+        """Duration of the file in seconds"""
+
+        try:
+            return float(self.format['duration'])
+        except:
+            return None
+
+    @property
+    def start_time(self) -> float:
+        """Start time of the file in seconds"""
+
+        try:
+            return float(self.format['start_time'])
+        except:
+            return 0.0
+
+    @property
+    def chapters(self) -> list[Chapter]:
+        """
+        Chapters in the file
+
+        New Chapter objects are created on every access so that they
+        may be modified without changing the probe results.
+
+        """
+
+        return [
+            Chapter(copy.deepcopy(chap))
+            for chap in self._data.get('chapters', [])
+        ]
+
+    @property
+    def video_frame(self) -> dict | None:
+        """Information, including side data, of the first video frame"""
+
+        for frame in self._data.get('frames', []):
+            if frame.get('media_type') == 'video':
+                return frame
+        return None
+
+    def get_streams(self, codec_type: str) -> list[dict]:
+        """
+        Get streams of given type
+
+        Arguments:
+            codec_type (str) : Type of stream; e.g., video, audio, subtitle
+
+        Keyword arguments:
+            None.
+
+        Returns:
+            list : Information for all streams of the given type
+
+        """
+
+        return [
+            stream
+            for stream in self.streams
+            if stream.get('codec_type') == codec_type
+        ]
+
+
 def cropdetect_cmd(
     infile: str,
     start_time: timedelta,
     seg_len: timedelta,
     threads: int | None,
+    keyframes: bool = False,
 ) -> list[str]:
     """
     Generate ffmpeg command list for crop detection
@@ -424,7 +546,7 @@ def cropdetect_cmd(
         threads (int) : number of threads to let ffmpeg use
 
     Keyword arguments:
-        None.
+        keyframes (bool) : If set, only decode keyframes
 
     Returns:
         list : Command to be run using subprocess.Popen
@@ -437,40 +559,92 @@ def cropdetect_cmd(
         raise Exception('seg_len must be datetime.timedelta object')
 
     # Return the list with command
-    cmd = ['ffmpeg', '-nostats']
+    cmd = ['ffmpeg', '-nostdin', '-nostats']
 
     if isinstance(threads, int):
         cmd = cmd + ['-threads', str(threads)]
 
+    if keyframes:
+        cmd = cmd + ['-skip_frame', 'nokey']
+
     return cmd + [
         '-ss', str(start_time),
         '-i', infile,
         '-max_muxing_queue_size', '1024',
         '-t', str(seg_len),
         '-vf', 'cropdetect',
+        '-an', '-sn', '-dn',
         '-f', 'null',
         '-',
     ]
 
 
+def crop_sample_times(
+    duration: float,
+    samples: int,
+    seg_len: int | float,
+) -> list[float]:
+    """
+    Evenly spaced start times for crop detection probes
+
+    Each probe is centered in one of samples equal-length windows of the
+    video so that the opening and closing credits are not over-sampled.
+
+    Arguments:
+        duration (float) : Length of the video in seconds
+        samples (int) : Number of probes to run
+        seg_len (float) : Length, in seconds, of each probe
+
+    Keyword arguments:
+        None.
+
+    Returns:
+        list : Start times, in seconds, of the probes
+
+    """
+
+    samples = max(int(samples), 1)
+    step = duration / samples
+    times = []
+    for i in range(samples):
+        start = max(step * (i + 0.5) - seg_len / 2.0, 0.0)
+        if len(times) == 0 or start > times[-1]:
+            times.append(start)
+    return times
+
+
+@timed('cropdetect')
 def cropdetect(
     infile: str,
     video_res: tuple[int] | None,
     seg_len: int | float = 20,
     threads: int | None = None,
+    samples: int = CROP_SAMPLES,
+    keyframes: bool = False,
+    duration: float | None = None,
 ) -> str | None:
     """
     Use FFmpeg to to detect a cropping region for video files
 
+    Crop detection is run on samples short segments of the video spread
+    evenly across its length. All probes are submitted to the PopenPool at
+    once so that they run in parallel, and the crop values from all probes
+    are combined before the crop region is determined.
+
     Arguments:
         infile (str): Path to input file for crop detection
         video_res (tuple): Tuple of ints specifying the video width/height
 
     Keyword arguments:
-        seg_len : Length of video, in seconds, starting from beginning to use
-            for crop detection, default is 20 seconds
-        threads (int): Number of threads to use when running ffmpeg to
-            detect crop
+        seg_len : Length, in seconds, of each segment used for crop
+            detection, default is 20 seconds
+        threads (int): Total number of threads to use when running ffmpeg
+            to detect crop; these are split between the probes
+        samples (int): Number of segments to sample across the video
+        keyframes (bool): If set, only keyframes are decoded; much faster
+            but fewer frames are checked
+        duration (float): Length of the video in seconds. If not set, it
+            is determined using :func:`get_video_length`
 
     Returns:
         FFmpeg video filter in the format :code:`crop=w:h:x:y` or
@@ -480,50 +654,62 @@ def cropdetect(
 
     log = logging.getLogger(__name__)
 
-    # Counter for number of crop regions detected
-    n_crop = 0
-    # Initialize list of 4 lists for crop parameters
-    whxy = [[] for i in range(4)]
-    seg_len = timedelta(seconds=seg_len)
-    start_time = timedelta(seconds=0)
-    crop = CHUNK.copy()
-
-    log.debug('Detecting crop using chunks of length %s', seg_len)
-
-    detect = True
-    while detect and isRunning():
-        detect = False
-        log.debug('Checking crop starting at %s', start_time)
-        # Generate command for crop detection
-        cmd = cropdetect_cmd(infile, start_time, seg_len, threads)
-        # Start the command, piping stdout and stderr to a pipe
-        with Popen(
+    if duration is None:
+        duration = get_video_length(infile)
+
+    starts = crop_sample_times(duration, samples, seg_len)
+    if isinstance(threads, int):
+        threads = max(threads // len(starts), 1)
+    else:
+        threads = 1
+
+    log.debug(
+        'Detecting crop using %d segment(s) of length %s s',
+        len(starts),
+        seg_len,
+    )
+
+    probes = []
+    for start_time in starts:
+        fid, log_file = tempfile.mkstemp(suffix='.log', prefix='cropdetect_')
+        os.close(fid)
+        cmd = cropdetect_cmd(
+            infile,
+            timedelta(seconds=start_time),
+            timedelta(seconds=seg_len),
+            threads,
+            keyframes=keyframes,
+        )
+        proc = POPENPOOL.popen_async(
             cmd,
-            stdout=PIPE,
-            stderr=STDOUT,
+            threads=threads,
+            stderr=log_file,
             universal_newlines=True,
-        ) as proc:
-            line = " "
-            while line != '':
-                line = proc.stdout.readline()
-                # Try to find pattern in line
-                whxy = CROPPAT.search(line)
-                if not whxy:
-                    continue
-
-                if not detect:
-                    detect = True
-                # If the current row is outside of the number of rows
-                if n_crop == crop.shape[0]:
-                    # Concat a new chunk onto the array
-                    crop = np.concatenate([crop, CHUNK], axis=0)
-                # Split the string on colon
-                crop[n_crop, :] = np.array(
-                    tuple(map(int, whxy.groups()))
-                )
-                n_crop += 1
+        )
+        probes.append((proc, log_file))
+
+    # Initialize list of crop parameters
+    crop = []
+    for proc, log_file in probes:
+        proc.wait()
+        try:
+            with open(log_file, mode='r', encoding='utf8') as iid:
+                for line in iid:
+                    whxy = CROPPAT.search(line)
+                    if whxy:
+                        crop.append(tuple(map(int, whxy.groups())))
+        except OSError as err:
+            log.warning('Failed to read crop detection output: %s', err)
+        try:
+            os.remove(log_file)
+        except:
+            pass
+
+    if not isRunning() or len(crop) == 0:
+        log.debug('No valid cropping values detected')
+        return None
 
-        start_time += timedelta(seconds=60 * 5)
+    crop = np.asarray(crop, dtype=np.float64)
 
     # Compute maximum across all values
     good, _ = np.where(crop[:, :2] > 0)
@@ -591,19 +777,15 @@ def total_seconds(*args) -> list:
         None.
 
     Returns:
-        Returns a numpy array of total number of seconds in time
+        list : Total number of seconds in each time
 
     """
 
-    # Iterate over all arugments, splitting on colon (:), converting to numpy
-    # array, and converting each time element to seconds
-    times = [
-        np.array(arg.split(':'), dtype=np.float32) * TOSEC
-        for arg in args
-    ]
-    # Convert list of numpy arrays to 2D numpy array, then compute sum of
-    # seconds across second dimension
-    return np.array(times).sum(axis=1).tolist()
+    times = []
+    for arg in args:
+        hours, mins, secs = arg.split(':')
+        times.append(int(hours) * 3600 + int(mins) * 60 + float(secs))
+    return times
 
 
 class FFmpegProgress:
@@ -613,9 +795,22 @@ class FFmpegProgress:
     Class for monitoring output from ffmpeg to determine how much
     time remains in the conversion.
 
+    The preferred source of progress is the key=value output that ffmpeg
+    writes with the '-progress pipe:1' option. An instance can be passed
+    as stdout to subprocess.Popen (or PopenPool.popen_async, using the
+    progress keyword) and the progress blocks are parsed as they arrive.
+    The latest values are available through the properties of the
+    instance; e.g., out_time, speed, and eta. Lines of regular ffmpeg
+    stderr output passed to progress() are also understood.
+
     """
 
-    def __init__(self, interval: float = 60.0, nintervals: int | None = None):
+    def __init__(
+        self,
+        interval: float | None = 60.0,
+        nintervals: int | None = None,
+        duration: float | None = None,
+    ):
         """
 
         Arguments:
@@ -624,6 +819,7 @@ class FFmpegProgress:
         Keyword arguments:
             interval (float): The update interval, in seconds, to log time
                 remaining info. Default is sixty (60) seconds, or 1 minute.
+                Set to None to disable logging.
             nintervals (int): Set to number of updates you would like to be
                 logged about progress. Default is to log as many updates as
                 it takes at the interval requested. Setting this keyword will
@@ -632,6 +828,9 @@ class FFmpegProgress:
                 first log, after which point the interval will be updated
                 based on the remaing conversion time and the requested
                 number of updates
+            duration (float): Duration, in seconds, of the output. Required
+                for the ETA when using '-progress' output, as the input
+                duration is only reported on stderr
 
         Returns:
             Object
@@ -641,9 +840,126 @@ class FFmpegProgress:
         self.log = logging.getLogger(__name__)
         # Initialize t0 and t1 to the same time; i.e., now
         self.time0 = self.time1 = time.time()
-        self.dur = None
+        self.dur = duration
         self.interval = interval
         self.nintervals = nintervals
+        self.rw = None
+        self.__lock = Lock()
+        self.__block = {}
+        self.__values = {}
+        self.__thread = None
+
+    @property
+    def values(self) -> dict:
+        """Raw key/value pairs of the latest progress block"""
+
+        with self.__lock:
+            return dict(self.__values)
+
+    @property
+    def out_time(self) -> float | None:
+        """Seconds of output written"""
+
+        values = self.values
+        if 'out_time_us' in values:
+            return _to_float(values['out_time_us'], 1.0e-6)
+        if 'out_time' in values:
+            return total_seconds(values['out_time'])[0]
+        return None
+
+    @property
+    def frame(self) -> int | None:
+        """Number of frames written"""
+
+        return _to_int(self.values.get('frame'))
+
+    @property
+    def fps(self) -> float | None:
+        """Frames per second being processed"""
+
+        return _to_float(self.values.get('fps'))
+
+    @property
+    def speed(self) -> float | None:
+        """Seconds of output written per second of wall time"""
+
+        return _to_float(self.values.get('speed', '').rstrip('x'))
+
+    @property
+    def bitrate(self) -> float | None:
+        """Bit rate of the output in kbit/s"""
+
+        return _to_float(self.values.get('bitrate', '').split('kbits')[0])
+
+    @property
+    def drop_frames(self) -> int | None:
+        """Number of frames dropped"""
+
+        return _to_int(self.values.get('drop_frames'))
+
+    @property
+    def dup_frames(self) -> int | None:
+        """Number of frames duplicated"""
+
+        return _to_int(self.values.get('dup_frames'))
+
+    @property
+    def finished(self) -> bool:
+        """True once ffmpeg has reported the end of processing"""
+
+        return self.values.get('progress') == 'end'
+
+    @property
+    def percent(self) -> float | None:
+        """Percent of the output written"""
+
+        out_time = self.out_time
+        if not self.dur or out_time is None:
+            return None
+        return min(100.0 * out_time / self.dur, 100.0)
+
+    @property
+    def eta(self) -> float | None:
+        """Estimated number of seconds until processing finishes"""
+
+        out_time = self.out_time
+        if not self.dur or not out_time:
+            return None
+        if self.finished:
+            return 0.0
+
+        speed = self.speed
+        if not speed:
+            # Fall back to average rate since the start
+            speed = out_time / max(time.time() - self.time0, 1.0e-6)
+        return max(self.dur - out_time, 0.0) / speed
+
+    @property
+    def end_time(self) -> datetime | None:
+        """Estimated time at which processing finishes"""
+
+        eta = self.eta
+        if eta is None:
+            return None
+        return datetime.now() + timedelta(seconds=eta)
+
+    def snapshot(self) -> dict:
+        """
+        Get current progress
+
+        Returns:
+            dict : The out_time, frame, fps, speed, bitrate, drop_frames,
+                dup_frames, percent, and eta
+
+        """
+
+        return {
+            key: getattr(self, key)
+            for key in (
+                'out_time', 'frame', 'fps', 'speed', 'bitrate',
+                'drop_frames', 'dup_frames', 'percent', 'eta',
+            )
+        }
 
     def progress(self, in_val):
         """Get progress of FFMpeg transcode"""
@@ -653,6 +969,48 @@ class FFmpegProgress:
         else:
             self._process_line(in_val)
 
+    def fileno(self):
+        """
+        Get write end of pipe to pass as stdout to subprocess
+
+        Lines written to the pipe are parsed in a separate thread, which
+        stops once the pipe is closed; see close().
+
+        """
+
+        if not self.rw:
+            self.rw = os.pipe()
+            # Read end is owned by the thread, as close() may be called
+            # before the thread starts
+            self.__thread = Thread(
+                target=self._read,
+                args=(self.rw[0],),
+                daemon=True,
+            )
+            self.__thread.start()
+        return self.rw[1]
+
+    def close(self):
+        """Close the write end of pipe opened by fileno()"""
+
+        if self.rw:
+            os.close(self.rw[1])
+            self.rw = None
+
+    def _read(self, rfd: int):
+        """Parse lines read from the pipe, closing the pipe when done"""
+
+        fid = None
+        try:
+            fid = os.fdopen(rfd)
+            for line in fid:
+                self._process_line(line)
+        finally:
+            if fid is None:
+                os.close(rfd)
+            else:
+                fid.close()
+
     def _subprocess(self, proc):
         if proc.stdout is None:
             self.log.error(
@@ -674,6 +1032,19 @@ class FFmpegProgress:
 
     def _process_line(self, line):
 
+        progress = PROGRESS_LINE.match(line.strip())
+        if progress:
+            # Line of '-progress' output; each block ends with 'progress'
+            key, value = progress.groups()
+            self.__block[key] = value.strip()
+            if key != 'progress':
+                return
+            with self.__lock:
+                self.__values = self.__block
+            self.__block = {}
+            self._report()
+            return
+
         # If the file duration has NOT been set yet
         if self.dur is None:
             # Try to find the file duration pattern in the line
@@ -681,33 +1052,57 @@ class FFmpegProgress:
             if len(matches) == 1:
                 # Compute the total number of seconds in the file,
                 # take element zero as returns list
-                self.dur = total_seconds(matches[0])[0]
-        # Else, if the amount of time between the last logging and now is
+                try:
+                    self.dur = total_seconds(matches[0])[0]
+                except ValueError:
+                    pass
+            return
+
+        # Look for progress time in the line
+        matches = PROGPAT.findall(line)
+        if len(matches) > 0:
+            with self.__lock:
+                self.__values = {'out_time': matches[-1]}
+            self._report()
+
+    def _report(self):
+        """Log estimated completion time every interval"""
+
+        if self.interval is None:
+            return
+        # If the amount of time between the last logging and now is
         # greater or equal to the interval
-        elif (time.time() - self.time1) >= self.interval:
-            # Update the time at which we are logging
-            self.time1 = time.time()
-            # Look for progress time in the line
-            matches = PROGPAT.findall(line)
-            # If progress NOT found; or multiple found, return
-            if len(matches) == 0:
-                return
-            # Compute the elapsed time
-            elapsed = self.time1 - self.time0
-            # Compute total number of seconds comverted so far, take element
-            # zero as returns list
-            prog = total_seconds(matches[-1])[0]
-            # Ratio of real-time seconds per seconds of video processed
-            ratio = elapsed / prog
-            # Multiply ratio by the number of seconds of video left to convert
-            remain = ratio * (self.dur - prog)
-            # Compute estimated completion time
-            end_time = datetime.now() + timedelta(seconds=remain)
-            # Log information
-            self.log.info(ESTCOMP, end_time)
-            if (self.nintervals is not None) and (self.nintervals > 1):
-                self.nintervals -= 1
-                self.interval = remain / float(self.nintervals)
+        if (time.time() - self.time1) < self.interval:
+            return
+
+        remain = self.eta
+        if remain is None or self.finished:
+            return
+
+        # Update the time at which we are logging
+        self.time1 = time.time()
+        self.log.info(ESTCOMP, datetime.now() + timedelta(seconds=remain))
+        if (self.nintervals is not None) and (self.nintervals > 1):
+            self.nintervals -= 1
+            self.interval = remain / float(self.nintervals)
+
+
+def _to_float(val, scale: float = 1.0) -> float | None:
+    """Convert progress value to float; None if not a number"""
+
+    try:
+        return float(val) * scale
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(val) -> int | None:
+    """Convert progress value to int; None if not a number"""
+
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
 
 
 def progress(
@@ -797,15 +1192,91 @@ def progress(
     return
 
 
-def get_video_length(in_file: str) -> float:
-    """Returns float length of video, in seconds"""
+def probe(fpath: str, cache: bool = True) -> ProbeResult | None:
+    """
+    Probe media file for streams, format, chapters, and first video frame
 
-    with Popen(['ffmpeg', '-i', in_file], stdout=PIPE, stderr=STDOUT) as proc:
-        info = proc.stdout.read().decode()
-    dur = DURPAT.findall(info)
-    if len(dur) == 1:
-        hour, minute, second = [float(i) for i in dur[0].split(':')]
-        return hour * 3600.0 + minute * 60.0 + second
+    All information is collected from a single ffprobe call. Results are
+    cached on disk, keyed on the identity of the file, so repeated probes
+    of an unchanged file do not spawn another process.
+
+    Arguments:
+        fpath (str): Path of file to probe
+
+    Keyword arguments:
+        cache (bool): If set, use the on-disk probe cache
+
+    Returns:
+        ProbeResult : Information about the file, or None if ffprobe failed
+
+    """
+
+    log = logging.getLogger(__name__)
+
+    key = file_key(fpath) if cache else None
+    if key is not None:
+        data = PROBE_CACHE.get(key)
+        if data is not None:
+            return ProbeResult(data)
+
+    cmd = [
+        'ffprobe',
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        '-show_chapters',
+        '-show_frames',
+        '-read_intervals', f'%+#{PROBE_PACKETS}',
+        '-i', fpath,
+    ]
+    try:
+        data = json.loads(
+            check_output(cmd)
+        )
+    except Exception as err:
+        log.error('Failed to probe file: %s', err)
+        return None
+
+    # Only the first video frame is needed; it holds the HDR side data
+    frames = [
+        frame
+        for frame in data.get('frames', [])
+        if frame.get('media_type') == 'video'
+    ]
+    data['frames'] = frames[:1]
+
+    if key is not None:
+        PROBE_CACHE.set(key, data)
+
+    return ProbeResult(data)
+
+
+def get_video_length(
+    in_file: str,
+    probe_result: ProbeResult | None = None,
+) -> float:
+    """
+    Returns float length of video, in seconds
+
+    Arguments:
+        in_file (str): Path of file to get length of
+
+    Keyword arguments:
+        probe_result (ProbeResult): Result of :func:`probe` for the file;
+            file is probed if not set
+
+    Returns:
+        float : Length of the file; 86400 seconds if it could not be
+            determined
+
+    """
+
+    if probe_result is None:
+        probe_result = probe(in_file)
+    if probe_result is not None and probe_result.duration is not None:
+        return probe_result.duration
     return 86400.0
 
 
@@ -850,7 +1321,10 @@ def check_integrity(fpath: str) -> bool:
     return True
 
 
-def get_chapters(fpath):
+def get_chapters(
+    fpath: str,
+    probe_result: ProbeResult | None = None,
+) -> list[Chapter] | None:
     """
     Function for extract chapter information from video
 
@@ -858,68 +1332,172 @@ def get_chapters(fpath):
         fpath (str): Path of file to extract chapter information from
 
     Keyword arguments:
-        None
+        probe_result (ProbeResult): Result of :func:`probe` for the file;
+            file is probed if not set
 
     Returns:
         List of Chapter objects if chapters exist, None otherwise
 
     """
 
+    if probe_result is None:
+        probe_result = probe(fpath)
+    if probe_result is None:
+        logging.getLogger(__name__).error(
+            'Failed to get chapter information'
+        )
+        return None
+    return probe_result.chapters
+
+
+def get_keyframe_time(
+    fpath: str,
+    seek: float,
+    after: bool = False,
+) -> float | None:
+    """
+    Locate video keyframe nearest to a given time
+
+    The ffprobe CLI is used to seek to the requested time and report the
+    first few video packets from that point. As seeking lands on a
+    keyframe, the first packet flagged as a keyframe is the nearest
+    keyframe to the requested time. Only a handful of packets are read,
+    so this is cheap even for very large files.
+
+    Arguments:
+        fpath (str): Path of file to locate keyframe in
+        seek (float): Time, in seconds, to find nearest keyframe to
+
+    Keyword arguments:
+        after (bool): If set, locate the first keyframe at or after the
+            requested time instead; up to KEYFRAME_WINDOW seconds of
+            packets are read
+
+    Returns:
+        float : Time of keyframe, in seconds, relative to the start of the
+            file; this is the same reference ffmpeg uses for the -ss
+            option. None is returned if no keyframe was found.
+
+    """
+
     log = logging.getLogger(__name__)
     cmd = [
         'ffprobe',
-        '-i', fpath,
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-read_intervals', (
+            f'{seek:0.3f}%+{KEYFRAME_WINDOW:0.3f}'
+            if after else
+            f'{seek:0.3f}%+#{KEYFRAME_PACKETS}'
+        ),
+        '-show_entries', 'packet=pts_time,flags:format=start_time',
         '-print_format', 'json',
-        '-show_chapters',
-        '-loglevel', 'error',
+        fpath,
     ]
     try:
-        chaps = str(check_output(cmd), 'utf-8')
-    except:
-        log.error('Failed to get chapter information')
+        info = json.loads(check_output(cmd, stderr=DEVNULL))
+    except Exception as err:
+        log.error('Failed to get keyframe information: %s', err)
         return None
-    return [Chapter(chap) for chap in json.loads(chaps)['chapters']]
 
+    try:
+        start_time = float(info['format']['start_time'])
+    except:
+        start_time = 0.0
 
-def get_hdr_opts(fpath):
+    for packet in info.get('packets', []):
+        if 'K' not in packet.get('flags', ''):
+            continue
+        try:
+            keyframe = max(float(packet['pts_time']) - start_time, 0.0)
+        except:
+            continue
+        # Allow for rounding of times in the ffprobe output
+        if not after or keyframe >= seek - 1.0e-3:
+            return keyframe
+
+    return None
+
+
+def segment_times(
+    duration: float,
+    nsegments: int,
+    chapters: list[Chapter] | None = None,
+) -> list[float]:
+    """
+    Determine target start times for splitting a video into segments
+
+    Target times are evenly spaced over the duration of the video. If
+    chapter information is provided, then each target time is moved to
+    the start of the closest chapter as chapter marks on discs are
+    (almost) always placed at the start of a GOP.
+
+    Arguments:
+        duration (float): Duration of the video in seconds
+        nsegments (int): Number of segments to split video into
+
+    Keyword arguments:
+        chapters (list): Chapter objects from :func:`get_chapters`
+
+    Returns:
+        list : Sorted, unique start times (in seconds) of the segments;
+            first value is always zero (0)
+
+    """
+
+    if nsegments < 2 or duration <= 0.0:
+        return [0.0]
+
+    step = duration / nsegments
+    targets = [step * i for i in range(1, nsegments)]
+    if chapters:
+        starts = [chap.start_time for chap in chapters if chap.start_time > 0]
+        if starts:
+            targets = [
+                min(starts, key=lambda start, t=t: abs(start - t))
+                for t in targets
+            ]
+
+    # Drop any segments that would be too short to be worth encoding
+    # on their own
+    times = [0.0]
+    for target in sorted(set(targets)):
+        if (
+            (target - times[-1]) >= MIN_SEGMENT
+            and (duration - target) >= MIN_SEGMENT
+        ):
+            times.append(target)
+    return times
+
+
+def get_hdr_opts(fpath, probe_result: ProbeResult | None = None):
     """
     Function to get HDR x265 options
 
     Arguments:
         fpath (str) : Path of file to get HDR options for
 
+    Keyword arguments:
+        probe_result (ProbeResult): Result of :func:`probe` for the file;
+            file is probed if not set
+
     Returns:
         None, tuple
 
     """
 
     log = logging.getLogger(__name__)
-    cmd = [
-        "ffprobe",
-        "-hide_banner",
-        "-loglevel", "quiet",
-        "-select_streams", "v",
-        "-print_format", "json",
-        "-show_frames",
-        "-read_intervals", "%+#1",
-        "-i", fpath,
-    ]
-
-    try:
-        info = json.loads(
-            check_output(cmd)
-        )
-    except Exception as err:
-        log.error("Failed to get HDR information: %s", err)
+    if probe_result is None:
+        probe_result = probe(fpath)
+    if probe_result is None:
+        log.error("Failed to get HDR information")
         return None
 
-    info = info.get('frames', [])
-    if len(info) < 1:
+    info = probe_result.video_frame
+    if info is None:
         log.warning("No frame information found")
         return None
 
-    info = info[0]
-
     opts = [
         "hdr-opt=1",
         "repeat-headers=1",
@@ -1225,6 +1803,44 @@ def split_on_chapter(in_file: str, n_chapters: int | list[int]) -> None:
     os.remove(chap_file)  # Remove the chapter file
 
 
+def write_ffconcat(
+    fpath: str,
+    entries: list[str | tuple[str, float | None, float | None]],
+) -> str:
+    """
+    Write script for the ffmpeg concat demuxer
+
+    Arguments:
+        fpath (str): Path of the script to write
+        entries (list): Files to concatenate. Each entry is either a file
+            path or a (path, inpoint, outpoint) tuple; inpoint and outpoint
+            are times in seconds and may be None to use the start and end
+            of the file, respectively.
+
+    Keyword arguments:
+        None
+
+    Returns:
+        str : Path to the script
+
+    """
+
+    with open(fpath, mode='w', encoding='utf8') as oid:
+        oid.write(f"ffconcat version 1.0{os.linesep}")
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = (entry, None, None)
+            path, inpoint, outpoint = entry
+            path = os.path.abspath(path).replace("'", "'\\''")
+            oid.write(f"file '{path}'{os.linesep}")
+            if inpoint is not None:
+                oid.write(f"inpoint {inpoint:0.6f}{os.linesep}")
+            if outpoint is not None:
+                oid.write(f"outpoint {outpoint:0.6f}{os.linesep}")
+
+    return fpath
+
+
 def combine_mp4_files(out_file: str, *args: str) -> None:
     """
     Combine multiple (2+) mp4 files into a single mp4 file
@@ -1267,13 +1883,12 @@ def combine_mp4_files(out_file: str, *args: str) -> None:
         out_file
     ]
 
-    for arg, tmp in zip(args, tmp_files):
-        # Set input/output files in the cmd_ts list
-        cmd_ts[4], cmd_ts[-1] = arg, tmp
-        proc = POPENPOOL.popen_async(cmd_ts.copy())
+    with POPENPOOL.group() as group:
+        for arg, tmp in zip(args, tmp_files):
+            # Set input/output files in the cmd_ts list
+            cmd_ts[4], cmd_ts[-1] = arg, tmp
+            group.popen_async(cmd_ts.copy())
 
-    proc.wait()
-    POPENPOOL.wait()
     proc = POPENPOOL.popen_async(cmd_concat)
     proc.wait()
 
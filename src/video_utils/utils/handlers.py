@@ -11,7 +11,7 @@ import smtplib
 
 from functools import wraps
 from email.message import EmailMessage
-from threading import Thread
+from threading import Lock, Thread
 
 
 from .. import log
@@ -211,11 +211,21 @@ class RotatingFile(Thread):
         super().__init__()
 
         self.rw = None  # Initialize read/write pipe as None
+        self._rw_lock = Lock()
         self.callback = kwargs.pop('callback', None)
         for key, val in ROTATING_FORMAT.items():
             if key not in kwargs:
                 kwargs[key] = val
 
+        # Log directory is only made by init_log_file(), which may not
+        # have been called by the program
+        fname = kwargs.get('filename', args[0] if args else None)
+        if fname:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(fname)),
+                exist_ok=True,
+            )
+
         formatter = kwargs.pop('formatter', None)
         self.log = RotatingFileHandler(*args, **kwargs)
         if isinstance(formatter, logging.Formatter):
@@ -241,6 +251,7 @@ class RotatingFile(Thread):
         """Overload thread start method"""
 
         self.rw = os.pipe()  # Open a pipe
+        self._rfd = self.rw[0]  # Read-end is kept open by run() until EOF
         super().start()  # Call supercalls start method
 
     def run(self):
@@ -261,7 +272,7 @@ class RotatingFile(Thread):
         """
 
         # Open the read-end of pipe
-        with os.fdopen(self.rw[0]) as fid:
+        with os.fdopen(self._rfd) as fid:
             # Iterate over all lines
             for line in iter(fid.readline, ''):
                 record = logging.LogRecord(
@@ -275,10 +286,13 @@ class RotatingFile(Thread):
     def close(self):
         """Method to clean up the pipe and logging file"""
 
-        # If read/write pip IS set
-        if self.rw:
-            os.close(self.rw[1])  # Close the write-end of pipe
-            self.rw = None  # Set rw to None
+        # Both the owner of the pipe and the reader thread, at end of file,
+        # close it; only close the write-end once as the descriptor may
+        # have been reused after the first close
+        with self._rw_lock:
+            rw, self.rw = self.rw, None
+        if rw:
+            os.close(rw[1])  # Close the write-end of pipe
         self.log.close()  # Close the log
 
     def fileno(self):
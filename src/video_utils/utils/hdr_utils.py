@@ -7,9 +7,13 @@ Use the dovi_tool and/or hdr10plus_tool to extract HDR information.
 
 import logging
 import os
-from subprocess import Popen, STDOUT, DEVNULL
+import time
+from subprocess import Popen, PIPE, STDOUT, DEVNULL, TimeoutExpired
+
+import psutil
 
 from .ffmpeg_utils import extract_hevc
+from .timing import timed
 
 RUST_CARGO = os.path.join(
     os.path.expanduser('~'),
@@ -24,8 +28,15 @@ HDR10PLUS_TOOL = os.path.join(
     RUST_CARGO,
     "hdr10plus_tool",
 )
+# Bytes read from the HEVC stream at a time when copying it to several tools
+TEE_CHUNK = 4 * 1024 * 1024
+# Seconds between checks of running HDR tools
+POLL_INTERVAL = 1.0
+# Seconds a tool may go without reading or writing before it is killed
+STALL_TIMEOUT = 300.0
 
 
+@timed('hdr_inject')
 def ingect_hdr(hevc_file, dolby_vision_file, hdr10plus_file):
     """
     Ingect Dolby Vision/HDR10 data
@@ -33,6 +44,8 @@ def ingect_hdr(hevc_file, dolby_vision_file, hdr10plus_file):
     Given an HEVC encoded video file ingect Dolby Vision
     and or HDR10+ metadata into the file.
 
+    Each tool is killed if it stalls; see _run_tool().
+
     Arguments:
         hevc_file (str) : Path to hevc_mp4toannexb formatted video stream.
         dolby_vision_file (str): Path to Dolby Vision .bin metadata file.
@@ -51,6 +64,71 @@ def ingect_hdr(hevc_file, dolby_vision_file, hdr10plus_file):
     return hevc_file
 
 
+def _run_tool(cmd: list, timeout: float | None = None) -> bool:
+    """
+    Run HDR tool, killing it if it stalls
+
+    The tool is considered stalled if it uses no CPU time and neither
+    reads nor writes any data for timeout seconds.
+
+    Arguments:
+        cmd (list) : Command to run
+
+    Keyword arguments:
+        timeout (float) : Seconds without progress before the tool is
+            killed. Default is STALL_TIMEOUT
+
+    Returns:
+        bool : True if tool finished successfully, False otherwise
+
+    """
+
+    log = logging.getLogger(__name__)
+    timeout = STALL_TIMEOUT if timeout is None else timeout
+
+    proc = Popen(cmd, stdout=DEVNULL, stderr=STDOUT)
+    activity = None
+    last = time.monotonic()
+    while True:
+        try:
+            return proc.wait(timeout=POLL_INTERVAL) == 0
+        except TimeoutExpired:
+            pass
+        current = _activity(proc.pid)
+        now = time.monotonic()
+        if current is None or current != activity:
+            activity, last = current, now
+        elif now - last > timeout:
+            log.warning(
+                "No progress in %0.0f s; killing : %s",
+                timeout,
+                os.path.basename(cmd[0]),
+            )
+            proc.kill()
+            proc.wait()
+            return False
+
+
+def _activity(pid: int) -> tuple | None:
+    """CPU time used and data read/written by process, None if unavailable"""
+
+    try:
+        proc = psutil.Process(pid)
+        cpu = proc.cpu_times()
+    except Exception:
+        return None
+    try:
+        io_counters = proc.io_counters()
+    except Exception:  # Not available on all systems
+        return (cpu.user, cpu.system)
+    return (
+        cpu.user,
+        cpu.system,
+        io_counters.read_chars,
+        io_counters.write_chars,
+    )
+
+
 def dovi_inject(hevc_file, dolby_vision_file):
     """
     Inject Dolby Vision metadata into HEVC file
@@ -85,8 +163,7 @@ def dovi_inject(hevc_file, dolby_vision_file):
         "-o", out_file,
     ]
 
-    proc = Popen(cmd, stdout=DEVNULL, stderr=STDOUT)
-    if proc.wait() == 0:
+    if _run_tool(cmd):
         # command finished successfully!
         # Remove source file and update hevc_file to injected file
         os.rename(out_file, hevc_file)
@@ -117,38 +194,12 @@ def dovi_extract(
 
     """
 
-    log = logging.getLogger(__name__)
-    if not os.path.isfile(DOVI_TOOL):
-        log.error("dovi_tool NOT installed!")
-        return None
-
-    out_file, _ = os.path.splitext(out_file or src_file)
-    if not out_file.endswith(ext):
-        out_file += ext
-
-    cmd = [
-        DOVI_TOOL,
-        '-c',
-        '-m', '2',
-        'extract-rpu',
-        '-o', out_file,
-        '-',
-    ]
-
-    log.info("Extracting Dolby Vision data: %s --> %s", src_file, out_file)
-    extract = extract_hevc(src_file)
-    proc = Popen(cmd, stdin=extract.stdout, stdout=DEVNULL, stderr=STDOUT)
-    extract.stdout.close()
-
-    if proc.wait() != 0:
-        log.warning("Failed to extract Dolby Vision data!")
-        return None
-    _ = proc.communicate()
-
-    if check_file(out_file):
-        return out_file
-    log.warning("Issue with Dolby Vision metadata file!")
-    return None
+    return hdr_extract(
+        src_file,
+        out_file,
+        hdr10plus=False,
+        dovi_ext=ext,
+    )[0]
 
 
 def hdr10plus_inject(hevc_file, hdr10plus_file):
@@ -185,8 +236,7 @@ def hdr10plus_inject(hevc_file, hdr10plus_file):
         "-o", out_file,
     ]
 
-    proc = Popen(cmd, stdout=DEVNULL, stderr=STDOUT)
-    if proc.wait() == 0:
+    if _run_tool(cmd):
         # command finished successfully!
         # Remove source file and update hevc_file to injected file
         os.rename(out_file, hevc_file)
@@ -217,38 +267,175 @@ def hdr10plus_extract(
 
     """
 
+    return hdr_extract(
+        src_file,
+        out_file,
+        dolby_vision=False,
+        hdr10plus_ext=ext,
+    )[1]
+
+
+@timed('hdr_extract')
+def hdr_extract(
+    src_file: str,
+    out_file: str | None = None,
+    dolby_vision: bool = True,
+    hdr10plus: bool = True,
+    dovi_ext: str = ".bin",
+    hdr10plus_ext: str = ".json",
+) -> tuple[str | None, str | None]:
+    """
+    Extract Dolby Vision and HDR10+ data in one pass over the file
+
+    The HEVC stream is extracted from the source file only once. When both
+    dovi_tool and hdr10plus_tool are run, the Annex-B stream is copied to
+    both of them at the same time, so the (often very large) source file
+    is only read once.
+
+    Arguments:
+        src_file (str) : Path to file to extract HDR metadata from
+
+    Keyword arguments:
+        out_file (str) : Base path for metadata files; extension is
+            replaced. Default is to use src_file
+        dolby_vision (bool) : Extract Dolby Vision data
+        hdr10plus (bool) : Extract HDR10+ data
+        dovi_ext (str) : Extension for Dolby Vision file
+        hdr10plus_ext (str) : Extension for HDR10+ file
+
+    Returns:
+        tuple : Paths to the Dolby Vision .bin and HDR10+ .json files. Each
+            is None if not requested or extraction failed
+
+    """
+
     log = logging.getLogger(__name__)
-    if not os.path.isfile(HDR10PLUS_TOOL):
-        log.error("hdr10plus_tool NOT installed!")
-        return None
+
+    tools = []
+    if dolby_vision:
+        if os.path.isfile(DOVI_TOOL):
+            dovi_file = _metadata_file(src_file, out_file, dovi_ext)
+            tools.append((
+                0,
+                'Dolby Vision',
+                dovi_file,
+                [
+                    DOVI_TOOL,
+                    '-c',
+                    '-m', '2',
+                    'extract-rpu',
+                    '-o', dovi_file,
+                    '-',
+                ],
+            ))
+        else:
+            log.error("dovi_tool NOT installed!")
+
+    if hdr10plus:
+        if os.path.isfile(HDR10PLUS_TOOL):
+            hdr10plus_file = _metadata_file(src_file, out_file, hdr10plus_ext)
+            tools.append((
+                1,
+                'HDR10+',
+                hdr10plus_file,
+                [
+                    HDR10PLUS_TOOL,
+                    "extract",
+                    "-o", hdr10plus_file,
+                    "-",
+                ],
+            ))
+        else:
+            log.error("hdr10plus_tool NOT installed!")
+
+    out = [None, None]
+    if len(tools) == 0:
+        return tuple(out)
+
+    for _, name, fpath, _ in tools:
+        log.info("Extracting %s data: %s --> %s", name, src_file, fpath)
+
+    extract = extract_hevc(src_file)
+    if len(tools) == 1:
+        procs = [
+            Popen(
+                tools[0][-1],
+                stdin=extract.stdout,
+                stdout=DEVNULL,
+                stderr=STDOUT,
+            )
+        ]
+        extract.stdout.close()
+    else:
+        procs = [
+            Popen(cmd, stdin=PIPE, stdout=DEVNULL, stderr=STDOUT)
+            for *_, cmd in tools
+        ]
+        _tee(extract.stdout, [proc.stdin for proc in procs])
+        extract.stdout.close()
+
+    for (index, name, fpath, _), proc in zip(tools, procs):
+        if proc.wait() != 0:
+            log.warning("Failed to extract %s data!", name)
+            continue
+        if check_file(fpath):
+            out[index] = fpath
+        else:
+            log.warning("Issue with %s metadata file!", name)
+
+    extract.wait()
+    return tuple(out)
+
+
+def _metadata_file(src_file: str, out_file: str | None, ext: str) -> str:
+    """Build path for metadata file with the given extension"""
 
     out_file, _ = os.path.splitext(out_file or src_file)
     if not out_file.endswith(ext):
         out_file += ext
+    return out_file
 
-    cmd = [
-        HDR10PLUS_TOOL,
-        "extract",
-        "-o", out_file,
-        "-",
-    ]
 
-    log.info("Extracting HDR10+ data: %s --> %s", src_file, out_file)
-    extract = extract_hevc(src_file)
+def _tee(src, dsts: list) -> None:
+    """
+    Copy data from one pipe to several
 
-    proc = Popen(cmd, stdin=extract.stdout, stdout=DEVNULL, stderr=STDOUT)
-    extract.stdout.close()
+    A destination that closes its end of the pipe (e.g., the tool failed)
+    is dropped and the remaining destinations continue to receive data.
+    All destinations are closed once the source is exhausted.
 
-    if proc.wait() != 0:
-        log.warning("Failed to extract HDR10+ data!")
-        return None
+    Arguments:
+        src : Readable binary file object
+        dsts (list) : Writable binary file objects
+
+    Returns:
+        None
 
-    _ = proc.communicate()
+    """
 
-    if check_file(out_file):
-        return out_file
-    log.warning("Issue with HDR10+ metadata file!")
-    return None
+    dsts = list(dsts)
+    while dsts:
+        chunk = src.read(TEE_CHUNK)
+        if not chunk:
+            break
+        for dst in list(dsts):
+            try:
+                dst.write(chunk)
+            except (BrokenPipeError, OSError):
+                dsts.remove(dst)
+                _close(dst)
+
+    for dst in dsts:
+        _close(dst)
+
+
+def _close(fid) -> None:
+    """Close file object, ignoring a broken pipe"""
+
+    try:
+        fid.close()
+    except (BrokenPipeError, OSError):
+        pass
 
 
 def check_file(fpath):
@@ -0,0 +1,192 @@
+"""
+Adapt the PopenPool thread budget to system load
+
+Other programs on the host, such as a media server transcoding for
+playback, compete with the pool for CPU. The LoadController periodically
+samples system load, CPU steal, and I/O wait and shrinks or grows the
+number of threads the pool may use so that the pool only uses what the
+rest of the system leaves free.
+
+"""
+
+import logging
+import os
+from threading import Thread, Event, Lock
+
+import psutil
+
+from . import MINTHREADS, MAXTHREADS, isRunning
+from .subproc_pool import PROCLOCK
+
+# Seconds between load samples
+INTERVAL = 15.0
+# Number of consecutive samples that must call for more threads before the
+# thread budget is increased
+GROW_SAMPLES = 4
+# Number of consecutive samples that must call for fewer threads before the
+# thread budget is decreased
+SHRINK_SAMPLES = 2
+# Target must differ from current budget by at least this many threads
+# before a change is made
+HYSTERESIS = 1
+# Percent of CPU time in I/O wait above which the budget is reduced, as more
+# processes will only compete for the disk
+IOWAIT_HIGH = 25.0
+
+
+class LoadController(Thread):
+    """
+    Thread that adjusts the PopenPool thread budget based on system load
+
+    The number of cores free for the pool is estimated as the number of
+    cores, less the load not caused by the pool's own processes, less the
+    fraction of CPU time stolen by the hypervisor. The budget is only
+    changed once the estimate has called for a change for several samples
+    in a row, and it grows by only one thread at a time, so that short
+    bursts of load do not cause the budget to swing.
+
+    """
+
+    def __init__(
+        self,
+        pool,
+        min_threads: int | None = None,
+        max_threads: int | None = None,
+        interval: float = INTERVAL,
+    ):
+        """
+        Arguments:
+            pool (PopenPool) : Pool to adjust thread budget of
+
+        Keyword arguments:
+            min_threads (int) : Minimum thread budget; default is one (1)
+            max_threads (int) : Maximum thread budget; default is the thread
+                budget of the pool when the controller is created
+            interval (float) : Seconds between load samples
+
+        Returns:
+            A LoadController instance
+
+        """
+
+        super().__init__(daemon=True)
+        self.__log = logging.getLogger(__name__)
+        self.__lock = Lock()
+        self.__stop = Event()
+        self.pool = pool
+        self.interval = interval
+        self.min_threads = min_threads or MINTHREADS
+        self.max_threads = min(max_threads or pool.threads, MAXTHREADS)
+        self.min_threads = min(self.min_threads, self.max_threads)
+        self.__grow = 0
+        self.__shrink = 0
+        self.__metrics = {
+            'load': None,
+            'steal': None,
+            'iowait': None,
+            'free': None,
+            'target': pool.threads,
+        }
+
+    @property
+    def target(self) -> int:
+        """Current thread budget of the pool"""
+
+        return self.pool.threads
+
+    @property
+    def metrics(self) -> dict:
+        """Latest load sample and resulting thread budget"""
+
+        with self.__lock:
+            return dict(self.__metrics)
+
+    def stop(self) -> None:
+        """Stop adjusting the thread budget"""
+
+        self.__stop.set()
+
+    def run(self):
+        """Sample load every interval and adjust thread budget"""
+
+        self.__log.info(
+            'Adapting thread budget to load between %d and %d threads',
+            self.min_threads,
+            self.max_threads,
+        )
+
+        # First call only sets the reference for later calls
+        psutil.cpu_times_percent(interval=None)
+        while isRunning() and not self.__stop.wait(self.interval):
+            try:
+                self.update()
+            except Exception as err:
+                self.__log.debug('Failed to sample load: %s', err)
+
+    def update(self) -> int:
+        """
+        Sample system load and adjust thread budget if needed
+
+        Returns:
+            int : Thread budget after the update
+
+        """
+
+        ncpu = psutil.cpu_count() or 1
+        times = psutil.cpu_times_percent(interval=None)
+        steal = getattr(times, 'steal', 0.0)
+        iowait = getattr(times, 'iowait', 0.0)
+        try:
+            load = os.getloadavg()[0]
+        except (AttributeError, OSError):
+            load = psutil.cpu_percent(interval=None) / 100.0 * ncpu
+
+        # Load not caused by our own processes
+        other = max(load - PROCLOCK.n, 0.0)
+        free = ncpu - other - ncpu * steal / 100.0
+        if iowait > IOWAIT_HIGH:
+            free = min(free, self.target - 1)
+        wanted = int(max(self.min_threads, min(self.max_threads, free)))
+
+        current = self.target
+        if wanted >= current + HYSTERESIS:
+            self.__grow += 1
+            self.__shrink = 0
+        elif wanted <= current - HYSTERESIS:
+            self.__shrink += 1
+            self.__grow = 0
+        else:
+            self.__grow = self.__shrink = 0
+
+        new = current
+        if self.__grow >= GROW_SAMPLES:
+            new = current + 1
+            self.__grow = 0
+        elif self.__shrink >= SHRINK_SAMPLES:
+            new = wanted
+            self.__shrink = 0
+
+        if new != current:
+            self.__log.info(
+                'Changing thread budget from %d to %d '
+                '(load %0.2f, steal %0.1f%%, iowait %0.1f%%)',
+                current,
+                new,
+                load,
+                steal,
+                iowait,
+            )
+            self.pool.threads = new
+
+        with self.__lock:
+            self.__metrics.update(
+                {
+                    'load': load,
+                    'steal': steal,
+                    'iowait': iowait,
+                    'free': free,
+                    'target': self.target,
+                }
+            )
+
+        return self.target
@@ -8,11 +8,22 @@ too many threads/processes are consumed on machine.
 
 import logging
 import os
-import time
+import signal
+import shutil
 import atexit
-from subprocess import Popen, STDOUT, DEVNULL
-from queue import Queue
-from threading import Thread, Event
+from itertools import count
+from concurrent.futures import (
+    Future,
+    CancelledError,
+    TimeoutError as FutureTimeout,
+    wait as futures_wait,
+    as_completed as futures_as_completed,
+)
+from subprocess import Popen, TimeoutExpired, STDOUT, DEVNULL
+from queue import PriorityQueue, Empty
+from threading import Thread, Event, Condition, Lock, Semaphore
+
+import psutil
 
 from .check_cli import check_cli
 from .import NLock, thread_check
@@ -21,15 +32,301 @@ from . import isRunning, _sigtermEvent
 TIMEOUT = 1.0
 PROCLOCK = NLock()
 
+# Job classes in order of precedence; jobs in a class are admitted before
+# any job in a later class
+INTERACTIVE = 'interactive'
+NORMAL = 'normal'
+BULK = 'bulk'
+JOB_CLASSES = (INTERACTIVE, NORMAL, BULK)
+# Running jobs of these classes may be paused to make room for jobs of an
+# earlier class
+PREEMPTIBLE = (BULK,)
+
+# I/O scheduling classes for ionice; not all are available on all systems
+IONICE = {
+    'realtime': getattr(psutil, 'IOPRIO_CLASS_RT', None),
+    'best-effort': getattr(psutil, 'IOPRIO_CLASS_BE', None),
+    'idle': getattr(psutil, 'IOPRIO_CLASS_IDLE', None),
+}
+
+
+class CoreAllocator:
+    """
+    Hand out dedicated sets of CPU cores to processes
+
+    Each process is given its own cores, which it is pinned to using
+    os.sched_setaffinity, so that concurrent processes do not compete for
+    the same cores. Only supported on systems that have
+    os.sched_setaffinity (i.e., Linux).
+
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        try:
+            self.__cores = sorted(os.sched_getaffinity(0))
+        except AttributeError:
+            self.__cores = []
+        self.__used = set()
+
+    @property
+    def supported(self):
+        """True if processes can be pinned to cores"""
+
+        return len(self.__cores) > 0
+
+    @property
+    def cores(self):
+        """All cores that may be allocated"""
+
+        return tuple(self.__cores)
+
+    @property
+    def free(self):
+        """Number of cores not allocated to a process"""
+
+        return len(self.__cores) - len(self.__used)
+
+    def allocate(self, threads):
+        """
+        Allocate cores to a process
+
+        The lowest numbered free cores are used so that processes are
+        given neighbouring cores where possible.
+
+        Arguments:
+            threads (int) : Number of cores requested
+
+        Returns:
+            tuple : Cores allocated; may be fewer than requested if not
+                enough are free. None if no cores could be allocated
+
+        """
+
+        if not isinstance(threads, int) or not self.supported:
+            return None
+
+        with self.__lock:
+            free = [core for core in self.__cores if core not in self.__used]
+            cores = tuple(free[:max(threads, 1)])
+            if len(cores) == 0:
+                return None
+            self.__used.update(cores)
+        return cores
+
+    def release(self, cores):
+        """
+        Return cores allocated with allocate()
+
+        Arguments:
+            cores (tuple) : Cores to release
+
+        Returns:
+            None
+
+        """
+
+        if not cores:
+            return
+        with self.__lock:
+            self.__used.difference_update(cores)
+
+
+CORES = CoreAllocator()
+
+# Fraction of total system memory that running processes may reserve
+MEMORY_FRACTION = 0.8
+
+
+def disk_device(path):
+    """
+    Get the device for path, or for its nearest existing parent
+
+    Arguments:
+        path (str) : Path to file or directory; does not need to exist
+
+    Returns:
+        tuple : Device id and existing path, or (None, None) if not found
+
+    """
+
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev, path
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None, None
+            path = parent
+
+
+class ResourceTracker:
+    """
+    Track memory and scratch disk space reserved by running processes
+
+    Processes declare the memory and disk space they need. A process is
+    only admitted if its needs, plus what has been reserved by processes
+    already running, fit within what the system has available. As with
+    NLock, a process that could never fit is admitted when nothing else
+    holds a reservation so that it cannot wait forever.
+
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__memory = 0
+        self.__disk = {}
+        self.__count = 0
+
+    @property
+    def memory(self):
+        """Bytes of memory reserved"""
+
+        return self.__memory
+
+    def fits(self, memory=None, disk=None):
+        """
+        Check if requested resources are available
+
+        Keyword arguments:
+            memory (int) : Bytes of memory needed
+            disk (list) : (path, bytes) tuples of disk space needed
+
+        Returns:
+            bool : True if resources fit
+
+        """
+
+        if not memory and not disk:
+            return True
+
+        with self.__lock:
+            if self.__count == 0:
+                return True
+
+            if memory:
+                vmem = psutil.virtual_memory()
+                if memory > vmem.available:
+                    return False
+                if self.__memory + memory > vmem.total * MEMORY_FRACTION:
+                    return False
+
+            for dev, path, need in self.__disk_needs(disk):
+                try:
+                    free = shutil.disk_usage(path).free
+                except OSError:
+                    continue
+                if self.__disk.get(dev, 0) + need > free:
+                    return False
+
+        return True
+
+    def reserve(self, memory=None, disk=None):
+        """
+        Reserve resources for a process
+
+        Keyword arguments:
+            memory (int) : Bytes of memory needed
+            disk (list) : (path, bytes) tuples of disk space needed
+
+        Returns:
+            tuple : Reservation to pass to release(); None if nothing
+                was requested
+
+        """
+
+        if not memory and not disk:
+            return None
+
+        memory = memory or 0
+        disk = [(dev, need) for dev, _, need in self.__disk_needs(disk)]
+        with self.__lock:
+            self.__count += 1
+            self.__memory += memory
+            for dev, need in disk:
+                self.__disk[dev] = self.__disk.get(dev, 0) + need
+        return memory, disk
+
+    def release(self, reservation):
+        """
+        Release resources reserved with reserve()
+
+        Arguments:
+            reservation (tuple) : Value returned by reserve()
+
+        Returns:
+            None
+
+        """
+
+        if reservation is None:
+            return
+
+        memory, disk = reservation
+        with self.__lock:
+            self.__count = max(self.__count - 1, 0)
+            self.__memory = max(self.__memory - memory, 0)
+            for dev, need in disk:
+                self.__disk[dev] = max(self.__disk.get(dev, 0) - need, 0)
+
+    @staticmethod
+    def __disk_needs(disk):
+        """Resolve (path, bytes) tuples to (device, path, bytes) tuples"""
+
+        out = []
+        for path, need in (disk or []):
+            dev, path = disk_device(path)
+            if dev is not None and need:
+                out.append((dev, path, need))
+        return out
+
+
+RESOURCES = ResourceTracker()
+
 try:
     CPULIMIT = check_cli('cpulimit')
 except:
-    logging.getLogger(__name__).warning(
-        'cpulimit NOT found! Cannot limit CPU usage!'
-    )
+    if not CORES.supported:
+        logging.getLogger(__name__).warning(
+            'cpulimit NOT found! Cannot limit CPU usage!'
+        )
     CPULIMIT = None
 
 
+def set_thread_count(cmd, threads):
+    """
+    Set the number of threads used by ffmpeg and its encoders
+
+    Values for the ffmpeg -threads option are replaced and, if x265
+    parameters are given, the x265 thread pool size is set.
+
+    Arguments:
+        cmd (list) : Command to be run using subprocess.Popen
+        threads (int) : Number of threads the command should use
+
+    Keyword arguments:
+        None
+
+    Returns:
+        list : Updated command
+
+    """
+
+    cmd = list(cmd)
+    for i, arg in enumerate(cmd[:-1]):
+        if arg == '-threads':
+            cmd[i + 1] = str(threads)
+        elif arg == '-x265-params':
+            opts = [
+                opt
+                for opt in cmd[i + 1].split(':')
+                if opt and not opt.startswith('pools=')
+            ]
+            cmd[i + 1] = ':'.join(opts + [f'pools={threads}'])
+    return cmd
+
+
 def make_dirs(path):
     """
     Try to make all directories in input path
@@ -78,9 +375,24 @@ class PopenThread(Thread):
             *args: All arguments accepted by subprocess.Popen
 
         Keywords arguments:
-            cpulimit (int): Percentage of CPU to all the subprocess to use
+            cpulimit (int): Percentage of CPU to all the subprocess to use;
+                only used if the process cannot be pinned to cores
             threads (int): Specify number of threads the subprocess will use;
-                default is one (1)
+                default is one (1). On Linux, the process is pinned to this
+                many dedicated cores and the ffmpeg thread options in the
+                command are set to match.
+            nice (int): Niceness increment for the subprocess
+            ionice (str): I/O scheduling class for the subprocess; one of
+                'realtime', 'best-effort', or 'idle'
+            memory (int): Bytes of memory the subprocess is expected to use
+            disk (list): (path, bytes) tuples of disk space the subprocess
+                is expected to write under each path
+            priority (int): Priority of the process within its job class;
+                higher values are started first. Default is zero (0)
+            job_class (str): One of JOB_CLASSES; default is 'normal'
+            progress (FFmpegProgress): Object tracking progress of an
+                ffmpeg process run with '-progress pipe:1'; used as stdout
+                if stdout is not set
             **kwargs: All keyword arguments accepted by subprocess.Popen.
 
         Returns:
@@ -91,13 +403,33 @@ class PopenThread(Thread):
         super().__init__()
         self.__log = logging.getLogger(__name__)
         self._cpulimit = kwargs.pop('cpulimit', None)
+        self._nice = kwargs.pop('nice', None)
+        self._ionice = kwargs.pop('ionice', None)
+        self._memory = kwargs.pop('memory', None)
+        self._disk = kwargs.pop('disk', None)
+        self._reservation = None
+        self._cores = None
         threads = kwargs.pop('threads', None)
         self._threads, *_ = thread_check(threads)
+        self._priority = kwargs.pop('priority', 0)
+        self._job_class = kwargs.pop('job_class', NORMAL)
+        if self._job_class not in JOB_CLASSES:
+            raise ValueError(f"Invalid job class : {self._job_class}")
+        self._progress = kwargs.pop('progress', None)
+        if self._progress is not None:
+            kwargs.setdefault('stdout', self._progress)
         self._args = args
         self._kwargs = kwargs
         self._returncode = None
         self._proc = None
         self._proc_started = Event()
+        self._admitted = False
+        self._callbacks = []
+        self._future = Future()
+        self._limit = None
+        self._holding = False
+        self._paused = False
+        self._state_lock = Lock()
 
     @property
     def threads(self):
@@ -105,6 +437,66 @@ class PopenThread(Thread):
 
         return self._threads
 
+    @property
+    def future(self):
+        """
+        concurrent.futures.Future for the process
+
+        The result of the future is the return code of the process. The
+        future can be cancelled before the process starts.
+
+        """
+
+        return self._future
+
+    @property
+    def memory(self):
+        """Bytes of memory the process is expected to use"""
+
+        return self._memory
+
+    @property
+    def disk(self):
+        """(path, bytes) tuples of disk space the process will write"""
+
+        return self._disk
+
+    @property
+    def cores(self):
+        """CPU cores the process is pinned to; None if not pinned"""
+
+        return self._cores
+
+    @property
+    def priority(self):
+        """Priority of the process within its job class"""
+
+        return self._priority
+
+    @property
+    def job_class(self):
+        """Job class of the process; one of JOB_CLASSES"""
+
+        return self._job_class
+
+    @property
+    def rank(self):
+        """Scheduling rank; lower values are started first"""
+
+        return (JOB_CLASSES.index(self._job_class), -self._priority)
+
+    @property
+    def paused(self):
+        """True if the process is currently paused"""
+
+        return self._paused
+
+    @property
+    def progress(self):
+        """FFmpegProgress instance for the process; None if not set"""
+
+        return self._progress
+
     @property
     def returncode(self):
         """Return code of subprocess; see subprocess.Popen()"""
@@ -142,16 +534,188 @@ class PopenThread(Thread):
     def wait(self, timeout=None):
         """Wait for subprocess to finish; see subprocess.Popen()"""
 
-        # Make sure thread is started
-        self.start_wait()
-        self.join(timeout=timeout)
-        return not self.is_alive()
+        try:
+            self._future.result(timeout=timeout)
+        except CancelledError:
+            return True
+        except FutureTimeout:
+            return False
+
+        # Let the thread finish running callbacks
+        if self.is_alive():
+            self.join()
+        return True
+
+    def admit(self):
+        """
+        Mark the thread as already holding its share of the PROCLOCK
+
+        Used by the PopenPool, which acquires the lock on behalf of the
+        thread before starting it, so that the thread does not acquire the
+        lock a second time. Memory and disk space for the process are also
+        reserved. The thread still releases the lock and reservation when
+        the process finishes.
+
+        """
+
+        self._admitted = True
+        self._reservation = RESOURCES.reserve(self._memory, self._disk)
+
+    def add_done_callback(self, func):
+        """
+        Add function to call when the subprocess finishes
+
+        Arguments:
+            func: Function to call; it is passed this PopenThread instance
+
+        Keyword arguments:
+            None
+
+        Returns:
+            None
+
+        """
+
+        self._callbacks.append(func)
 
     def kill(self):
         """Kill the subprocess; see subprocess.Popen()"""
 
+        # Process not started yet, so prevent it from starting
+        if self._future.cancel():
+            return
+
         if self._proc:
             self._proc.terminate()
+            # A stopped process will not act on the signal until continued
+            if self._paused:
+                self._signal(signal.SIGCONT)
+
+    def pause(self):
+        """
+        Pause the subprocess and release its threads
+
+        The process is stopped using SIGSTOP and the threads it holds
+        are released from the PROCLOCK so that other processes may use
+        them.
+
+        Returns:
+            bool : True if process paused, False otherwise
+
+        """
+
+        with self._state_lock:
+            if self._paused or not self._holding or self.poll() is not None:
+                return False
+            # Stop cpulimit first so that it does not continue the process
+            if self._limit:
+                self._signal(signal.SIGSTOP, self._limit)
+            if not self._signal(signal.SIGSTOP):
+                if self._limit:
+                    self._signal(signal.SIGCONT, self._limit)
+                return False
+            self._paused = True
+            self._holding = False
+            PROCLOCK.release(threads=self.threads)
+            CORES.release(self._cores)
+
+        self.__log.debug('Paused process : %s', self._args)
+        return True
+
+    def resume(self, blocking=False, timeout=-1):
+        """
+        Resume a paused subprocess
+
+        The threads used by the process are acquired from the PROCLOCK
+        before the process is continued using SIGCONT.
+
+        Keyword arguments:
+            blocking (bool) : If set, block until threads are available
+            timeout (float) : Maximum time to block for; see
+                NLock.acquire()
+
+        Returns:
+            bool : True if process resumed, False otherwise
+
+        """
+
+        with self._state_lock:
+            if not self._paused:
+                return False
+            if not PROCLOCK.acquire(
+                blocking=blocking,
+                timeout=timeout,
+                threads=self.threads,
+            ):
+                return False
+            self._holding = True
+            self._paused = False
+            # Cores may have been given to another process while paused;
+            # if none are free, let the process run on any core rather
+            # than stay pinned to cores now used by another process
+            if self._cores is not None:
+                self._cores = CORES.allocate(self.threads)
+                self._pin(self._cores or CORES.cores)
+            self._signal(signal.SIGCONT)
+            if self._limit:
+                self._signal(signal.SIGCONT, self._limit)
+
+        self.__log.debug('Resumed process : %s', self._args)
+        return True
+
+    def _pin(self, cores=None):
+        """
+        Pin all threads of running process to cores
+
+        Keyword arguments:
+            cores (tuple) : Cores to pin to; default is allocated cores
+
+        """
+
+        cores = cores or self._cores
+        if not (self._proc and cores):
+            return
+        try:
+            tids = os.listdir(f'/proc/{self._proc.pid}/task')
+        except OSError:
+            tids = [self._proc.pid]
+        for tid in tids:
+            try:
+                os.sched_setaffinity(int(tid), cores)
+            except Exception as err:
+                self.__log.debug('Failed to set affinity: %s', err)
+
+    def _prioritize(self):
+        """
+        Set affinity and priority of process once started
+
+        This is done from this process using the pid of the child rather
+        than in a preexec_fn, which is not safe to use when there are
+        threads running.
+
+        """
+
+        self._pin()
+        try:
+            proc = psutil.Process(self._proc.pid)
+            if isinstance(self._nice, int):
+                proc.nice(proc.nice() + self._nice)
+            ionice = IONICE.get(self._ionice)
+            if ionice is not None:
+                proc.ionice(ionice)
+        except Exception as err:
+            self.__log.debug('Failed to set priority: %s', err)
+
+    def _signal(self, signum, proc=None):
+        """Send signal to process, returning True on success"""
+
+        proc = proc or self._proc
+        try:
+            proc.send_signal(signum)
+        except Exception as err:
+            self.__log.debug('Failed to signal process: %s', err)
+            return False
+        return True
 
     def apply_func(self, func, *args, **kwargs):
         """
@@ -178,10 +742,9 @@ class PopenThread(Thread):
     def run(self):
         """Overload run method"""
 
-        PROCLOCK.acquire(threads=self.threads)
+        if not self._begin():
+            return
 
-        # Set _proc_started event after lock is acquired
-        self._proc_started.set()
         kwargs = self._kwargs.copy()
         stdout = kwargs.get('stdout', DEVNULL)
         stderr = kwargs.get('stderr', STDOUT)
@@ -198,9 +761,15 @@ class PopenThread(Thread):
                 'encoding': encode,
             }
         )
-        self.__log.debug('Running command : %s', self._args)
+
+        args = self._args
+        self._cores = CORES.allocate(self.threads)
+        if self._cores and len(args) > 0 and isinstance(args[0], list):
+            args = (set_thread_count(args[0], len(self._cores)), *args[1:])
+
+        self.__log.debug('Running command : %s', args)
         try:
-            self._proc = Popen(*self._args, **kwargs)
+            self._proc = Popen(*args, **kwargs)
         except FileNotFoundError as error:
             self.__log.error(
                 'Setting returncode to 127 (command not found): %s',
@@ -212,11 +781,14 @@ class PopenThread(Thread):
             self._returncode = 256
         else:
             self.__log.debug('Process started')
-            limit = self.__cpulimit()
+            self._prioritize()
+            limit = self._limit = self.__cpulimit()
             while isRunning():
-                if self.poll() is not None:
-                    break
-                time.sleep(TIMEOUT)
+                try:
+                    self._proc.wait(timeout=TIMEOUT)
+                except TimeoutExpired:
+                    continue
+                break
 
             # If process still not done; then assume interupt encounterd
             if self.poll() is None:
@@ -238,7 +810,75 @@ class PopenThread(Thread):
         except:
             pass
 
-        PROCLOCK.release(threads=self.threads)
+        self._end()
+        self._future.set_result(self._returncode)
+        self._run_callbacks()
+
+    def _begin(self):
+        """
+        Mark future running and acquire threads and resources
+
+        Returns:
+            bool : True if job should run, False if it was cancelled
+                before starting; callbacks have already been run
+
+        """
+
+        if not self._future.set_running_or_notify_cancel():
+            # Cancelled before the process could start
+            if self._admitted:
+                PROCLOCK.release(threads=self.threads)
+                RESOURCES.release(self._reservation)
+            self._proc_started.set()
+            self._run_callbacks()
+            return False
+
+        if not self._admitted:
+            PROCLOCK.acquire(threads=self.threads)
+            self._reservation = RESOURCES.reserve(self._memory, self._disk)
+        self._holding = True
+
+        # Set _proc_started event after lock is acquired
+        self._proc_started.set()
+        return True
+
+    def _end(self):
+        """Release threads, cores, and resources held by job"""
+
+        RESOURCES.release(self._reservation)
+        self._reservation = None
+        with self._state_lock:
+            self._paused = False
+            if self._holding:
+                self._holding = False
+                PROCLOCK.release(threads=self.threads)
+                CORES.release(self._cores)
+
+    def discard(self):
+        """
+        Cancel a process that will never be started
+
+        Used by the PopenPool for processes that are dropped from the
+        queue. The future is cancelled, anything waiting on it is woken,
+        and done callbacks are run.
+
+        """
+
+        self._future.cancel()
+        if self._future.cancelled():
+            # Wakes concurrent.futures.wait() and as_completed()
+            self._future.set_running_or_notify_cancel()
+        self._proc_started.set()
+        self._run_callbacks()
+
+    def _run_callbacks(self):
+        """Run functions added with add_done_callback"""
+
+        for func in self._callbacks:
+            try:
+                func(self)
+            except Exception as err:
+                self.__log.error('Error in done callback: %s', err)
 
     def __cpulimit(self):
         """
@@ -258,6 +898,10 @@ class PopenThread(Thread):
         if not (self._proc and CPULIMIT and self._cpulimit):
             return None
 
+        # Process has dedicated cores, so no need to limit it
+        if self._cores:
+            return None
+
         if self.threads is None:
             self.__log.warning("Thread not set, cannot limit CPU")
             return None
@@ -274,8 +918,125 @@ class PopenThread(Thread):
         return None
 
 
+class FuncThread(PopenThread):
+    """
+    Run a Python callable as a job in a PopenPool
+
+    The job is queued and admitted in the same way as a process, holding
+    its threads, memory, and disk space while the callable runs in this
+    thread. The result of the future is the return value of the callable.
+
+    Note:
+        A job that starts processes in the pool, and only waits on them,
+        should use threads=None so that it does not hold threads the
+        processes need to start.
+
+    """
+
+    def __init__(
+        self,
+        func,
+        *args,
+        threads=None,
+        priority=0,
+        job_class=NORMAL,
+        memory=None,
+        disk=None,
+        **kwargs,
+    ):
+        """
+        Arguments:
+            func: Callable to run
+            *args: Arguments for func
+
+        Keyword arguments:
+            threads (int): Number of threads the callable uses; default
+                is None, which does not hold any threads
+            priority (int): See PopenThread
+            job_class (str): See PopenThread
+            memory (int): See PopenThread
+            disk (list): See PopenThread
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            A FuncThread instance
+
+        """
+
+        super().__init__(
+            threads=threads,
+            priority=priority,
+            job_class=job_class,
+            memory=memory,
+            disk=disk,
+        )
+        self.__log = logging.getLogger(__name__)
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def result(self, timeout=None):
+        """
+        Wait for the callable and get its return value
+
+        Raises any exception raised by the callable; see
+        concurrent.futures.Future.result()
+
+        """
+
+        return self._future.result(timeout=timeout)
+
+    def wait(self, timeout=None):
+        """Wait for the callable to finish, ignoring any exception"""
+
+        try:
+            self._future.exception(timeout=timeout)
+        except CancelledError:
+            return True
+        except FutureTimeout:
+            return False
+
+        if self.is_alive():
+            self.join()
+        return True
+
+    def pause(self):
+        """Callables cannot be paused"""
+
+        return False
+
+    def run(self):
+        """Run the callable"""
+
+        if not self._begin():
+            return
+
+        self.__log.debug('Running function : %s', self._func)
+        try:
+            result = self._func(*self._args, **self._kwargs)
+        except BaseException as err:
+            self.__log.error('Error in function %s : %s', self._func, err)
+            self._returncode = 1
+            self._end()
+            self._future.set_exception(err)
+        else:
+            self._returncode = 0
+            self._end()
+            self._future.set_result(result)
+        self._run_callbacks()
+
+
 class PopenPool(Thread):
-    """Mimic multiprocessing.Pool class, but for subprocess.Popen objects"""
+    """
+    Mimic multiprocessing.Pool class, but for subprocess.Popen objects
+
+    Queued processes are started in order of job class, then priority, then
+    submission. If a process cannot start because the threads are in use,
+    running processes of a preemptible job class (bulk by default) that
+    rank below it are paused until it can start. Paused processes are
+    resumed once no higher ranking process is waiting.
+
+    """
 
     __threads = 1
     __cpulimit = None
@@ -286,6 +1047,8 @@ class PopenPool(Thread):
         threads=None,
         cpulimit=None,
         queueDepth=None,
+        nice=None,
+        ionice=None,
         **kwargs,
     ):
         """
@@ -294,9 +1057,14 @@ class PopenPool(Thread):
 
         Keyword arguments:
             threads (int): Number of threads to allow to run at one time
-            cpulimit (int): Percentage of CPU to allow each subprocess to use
+            cpulimit (int): Percentage of CPU to allow each subprocess to use;
+                only used where subprocesses cannot be pinned to dedicated
+                cores (i.e., not Linux)
             queueDepth (int): Number of subprocesses that can be queued before
                 the popen_async method blocks
+            nice (int): Default niceness increment for subprocesses
+            ionice (str): Default I/O scheduling class for subprocesses; one
+                of 'realtime', 'best-effort', or 'idle'
             **kwargs: All keyword arguments accepted by threading.Thread
 
         Returns:
@@ -312,9 +1080,21 @@ class PopenPool(Thread):
         if not isinstance(queueDepth, int):
             queueDepth = 50
 
-        self.__thread_queue = Queue(maxsize=queueDepth)
+        # Queue is unbounded so that the pool can requeue processes; the
+        # semaphore limits the number of processes waiting to start
+        self.__thread_queue = PriorityQueue()
+        self.__queue_slots = Semaphore(queueDepth)
+        self.__seq = count()
+        # Running processes and processes paused by the pool
+        self.__running = []
+        self.__paused = []
+        # Number of processes submitted, but not yet finished
+        self.__pending = 0
+        self.__pending_cond = Condition()
         self.threads = threads
         self.cpulimit = cpulimit
+        self.nice = nice
+        self.ionice = ionice
 
         self.start()
 
@@ -338,6 +1118,13 @@ class PopenPool(Thread):
         cls.__threads = val
         PROCLOCK.threads = cls.__threads
 
+    @property
+    def running(self):
+        """List of PopenThread instances that are running or paused"""
+
+        with self.__pending_cond:
+            return self.__running + self.__paused
+
     @property
     def cpulimit(self):
         """Percentage of CPU allowed for each process"""
@@ -381,20 +1168,24 @@ class PopenPool(Thread):
 
         """
 
-        endtime = None
-        while PROCLOCK.n > 0 or self.__thread_queue.unfinished_tasks > 0:
-            # If timeout is not None; i.e., it is set
-            if timeout is not None:
-                # If endtime is None; i.e., first time through loop
-                if endtime is None:
-                    endtime = time.monotonic() + timeout
-                else:
-                    timeout = endtime - time.monotonic()
-                    if timeout <= 0.0:
-                        break
-            # Sleep a default amount of time every loop
-            time.sleep(TIMEOUT)
-        return PROCLOCK.n == 0
+        with self.__pending_cond:
+            return self.__pending_cond.wait_for(
+                lambda: self.__pending == 0,
+                timeout=timeout,
+            )
+
+    def group(self):
+        """
+        Create a group of processes that can be waited on together
+
+        Returns:
+            JobGroup : Processes started with the popen_async method of the
+                group run in this pool; use as a context manager to wait
+                for all of them on exit
+
+        """
+
+        return JobGroup(self)
 
     def popen_async(self, *args, **kwargs):
         """
@@ -406,6 +1197,22 @@ class PopenPool(Thread):
         Keyword arguments:
             threads (int): Specify the number of threads the process will use.
                 Default is one (1)
+            priority (int): Priority of the process within its job class;
+                higher values are started first. Default is zero (0)
+            cpulimit (int): Percentage of CPU to allow the process to use;
+                overrides pool default
+            nice (int): Niceness increment; overrides pool default
+            memory (int): Bytes of memory the process is expected to use;
+                the process is not started until this is available
+            disk (list): (path, bytes) tuples of disk space the process
+                will write; the process is not started until this is free
+            ionice (str): I/O scheduling class; overrides pool default
+            job_class (str): One of 'interactive', 'normal', or 'bulk'.
+                Processes are started in this order, and running 'bulk'
+                processes may be paused to start processes of the other
+                classes. Default is 'normal'
+            progress (FFmpegProgress): Object tracking progress of an
+                ffmpeg process; available from the returned PopenThread
             **kwargs All keywords for subprocess.Popen
 
         Returns:
@@ -421,11 +1228,69 @@ class PopenPool(Thread):
         if self.__closed.is_set():
             raise Exception('Cannot add process to closed pool')
 
-        kwargs['cpulimit'] = self.cpulimit
-        proc = PopenThread(*args, **kwargs)
-        self.__thread_queue.put(proc)
+        if kwargs.get('cpulimit', None) is None:
+            kwargs['cpulimit'] = self.cpulimit
+        kwargs.setdefault('nice', self.nice)
+        kwargs.setdefault('ionice', self.ionice)
+        return self._submit(PopenThread(*args, **kwargs))
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Run Python callable as a job in the pool
+
+        The callable runs in its own thread once the pool admits it, in
+        the same order and with the same thread accounting as processes.
+
+        Arguments:
+            func: Callable to run
+            *args: Arguments for func
+
+        Keyword arguments:
+            threads (int): Number of threads the callable uses. Default is
+                None, which holds no threads; use this for callables that
+                only wait on processes they start in the pool
+            priority (int): See popen_async()
+            job_class (str): See popen_async()
+            memory (int): See popen_async()
+            disk (list): See popen_async()
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            FuncThread : Use the result() method to get the return value
+
+        """
+
+        if self.__closed.is_set():
+            raise Exception('Cannot add job to closed pool')
+
+        return self._submit(FuncThread(func, *args, **kwargs))
+
+    def _submit(self, proc):
+        """Count job as pending and add it to the queue"""
+
+        proc.add_done_callback(self._finished)
+        self.__queue_slots.acquire()
+        with self.__pending_cond:
+            self.__pending += 1
+        self._enqueue(proc)
         return proc
 
+    def _enqueue(self, proc):
+        """Add process to queue, ordered by rank and submission"""
+
+        self.__thread_queue.put((proc.rank, next(self.__seq), proc))
+
+    def _finished(self, proc=None):
+        """Decrement count of pending processes and wake waiters"""
+
+        with self.__pending_cond:
+            if proc in self.__running:
+                self.__running.remove(proc)
+            if proc in self.__paused:
+                self.__paused.remove(proc)
+            self.__pending = max(self.__pending - 1, 0)
+            self.__pending_cond.notify_all()
+
     def run(self):
         """Handles dequeuing and starting Popen processes."""
 
@@ -434,19 +1299,21 @@ class PopenPool(Thread):
 
         # Loop while a terminate has NOT been called
         while not _sigtermEvent.is_set():
+            # Continue paused processes if nothing ranked above them waits
+            self._resume(thread)
             # If PopenThread is None, we will try to get a thread
             # object from the queue
             if thread is None:
                 try:
                     # Get first element of threads list queue
-                    thread = self.__thread_queue.get(timeout=TIMEOUT)
-                except:
+                    *_, thread = self.__thread_queue.get(timeout=TIMEOUT)
+                except Empty:
                     pass
-                else:
-                    # Try to run the thread; the _popen method will return
-                    # None if the process was started, otherwise return input
-                    thread = self._popen(thread)
             else:
+                # Higher ranking process may have been queued while waiting
+                thread = self._swap(thread)
+
+            if thread is not None:
                 # Try to run the thread; the _popen method will return None
                 # if the process was started, otherwise return input
                 thread = self._popen(thread)
@@ -460,10 +1327,22 @@ class PopenPool(Thread):
             )):
                 break
 
+        # Processes that never started will never finish
+        if thread is not None:
+            self.__thread_queue.task_done()
+            self.__queue_slots.release()
+            thread.discard()
+
         # While the Queue is not empty
         while not self.__thread_queue.empty():
-            _ = self.__thread_queue.get()
+            *_, thread = self.__thread_queue.get()
             self.__thread_queue.task_done()
+            self.__queue_slots.release()
+            thread.discard()
+
+        # Make sure nothing is left stopped
+        for proc in list(self.__paused):
+            proc.kill()
 
         self.__log.debug('PopenPool closed')
 
@@ -487,22 +1366,294 @@ class PopenPool(Thread):
 
         """
 
-        # Grab lock specifying theads and with timeout
-        if PROCLOCK.acquire(timeout=TIMEOUT, threads=thread.threads):
-            # If got lock, start the thread; note that the thread might get
-            # stuck as it tries to acquire the lock, but that is fine
+        # Process cancelled while queued, so drop it
+        if thread.future.cancelled():
+            self.__thread_queue.task_done()
+            self.__queue_slots.release()
+            thread.discard()
+            return None
+
+        # Wait for memory and disk space; woken when any process finishes
+        if not RESOURCES.fits(thread.memory, thread.disk):
+            with self.__pending_cond:
+                self.__pending_cond.wait(TIMEOUT)
+            return thread
+
+        # Grab lock specifying theads and with timeout; the lock wakes us
+        # as soon as threads are released, the timeout only ensures that
+        # a SIGTERM is noticed
+        acquired = PROCLOCK.acquire(blocking=False, threads=thread.threads)
+        if not acquired:
+            self._preempt(thread)
+            acquired = PROCLOCK.acquire(
+                timeout=TIMEOUT,
+                threads=thread.threads,
+            )
+
+        if acquired:
+            # If got lock, hand it over to the thread and start it; the
+            # thread will release the lock when the process finishes
+            with self.__pending_cond:
+                self.__running.append(thread)
+            thread.admit()
             thread.start()
-            PROCLOCK.release(threads=thread.threads)
 
-            # Wait for thread to really start; an event in the object will
-            # be set after the lock is acquired
-            thread.start_wait()
             # Signal that work on dequeued item finished; this will decrement
             # the Queue.unfinished_tasks value
             self.__thread_queue.task_done()
+            self.__queue_slots.release()
 
             # Return None to signal thread started
             return None
 
         # Return thread to signal NOT started
         return thread
+
+    def _swap(self, thread):
+        """
+        Swap waiting process for higher ranking process in the queue
+
+        Arguments:
+            thread: PopenThread waiting to start
+
+        Returns:
+            The PopenThread that should be started next
+
+        """
+
+        with self.__thread_queue.mutex:
+            queue = self.__thread_queue.queue
+            if len(queue) == 0 or queue[0][0] >= thread.rank:
+                return thread
+
+        try:
+            *_, head = self.__thread_queue.get_nowait()
+        except Empty:
+            return thread
+
+        # Put the waiting thread back in the queue; task_done is called
+        # because it will be counted again when requeued
+        self.__thread_queue.task_done()
+        self._enqueue(thread)
+        return head
+
+    def _preempt(self, thread):
+        """
+        Pause lower ranking processes so that thread can start
+
+        Processes are only paused if doing so frees enough threads for the
+        new process to start. The lowest ranking, most recently started
+        processes are paused first.
+
+        Arguments:
+            thread: PopenThread waiting to start
+
+        Returns:
+            bool : True if any processes were paused
+
+        """
+
+        if thread.threads is None:
+            return False
+
+        with self.__pending_cond:
+            victims = [
+                proc
+                for proc in self.__running
+                if proc.job_class in PREEMPTIBLE
+                and proc.rank[0] > thread.rank[0]
+                and proc.threads is not None
+                and not proc.paused
+            ]
+
+        # Lowest ranking last in list, so reversed puts those first
+        victims = sorted(victims, key=lambda proc: proc.rank)[::-1]
+        needed = PROCLOCK.n + thread.threads - PROCLOCK.threads
+        if needed <= 0 or sum(proc.threads for proc in victims) < needed:
+            return False
+
+        paused = False
+        for proc in victims:
+            if needed <= 0:
+                break
+            if proc.pause():
+                needed -= proc.threads
+                paused = True
+                with self.__pending_cond:
+                    self.__running.remove(proc)
+                    self.__paused.append(proc)
+        return paused
+
+    def _resume(self, thread):
+        """
+        Resume paused processes if no higher ranking process is waiting
+
+        Arguments:
+            thread: PopenThread waiting to start, or None
+
+        Returns:
+            None
+
+        """
+
+        if len(self.__paused) == 0:
+            return
+
+        best = thread.rank if thread is not None else None
+        with self.__thread_queue.mutex:
+            queue = self.__thread_queue.queue
+            if len(queue) > 0 and (best is None or queue[0][0] < best):
+                best = queue[0][0]
+
+        with self.__pending_cond:
+            paused = sorted(self.__paused, key=lambda proc: proc.rank)
+
+        for proc in paused:
+            if best is not None and best[0] < proc.rank[0]:
+                break
+            if not proc.resume():
+                break
+            with self.__pending_cond:
+                if proc in self.__paused:
+                    self.__paused.remove(proc)
+                    self.__running.append(proc)
+
+
+class JobGroup:
+    """
+    Group of processes submitted to a PopenPool
+
+    Allows waiting on, or cancelling, only the processes started through
+    the group rather than every process in the pool. When used as a
+    context manager, exiting the block waits for all processes in the
+    group; if the block raised an exception, they are cancelled first.
+
+    Example:
+        code-block::
+
+           with POPENPOOL.group() as group:
+               for cmd in cmds:
+                   group.popen_async(cmd, threads=1)
+           if any(group.returncodes):
+               ...
+
+    """
+
+    def __init__(self, pool):
+        """
+        Arguments:
+            pool (PopenPool) : Pool to run processes in
+
+        """
+
+        self._pool = pool
+        self._jobs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is not None:
+            self.cancel()
+        self.wait()
+
+    def __iter__(self):
+        return iter(self._jobs)
+
+    def __len__(self):
+        return len(self._jobs)
+
+    @property
+    def jobs(self):
+        """List of PopenThread instances in the group"""
+
+        return list(self._jobs)
+
+    @property
+    def futures(self):
+        """List of concurrent.futures.Future objects for the group"""
+
+        return [job.future for job in self._jobs]
+
+    @property
+    def returncodes(self):
+        """Return codes of processes in the group; None if not finished"""
+
+        return [job.returncode for job in self._jobs]
+
+    def popen_async(self, *args, **kwargs):
+        """
+        Run process in the pool as part of this group
+
+        Arguments and keywords are the same as for PopenPool.popen_async()
+
+        Returns:
+            PopenThread instance
+
+        """
+
+        job = self._pool.popen_async(*args, **kwargs)
+        self._jobs.append(job)
+        return job
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Run Python callable in the pool as part of this group
+
+        Arguments and keywords are the same as for PopenPool.submit()
+
+        Returns:
+            FuncThread instance
+
+        """
+
+        job = self._pool.submit(func, *args, **kwargs)
+        self._jobs.append(job)
+        return job
+
+    def wait(self, timeout=None):
+        """
+        Wait for all processes in the group to finish
+
+        Keyword arguments:
+            timeout (float) : Maximum time, in seconds, to wait
+
+        Returns:
+            bool : True if all processes finished, False on timeout
+
+        """
+
+        _, not_done = futures_wait(self.futures, timeout=timeout)
+        if len(not_done) > 0:
+            return False
+        for job in self._jobs:
+            job.wait()
+        return True
+
+    def cancel(self):
+        """
+        Cancel all processes in the group
+
+        Processes that have not started are prevented from starting and
+        running processes are killed.
+
+        """
+
+        for job in self._jobs:
+            job.kill()
+
+    def as_completed(self, timeout=None):
+        """
+        Iterate over processes in the group as they finish
+
+        Keyword arguments:
+            timeout (float) : See concurrent.futures.as_completed()
+
+        Returns:
+            Generator yielding PopenThread instances
+
+        """
+
+        jobs = {job.future: job for job in self._jobs}
+        for future in futures_as_completed(jobs, timeout=timeout):
+            yield jobs[future]
@@ -0,0 +1,302 @@
+"""
+Stage timing for the conversion pipeline
+
+Each stage of a conversion (probing, commercial detection, HDR metadata
+extraction, encoding, muxing, tagging, subtitles, ...) is wrapped in a span.
+When a span finishes, one JSON object is appended to the timing log with the
+wall time of the stage, the CPU time used by this process and by child
+processes that finished during the stage, and the bytes read and written by
+both.
+
+Records are only written once enabled, either with set_timing_log() or with
+the VIDEO_UTILS_TIMING_LOG environment variable or TIMING_LOG config setting.
+Set either to true to log to TIMINGLOG in the config, or to the path of the
+file to log to. The log is rolled over when it grows too large, in the same
+way as the other log files.
+
+Spans nest; each record holds the path of the spans it ran inside of, e.g.,
+'transcode/encode', so the log can be grouped by stage or by conversion.
+
+Note:
+    CPU time and I/O counters are process wide. Spans that run at the same
+    time in different threads each include the work of the other, so only
+    the wall time of overlapping spans should be compared. Child CPU time is
+    only counted once the child has been waited on, which the subprocess
+    pool does as soon as the child exits.
+
+Example:
+    >>> with span('encode', file=infile) as stage:
+    ...     run_ffmpeg()
+    ...     stage.set(returncode=0)
+
+"""
+
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import json
+import time
+from datetime import datetime
+from functools import wraps
+from threading import Lock, local, current_thread
+
+import psutil
+
+from ..config import CONFIG, ROTATING_FORMAT, TIMINGLOG
+
+ENVNAME = 'VIDEO_UTILS_TIMING_LOG'
+
+_LOCK = Lock()
+_LOCAL = local()
+_LOG = logging.getLogger(__name__)
+
+
+def _default_logfile() -> str | None:
+    """Timing log enabled by environment variable or config setting"""
+
+    setting = os.environ.get(ENVNAME, None)
+    if setting is None:
+        setting = CONFIG.get('TIMING_LOG', None)
+    if isinstance(setting, str):
+        if setting.lower() in ('', '0', 'false', 'no', 'off'):
+            return None
+        if setting.lower() in ('1', 'true', 'yes', 'on'):
+            return TIMINGLOG
+        return setting
+    return TIMINGLOG if setting is True else None
+
+
+_STATE = {'logfile': _default_logfile(), 'handler': None}
+
+
+def set_timing_log(logfile: str | None) -> None:
+    """
+    Set file that span records are appended to
+
+    Arguments:
+        logfile (str) : Path to JSON lines file. Set to None to stop
+            writing span records; this is the default unless enabled in
+            the environment or config
+
+    Keyword arguments:
+        None
+
+    Returns:
+        None
+
+    """
+
+    with _LOCK:
+        _STATE['logfile'] = logfile
+        handler, _STATE['handler'] = _STATE['handler'], None
+    if handler is not None:
+        handler.close()
+
+
+class Span:
+    """
+    Time one stage of the pipeline
+
+    Use as a context manager; the record is written on exit, with an 'error'
+    field naming the exception if one was raised.
+
+    """
+
+    def __init__(self, name: str, **attrs):
+        """
+        Arguments:
+            name (str) : Name of the stage
+
+        Keyword arguments:
+            **attrs : Extra fields for the record, e.g., the file being
+                processed. Must be JSON serializable
+
+        Returns:
+            A Span instance
+
+        """
+
+        self.name = name
+        self.attrs = attrs
+        self.path = name
+        self.record = None
+        self._proc = psutil.Process()
+        self._start = None
+        self._cpu = None
+        self._io = None
+
+    def set(self, **attrs) -> None:
+        """Add fields to the record written when the span finishes"""
+
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        if stack:
+            self.path = f"{stack[-1].path}/{self.name}"
+        stack.append(self)
+
+        self._cpu = self._cpu_times()
+        self._io = self._io_counters()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.monotonic() - self._start
+        cpu = self._cpu_times()
+        io = self._io_counters()
+
+        stack = _stack()
+        if self in stack:
+            stack.remove(self)
+
+        self.record = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'span': self.name,
+            'path': self.path,
+            'pid': os.getpid(),
+            'thread': current_thread().name,
+            'wall': round(wall, 3),
+            'cpu': _delta(self._cpu[0], cpu[0]),
+            'cpu_children': _delta(self._cpu[1], cpu[1]),
+            'read_bytes': _delta(self._io[0], io[0]),
+            'write_bytes': _delta(self._io[1], io[1]),
+            'disk_read_bytes': _delta(self._io[2], io[2]),
+            'disk_write_bytes': _delta(self._io[3], io[3]),
+            **self.attrs,
+        }
+        if exc_type is not None:
+            self.record['error'] = exc_type.__name__
+
+        _LOG.debug(
+            'Span %s : %0.1f s wall, %s s CPU in children',
+            self.path,
+            wall,
+            self.record['cpu_children'],
+        )
+        _write(self.record)
+        return False
+
+    def _cpu_times(self) -> tuple:
+        """Get (self, children) CPU time in seconds"""
+
+        try:
+            times = self._proc.cpu_times()
+        except psutil.Error:
+            return (None, None)
+        return (
+            times.user + times.system,
+            times.children_user + times.children_system,
+        )
+
+    def _io_counters(self) -> tuple:
+        """Get bytes read/written through syscalls and from/to disk"""
+
+        try:
+            counts = self._proc.io_counters()
+        except (psutil.Error, AttributeError):
+            return (None, None, None, None)
+        return (
+            getattr(counts, 'read_chars', counts.read_bytes),
+            getattr(counts, 'write_chars', counts.write_bytes),
+            counts.read_bytes,
+            counts.write_bytes,
+        )
+
+
+def span(name: str, **attrs) -> Span:
+    """
+    Time a stage of the pipeline
+
+    Arguments:
+        name (str) : Name of the stage
+
+    Keyword arguments:
+        **attrs : Extra fields for the record
+
+    Returns:
+        Span : Context manager that writes the record on exit
+
+    """
+
+    return Span(name, **attrs)
+
+
+def timed(name: str | None = None):
+    """
+    Decorator to time every call of a function as a span
+
+    Arguments:
+        name (str) : Name of the stage. Default is the function name
+
+    Keyword arguments:
+        None
+
+    Returns:
+        Decorator
+
+    """
+
+    def decorator(func):
+        stage = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _stack() -> list:
+    """Spans open in the current thread"""
+
+    if not hasattr(_LOCAL, 'stack'):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+def _delta(start, end):
+    """Difference of counters, or None if either is unavailable"""
+
+    if start is None or end is None:
+        return None
+    if isinstance(start, float):
+        return round(end - start, 3)
+    return end - start
+
+
+def _write(record: dict) -> None:
+    """Append record to the timing log as one JSON line"""
+
+    if not _STATE['logfile']:
+        return
+
+    handler = _handler()
+    if handler is not None:
+        handler.handle(
+            logging.makeLogRecord({'msg': json.dumps(record, default=str)})
+        )
+
+
+def _handler() -> RotatingFileHandler | None:
+    """Rotating handler for the timing log, opened on first use"""
+
+    with _LOCK:
+        logfile = _STATE['logfile']
+        if _STATE['handler'] is None and logfile:
+            try:
+                os.makedirs(os.path.dirname(logfile), exist_ok=True)
+                handler = RotatingFileHandler(
+                    logfile,
+                    encoding='utf8',
+                    **ROTATING_FORMAT,
+                )
+            except OSError as err:
+                _LOG.debug('Failed to open timing log : %s', err)
+                return None
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _STATE['handler'] = handler
+        return _STATE['handler']
@@ -22,12 +22,23 @@ from .comremove import ComRemove
 from .utils import _sigintEvent, _sigtermEvent, isRunning, thread_check
 from .utils import hdr_utils
 from .utils.handlers import RotatingFile
-from .utils.ffmpeg_utils import cropdetect, FFmpegProgress
+from .utils.subproc_pool import BULK, NORMAL
+from .utils.timing import span
+from .utils.ffmpeg_utils import (
+    cropdetect,
+    get_chapters,
+    get_keyframe_time,
+    get_video_length,
+    segment_times,
+    write_ffconcat,
+    FFmpegProgress,
+)
 
 from .subtitles import opensubtitles
 from .subtitles import ccextract
 from .subtitles import subtitle_extract
 from .subtitles import sub_to_srt
+from .subtitles.srt_utils import srt_cut
 
 from .videotagger import getMetaData
 
@@ -38,6 +49,12 @@ from .config import get_comskip_log, get_transcode_log, fileFMT
 # followed by ' - ' string
 SE_PAT = re.compile(r'[sS](\d{2,})[eE](\d{2,})')
 
+# Approximate number of frames an encoder holds in memory at one time;
+# covers lookahead, reference, and frame-threading buffers
+ENCODER_FRAMES = {'libx264': 60, 'libx265': 90}
+# Memory used by an encoder process regardless of frame size
+ENCODER_BASE_MEMORY = 256 * 2**20
+
 
 class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
     """
@@ -70,6 +87,9 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         subtitles: bool = False,
         srt: bool = False,
         sub_delete_source: bool = False,
+        segments: int | None = None,
+        fused_cut: bool = True,
+        sub_job_class: str = NORMAL,
         **kwargs,
     ):
         """
@@ -102,6 +122,20 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             sub_delete_source (bool): Set to delete VobSub file(s) after
                 they have been  converted to SRT format. Used in conjunction
                 with srt keyword.
+            segments (int): Set to split the video stream into this many
+                GOP-aligned segments that are encoded in parallel and then
+                losslessly joined. Segments are split at chapter marks
+                when available. Ignored for HDR content.
+            fused_cut (bool): When cutting out commercials, drop them
+                during the transcode instead of cutting and joining the
+                source file first; saves two full passes over the file.
+                Not used if subtitles are extracted from a file other than
+                MPEG-TS, as only the SRT files made from captions can be
+                cut to match the video.
+            sub_job_class (str): Job class of the subtitle extraction and
+                conversion that runs while the video is encoded. Set to
+                'bulk' so that it only uses threads the encode leaves free,
+                rather than pausing the encode. Default is 'normal'
             username (str): User name for opensubtitles.org
             userpass (str): Password for opensubtitles.org. Recommend that
                 this be the md5 hash of the password and not
@@ -136,6 +170,10 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         self.x265 = x265
         self.remove = remove
         self.sub_delete_source = sub_delete_source
+        self.segments = segments
+        self.fused_cut = fused_cut
+        self.sub_job_class = sub_job_class
+        self.cut_segments = None
         self.infile = None
         self.outfile = None
         self.hevc_file = None
@@ -183,6 +221,7 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         self._start_time = None
         self._created_files = None
+        self._sub_job = None
         self.__file_handler = None
 
     @property
@@ -257,6 +296,8 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             chapters (bool): Set if commericals are to be marked with chapters.
                 Default is to cut commericals out of video file
             comdetect (bool): Set to remove/mark commercial segments in file
+            edl_file (str): Path to .edl file with commercial breaks that
+                were already found; comskip is not run if set
 
         Returns:
             Outputs a transcoded video file in the MP4 container and
@@ -277,8 +318,35 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         # Clear the 'global' kill event that may have been set by SIGINT
         _sigintEvent.clear()
 
+        self.transcode_status = None
+        with span('transcode', file=infile) as stage:
+            outfile = self._transcode_stages(
+                infile,
+                log_file=log_file,
+                metadata=metadata,
+                chapters=chapters,
+                **kwargs,
+            )
+            stage.set(status=self.transcode_status)
+        return outfile
+
+    def _transcode_stages(
+        self,
+        infile: str,
+        log_file: str | None = None,
+        metadata: dict | None = None,
+        chapters: bool = False,
+        **kwargs
+    ) -> str | bool | None:
+        """
+        Run each stage of the transcode; see transcode() for arguments
+
+        """
+
         # If there was an issue with the file_info function, just return
-        if not self.file_info(infile, metadata=metadata):
+        with span('file_info'):
+            info = self.file_info(infile, metadata=metadata)
+        if not info:
             return False
 
         # Run method to initialize logging to file
@@ -292,6 +360,7 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         self._start_time = datetime.now()
         self.chapter_file = None
+        self.cut_segments = None
         self.transcode_status = None
         self._created_files = []
 
@@ -315,53 +384,280 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         # If the comdetect keywords is set; if key not given use
         # class-wide setting
-        if not self._comdetect(chapters, **kwargs):
+        with span('comdetect'):
+            comdetect = self._comdetect(chapters, **kwargs)
+        if not comdetect:
             return None
 
-        self.__log.info("Transcoding file...")
+        # Subtitles do not depend on the encoded video, so get them while
+        # encoding. Started after commercial detection as the source file
+        # may be cut in place
+        self._sub_job = self._start_subtitles()
+
+        # The subtitle job reads and sets attributes for this file, so it
+        # must not outlive the transcode; e.g., if the converter is reused
+        try:
+            self.__log.info("Transcoding file...")
+
+            with span('hdr_metadata'):
+                self.hdr_metadata()
+
+            # Append outfile to list of created files
+            self._created_files.append(outfile)
+
+            # Segment times are for the uncut file, so segmented transcoding is
+            # not used when commercials are dropped during the transcode
+            with span('encode') as stage:
+                if (
+                    self.segments
+                    and self.hevc_file is None
+                    and not self.cut_segments
+                ):
+                    self.transcode_status = self._segment_transcode(outfile)
+                else:
+                    self.transcode_status = self._transcode(outfile)
+                stage.set(returncode=self.transcode_status)
+
+            with span('postprocess'):
+                outfile = self.transcode_postprocess(outfile)
+        except BaseException:
+            self._join_subtitles()
+            self._created_files = self._clean_up(*self._created_files)
+            raise
+
+        # Clean up chapter file and commercial cut script
+        self.chapter_file = self._clean_up(
+            self.chapter_file,
+            self._cut_script(),
+        )
+
+        if isRunning():
+            self._prog_file = self._clean_up(self._prog_file)
+
+        return outfile
+
+    def _transcode(self, outfile: str) -> int:
+        """
+        Transcode the input file using a single ffmpeg process
+
+        Arguments:
+            outfile (str): Path of the output file
 
-        self.hdr_metadata()
+        Returns:
+            int : Return code of the ffmpeg process; -1 if failed to start
 
-        # Append outfile to list of created files
-        self._created_files.append(outfile)
+        """
 
         # Generate ffmpeg command list
-        ffmpeg_cmd = self._ffmpeg_command(self.hevc_file or outfile)
+        ffmpeg_cmd = self._ffmpeg_command(
+            self.hevc_file or outfile,
+            segments=self.cut_segments,
+        )
 
-        # Initialize ffmpeg progress class
-        prog = FFmpegProgress(nintervals=10)
-        stderr = RotatingFile(
-            self.transcode_log,
-            callback=prog.progress,
+        # Initialize ffmpeg progress class; ffmpeg writes progress to stdout
+        prog = FFmpegProgress(
+            nintervals=10,
+            duration=self._output_duration(),
         )
 
         try:
             proc = POPENPOOL.popen_async(
                 ffmpeg_cmd,
                 threads=self.threads,
-                stderr=stderr,
+                job_class=BULK,
+                **self.resource_estimate(),
+                progress=prog,
+                stderr=RotatingFile(self.transcode_log),
                 universal_newlines=True,
             )
         except Exception as err:
             self.__log.exception("FFmpeg failed: %s", err)
-            proc = None
-        else:
+            return -1
+
+        proc.wait()
+        return proc.returncode
+
+    def _segment_transcode(self, outfile: str) -> int:
+        """
+        Transcode the input file in parallel segments
+
+        The video stream is split into GOP-aligned segments (see
+        :meth:`segment_boundaries`) that are encoded at the same time as
+        separate jobs in the process pool. The encoded segments are then
+        losslessly joined using the ffmpeg concat demuxer while the audio
+        streams, chapters, and metadata are copied from the input file
+        using the same mapping as a single-process transcode.
+
+        Arguments:
+            outfile (str): Path of the output file
+
+        Returns:
+            int : Return code of the joining ffmpeg process, or of the
+                first failed segment encode.
+
+        """
+
+        times = self.segment_boundaries()
+        if len(times) < 2:
+            self.__log.info("Too few segments; using single transcode")
+            return self._transcode(outfile)
+
+        # Divide thread budget of the pool between the segments so that
+        # they can all run at the same time
+        threads, *_ = thread_check(POPENPOOL.threads // len(times))
+        self.__log.info(
+            "Encoding %d segments using %d thread(s) each",
+            len(times),
+            threads,
+        )
+
+        crop_vals = cropdetect(
+            self.infile,
+            self.video_size,
+            threads=self.threads,
+        )
+
+        resources = self.resource_estimate(fraction=1.0 / len(times))
+        length = self._output_duration()
+        base = f"{self.outfile}.segment"
+        concat_file = f"{base}.ffconcat"
+        seg_files = []
+        group = POPENPOOL.group()
+        for i, start in enumerate(times):
+            seg_file = f"{base}{i:03d}.mkv"
+            seg_files.append(seg_file)
+            duration = times[i + 1] - start if i < len(times) - 1 else None
+            seg_len = duration
+            if seg_len is None and length:
+                seg_len = length - start
+            cmd = [
+                "ffmpeg", "-nostdin", "-y",
+                "-progress", "pipe:1", "-nostats",
+                "-ss", f"{start:0.6f}",
+                "-i", self.infile,
+                *self._video_args(crop_vals, duration=duration),
+                "-an", "-sn", "-dn",
+                "-threads", str(threads),
+                "-max_muxing_queue_size", "4096",
+                "-f", "matroska",
+                seg_file,
+            ]
+            group.popen_async(
+                cmd,
+                threads=threads,
+                job_class=BULK,
+                **resources,
+                progress=FFmpegProgress(interval=None, duration=seg_len),
+                stderr=RotatingFile(self.transcode_log),
+                universal_newlines=True,
+            )
+
+        # Stop encoding remaining segments as soon as one fails
+        status = 0
+        for proc in group.as_completed():
+            if proc.returncode != 0 and status == 0:
+                self.__log.error(
+                    "Failed to encode segment %d",
+                    group.jobs.index(proc),
+                )
+                status = -1 if proc.returncode is None else proc.returncode
+                group.cancel()
+        group.wait()
+
+        if status == 0:
+            write_ffconcat(concat_file, seg_files)
+
+            proc = POPENPOOL.popen_async(
+                self._segment_join_command(concat_file, outfile),
+                stderr=RotatingFile(self.transcode_log),
+                universal_newlines=True,
+            )
             proc.wait()
+            status = proc.returncode
+
+        self._clean_up(concat_file, *seg_files)
+        return status
+
+    def resource_estimate(self, fraction: float = 1.0) -> dict:
+        """
+        Estimate memory and disk space needed to transcode the video
+
+        Memory is estimated from the video frame size, bit depth, and the
+        number of frames the encoder keeps buffered. Disk space uses the
+        size of the input file as an upper bound for the size of the
+        output. When HDR metadata is injected, the raw HEVC stream is
+        written before being muxed into the output, so twice as much
+        space is needed.
+
+        Arguments:
+            None
+
+        Keyword arguments:
+            fraction (float): Fraction of the video being encoded; e.g.,
+                for segmented encoding. Only affects the disk estimate
+
+        Returns:
+            dict : The memory (bytes) and disk ((path, bytes) tuples)
+                keywords for :meth:`PopenPool.popen_async`
+
+        """
+
+        out = {}
+        size = self.video_size
+        if size is not None:
+            opts = self.video_info.get('-opts', []) if self.video_info else []
+            encoder = next(
+                (opt for opt in opts if opt in ENCODER_FRAMES),
+                'libx264',
+            )
+            # 4:2:0 is 1.5 samples per pixel; high bit depth uses 2 bytes
+            try:
+                depth = int(self.get('Video', [{}])[0].get('BitDepth', 8))
+            except:
+                depth = 8
+            frame_size = size[0] * size[1] * 1.5 * (2 if depth > 8 else 1)
+            out['memory'] = int(
+                ENCODER_BASE_MEMORY + frame_size * ENCODER_FRAMES[encoder]
+            )
 
         try:
-            self.transcode_status = proc.returncode
+            disk = os.path.getsize(self.infile) * fraction
         except:
-            self.transcode_status = -1
+            disk = 0
+        if disk > 0 and self.outfile:
+            if self.hevc_file:
+                disk *= 2
+            out['disk'] = [(os.path.dirname(self.outfile), int(disk))]
 
-        outfile = self.transcode_postprocess(outfile)
+        return out
 
-        # Clean up chapter file
-        self.chapter_file = self._clean_up(self.chapter_file)
+    def segment_boundaries(self) -> list[float]:
+        """
+        Determine keyframe-aligned start times for segmented transcoding
 
-        if isRunning():
-            self._prog_file = self._clean_up(self._prog_file)
+        Target times are evenly spaced over the video (or placed at the
+        nearest chapter marks) and then moved to the nearest keyframe so
+        that the concatenated segments contain every frame of the source
+        exactly once.
 
-        return outfile
+        Returns:
+            list : Start times, in seconds, of each segment
+
+        """
+
+        chapters = get_chapters(self.infile, probe_result=self.probe)
+        targets = segment_times(
+            get_video_length(self.infile, probe_result=self.probe),
+            self.segments,
+            chapters=chapters,
+        )
+
+        times = [0.0]
+        for target in targets[1:]:
+            keyframe = get_keyframe_time(self.infile, target)
+            if keyframe is not None and keyframe > times[-1]:
+                times.append(keyframe)
+        return times
 
     def transcode_postprocess(self, outfile):
         """
@@ -386,6 +682,8 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         # If the transcode failed
         if self.transcode_status != 0:
+            # Wait so that subtitle files are in the list to clean up
+            self._join_subtitles()
             # If the application is NOT running
             if not isRunning():
                 return outfile
@@ -408,21 +706,29 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
                 self.hdr10plus_file,
             )
 
-            cmd = ["mkvmerge", "-o", outfile, self.hevc_file, self.others_file]
-            proc = POPENPOOL.popen_async(cmd)
-            proc.wait()
+            cmd = [
+                "mkvmerge",
+                "-o", outfile,
+                self.hevc_file,
+                *self._mkvmerge_others(),
+            ]
+            with span('mkvmerge'):
+                proc = POPENPOOL.popen_async(cmd)
+                proc.wait()
 
             if proc.returncode != 0:
                 self.__log.error(
                     'Issue running mkvmerge! Removing all created files',
                 )
+                self._join_subtitles()
                 self._created_files = self._clean_up(*self._created_files)
                 return None
 
         if self.metadata:
             self.metadata.write_tags(outfile)
 
-        self.get_subtitles()
+        with span('subtitles_wait'):
+            self._join_subtitles()
         self._compression_ratio(outfile)
         self._remove_source()
 
@@ -465,17 +771,18 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         )
         self.hevc_file = f"{self.outfile}.hevc"
 
-        # Could check the is_dolby_vision and is_hdr10plus properties here...
-        self.dolby_vision_file = hdr_utils.dovi_extract(
-            self.infile,
-            self.outfile,
-        )
-        self.hdr10plus_file = hdr_utils.hdr10plus_extract(
+        # Only run the tools for metadata that is present; the HEVC stream
+        # is extracted once and shared between them
+        self.dolby_vision_file, self.hdr10plus_file = hdr_utils.hdr_extract(
             self.infile,
             self.outfile,
+            dolby_vision=self.is_dolby_vision,
+            hdr10plus=self.is_hdr10plus,
         )
 
         if self.dolby_vision_file is None and self.hdr10plus_file is None:
+            # Nothing to inject, so encode straight to the output file
+            self.hevc_file = None
             return
 
         self.__log.info("Rebuilding video_info with HDR metadata")
@@ -485,7 +792,10 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             hdr10plus_file=self.hdr10plus_file,
         )
 
-        self.others_file = f"{self.outfile}.mka"
+        # Audio can be muxed straight from the source file when nothing in
+        # the audio or chapters changes during the transcode
+        if not self._mux_from_source():
+            self.others_file = f"{self.outfile}.mka"
 
     def file_info(
         self,
@@ -544,11 +854,10 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         )
 
         # Try to get metadata
-        self.metadata = (
-            getMetaData(self.infile)
-            if metadata is None else
-            metadata
-        )
+        if metadata is None:
+            with span('metadata'):
+                metadata = getMetaData(self.infile)
+        self.metadata = metadata
 
         # If metadata is valid
         if self.metadata:
@@ -575,6 +884,47 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         self.outfile = '.'.join([outfile] + extra_info)
         return True
 
+    def _start_subtitles(self):
+        """
+        Start getting subtitles as a job in the pool
+
+        The job holds no threads as it only waits on the processes and
+        jobs it starts in the pool. Those run in the sub_job_class, below
+        other jobs of the same class, such as the encode.
+
+        Returns:
+            FuncThread : The job, or None if subtitles are not wanted
+
+        """
+
+        if (not self.subtitles) and (not self.srt):
+            return None
+
+        return POPENPOOL.submit(
+            self._get_subtitles,
+            job_class=self.sub_job_class,
+            priority=-1,
+        )
+
+    def _join_subtitles(self) -> None:
+        """
+        Wait for the subtitle job started before the encode
+
+        Files created by the job are added to the list of created files.
+
+        """
+
+        job, self._sub_job = self._sub_job, None
+        if job is None:
+            return
+
+        try:
+            files = job.result()
+        except Exception as err:
+            self.__log.error('Failed to get subtitles : %s', err)
+            return
+        self._created_files.extend(files)
+
     def get_subtitles(self, *args, **kwargs) -> None:
         """
         Try to get subtitles through various means
@@ -605,17 +955,34 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         """
 
+        self._created_files.extend(self._get_subtitles())
+
+    def _get_subtitles(self) -> list[str]:
+        """
+        Get subtitles; see get_subtitles()
+
+        Returns:
+            list : Paths of the files created
+
+        """
+
+        created = []
         if not isRunning():
-            return
+            return created
 
         # If both subtitles AND srt are False
         if (not self.subtitles) and (not self.srt):
-            return
+            return created
 
         # Get and parse text information from the file
-        self.text_info = self.get_text_info(self.lang)
-        if self.text_info is None:
-            return
+        with span('subtitles', file=self.infile):
+            self.text_info = self.get_text_info(self.lang)
+            if self.text_info is not None:
+                self._subtitles(created)
+        return created
+
+    def _subtitles(self, created: list[str]) -> None:
+        """Extract and convert text streams, adding files to created"""
 
         # If the input file format is MPEG-TS, then must use CCExtractor
         if self.format == "MPEG-TS":
@@ -629,7 +996,13 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
                 self.infile, self.outfile, self.text_info
             )
 
-            self._created_files.extend(srt_files)
+            # Captions are from the source file, so drop the commercials
+            # that are cut out during the transcode
+            if self.cut_segments:
+                for srt_file in srt_files or []:
+                    srt_cut(srt_file, self.cut_segments)
+
+            created.extend(srt_files or [])
 
             return
 
@@ -643,9 +1016,9 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             self.text_info,
             srt=self.srt,
         )
-        # Add list of files created by subtitles_extract to
-        # list of created files
-        self._created_files.extend(sub_files)
+        # Add files created by subtitles_extract to list of created files
+        for sub_info in (sub_files or {}).values():
+            created.extend(sub_info['files'])
         # If there were major errors in the subtitles extraction
         if self.sub_status > 1:
             return
@@ -656,9 +1029,12 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
                 self.text_info,
                 delete_soure=self.sub_delete_source,
                 cpulimit=self.cpulimit,
+                threads=self.threads,
+                job_class=self.sub_job_class,
+                priority=-1,
             )
 
-            self._created_files.extend(srt_files)
+            created.extend(srt_files)
 
     def _clean_up(self, *args) -> None:
         """Method to delete arbitrary number of files, catching exceptions"""
@@ -682,7 +1058,11 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
                     err,
                 )
 
-    def _ffmpeg_command(self, video_file: str) -> list[str]:
+    def _ffmpeg_command(
+        self,
+        video_file: str,
+        segments: list[tuple[float, float | None]] | None = None,
+    ) -> list[str]:
         """
         A method to generate full ffmpeg command list
 
@@ -690,14 +1070,17 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             video_file (str): Full output file path that ffmpeg will create
 
         Keyword arguments:
-            None
+            segments (list): (start, end) times, in seconds, of the parts of
+                the input file to keep; e.g., the show segments returned by
+                :meth:`comsegments`. End may be None for the end of the
+                file. Default is to transcode the whole file.
 
         Returns:
             list: Full ffmpeg command to run
 
         """
 
-        cmd = self._ffmpeg_base()
+        cmd = self._ffmpeg_base(segments=segments)
 
         # Attempt to detect cropping
         crop_vals = cropdetect(
@@ -705,25 +1088,15 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             self.video_size,
             threads=self.threads,
         )
-        video_keys = self._video_keys()
         audio_keys = self._audio_keys()
-        # Booleans for if all av options have been parsed
-        # av_opts    = [True, True]
 
-        for key in video_keys:
-            cmd.extend(self.video_info[key])
-            if key != '-filter':
-                continue
+        cmd.extend(self._video_args(crop_vals))
 
-            if crop_vals is not None:
-                if len(self.video_info[key]) != 0:
-                    # Add cropping to video filter
-                    cmd[-1] = f"{cmd[-1]},{crop_vals}"
-                else:
-                    # Add cropping values
-                    cmd.extend(["-vf", crop_vals])
-            # Add next options to ffmpeg
-            cmd.extend(self.video_info[next(video_keys)])
+        # Only the video stream is transcoded; everything else is muxed
+        # from the source file by mkvmerge
+        if self.hevc_file is not None and self.others_file is None:
+            cmd.append(video_file)
+            return cmd
 
         if self.others_file is not None:
             cmd.append(video_file)
@@ -748,10 +1121,106 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         return cmd
 
+    def _video_args(
+        self,
+        crop_vals: str | None = None,
+        duration: float | None = None,
+    ) -> list[str]:
+        """
+        Build ffmpeg options for the video stream
+
+        Arguments:
+            None
+
+        Keyword arguments:
+            crop_vals (str): Crop filter returned by
+                :func:`video_utils.utils.ffmpeg_utils.cropdetect`
+            duration (float): If set, a trim filter is added so that only
+                this many seconds of video are encoded. Unlike the -t
+                option, the trim filter is frame accurate.
+
+        Returns:
+            list : Mapping, filter, and codec options for the video stream
+
+        """
+
+        args = []
+        video_keys = self._video_keys()
+        for key in video_keys:
+            if key != '-filter':
+                args.extend(self.video_info[key])
+                continue
+
+            # Filter list is either empty or ['-vf', 'filter1,filter2']
+            filters = [
+                duration and f"trim=duration={duration:0.6f}",
+                *self.video_info[key][1:],
+                crop_vals,
+            ]
+            filters = [filt for filt in filters if filt]
+            if len(filters) > 0:
+                args.extend(["-vf", ",".join(filters)])
+            # Add next options to ffmpeg
+            args.extend(self.video_info[next(video_keys)])
+
+        return args
+
+    def _segment_join_command(
+        self,
+        concat_file: str,
+        outfile: str,
+    ) -> list[str]:
+        """
+        Generate ffmpeg command to join encoded segments
+
+        The encoded video segments are read through the concat demuxer
+        (input 0) and the audio streams are copied from the source file
+        (input 1) using the mapping from :meth:`get_audio_info`.
+
+        Arguments:
+            concat_file (str): Path to ffconcat file listing the segments
+            outfile (str): Path of the output file
+
+        Returns:
+            list : Full ffmpeg command to run
+
+        """
+
+        cmd = [
+            "ffmpeg", "-nostdin", "-y",
+            "-f", "concat", "-safe", "0",
+            "-i", concat_file,
+            "-i", self.infile,
+        ]
+        if (
+            isinstance(self.chapter_file, str)
+            and os.path.isfile(self.chapter_file)
+        ):
+            cmd.extend(["-i", self.chapter_file])
+            metadata = ["-map_metadata", "2"]
+        else:
+            metadata = ["-map_metadata", "1", "-map_chapters", "1"]
+
+        cmd.extend(["-map", "0:v", "-c:v", "copy"])
+        for key in self._audio_keys():
+            opts = self.audio_info[key]
+            if key == '-map':
+                # Audio streams come from the source file; i.e., input 1
+                opts = [
+                    f"1:{opt.split(':', 1)[1]}" if i % 2 else opt
+                    for i, opt in enumerate(opts)
+                ]
+            cmd.extend(opts)
+
+        # HDR content is always written to Matroska
+        fmt = "matroska" if self.is_hdr else self.container
+        return cmd + [*metadata, "-f", fmt, outfile]
+
     def _ffmpeg_base(
             self,
             strict='experimental',
             max_muxing_queue_size=4096,
+            segments=None,
     ):
         """
         A method to generate basic ffmpeg command
@@ -775,12 +1244,28 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
                         decoding untrusted input.
             max_muxing_queue_size (int): Should not have to change;
                 see https://trac.ffmpeg.org/ticket/6375
+            segments (list): (start, end) times of the parts of the input
+                file to keep. If set, the input is read through the concat
+                demuxer with an inpoint/outpoint pair for each segment so
+                that the rest of the file is never decoded. Start times
+                should be keyframes; see :meth:`_comsegments`.
 
         Returns:
             List containing base ffmpeg command for converting
 
         """
 
+        if segments:
+            infile = [
+                "-f", "concat", "-safe", "0",
+                "-i", write_ffconcat(
+                    self._cut_script(),
+                    [(self.infile, start, end) for start, end in segments],
+                ),
+            ]
+        else:
+            infile = ["-i", self.infile]
+
         if (
             isinstance(self.chapter_file, str)
             and os.path.isfile(self.chapter_file)
@@ -793,8 +1278,10 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
         else:
             chapters = []
 
-        if self.is_hdr:
+        if self.hevc_file is not None:
             fmt = ["-f", "hevc", "-bsf:v", "hevc_mp4toannexb"]
+        elif self.is_hdr:
+            fmt = ["-f", "matroska"]
         else:
             fmt = ["-f", self.container]
 
@@ -808,7 +1295,9 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             "ffmpeg",
             "-nostdin",
             "-y",
-            "-i", self.infile,
+            "-progress", "pipe:1",
+            "-nostats",
+            *infile,
             *chapters,
             *fmt,
             *threads,
@@ -816,6 +1305,86 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
             "-max_muxing_queue_size", str(max_muxing_queue_size),
         ]
 
+    def _output_duration(self) -> float | None:
+        """
+        Duration, in seconds, of the transcoded video
+
+        Returns:
+            float : Length of the input file, less any commercials that are
+                cut out during the transcode; None if unknown
+
+        """
+
+        length = get_video_length(self.infile, probe_result=self.probe)
+        if not length or not self.cut_segments:
+            return length
+        return sum(
+            (length if end is None else end) - start
+            for start, end in self.cut_segments
+        )
+
+    def _mux_from_source(self) -> bool:
+        """
+        Check if mkvmerge can take the audio streams from the source file
+
+        Audio streams are always copied, so they only need to be written to
+        a separate file when the source is not Matroska (track IDs would
+        not match), chapters are replaced, or commercials are cut.
+
+        """
+
+        chapters = (
+            isinstance(self.chapter_file, str)
+            and os.path.isfile(self.chapter_file)
+        )
+        return (
+            self.infile.lower().endswith('.mkv')
+            and not chapters
+            and not self.cut_segments
+        )
+
+    def _mkvmerge_others(self) -> list[str]:
+        """
+        Build mkvmerge options for everything but the video stream
+
+        Returns:
+            list : Path to the file with audio, chapters, etc. created by
+                ffmpeg or, if that file was not created, options to take the
+                selected audio streams, with the same titles and languages,
+                and the chapters from the source file
+
+        """
+
+        if self.others_file is not None:
+            return [self.others_file]
+
+        tracks = [
+            mapping.split(':')[-1]
+            for mapping in self.audio_info['-map'][1::2]
+        ]
+        opts = [
+            "--no-video",
+            "--no-subtitles",
+            "--no-attachments",
+            "--audio-tracks", ",".join(tracks),
+        ]
+        titles = self.audio_info['-title'][1::2]
+        languages = self.audio_info['-language'][1::2]
+        for track, title, language in zip(tracks, titles, languages):
+            opts.extend([
+                "--track-name", f"{track}:{title.split('=', 1)[-1]}",
+                "--language", f"{track}:{language.split('=', 1)[-1]}",
+            ])
+
+        return opts + [self.infile]
+
+    def _cut_script(self) -> str | None:
+        """Path to the concat script used to cut out commercials"""
+
+        if self.outfile is None:
+            return None
+        return f"{self.outfile}.cut.ffconcat"
+
     def _check_outfile_exists(self, outfile):
         """
         Check if output file exists
@@ -874,6 +1443,8 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         Keyword arguments:
             comdetect (bool): Set to remove/mark commercial segments in file
+            edl_file (str): Path to .edl file with commercial breaks that
+                were already found; comskip is not run if set
             **kwargs : All other ignored
 
         Returns:
@@ -892,11 +1463,21 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
                 if self.metadata.isEpisode else
                 str(self.metadata)
             )
+        edl_file = kwargs.get('edl_file', None)
+        # Subtitle streams are extracted from the uncut source; only SRT
+        # files from captions in MPEG-TS files can be cut to match
+        fused_cut = self.fused_cut and (
+            self.format == "MPEG-TS"
+            or not (self.subtitles or self.srt)
+        )
+        if not chapters and fused_cut:
+            return self._comsegments(name, edl_file)
+
         status = self.remove_commercials(
             self.infile,
             chapters=chapters,
-            name=name
-
+            name=name,
+            edl_file=edl_file,
         )
         # If string instance, then is path to chapter file
         if isinstance(status, str):
@@ -913,6 +1494,78 @@ class VideoConverter(ComRemove, MediaInfo, opensubtitles.OpenSubtitles):
 
         return True
 
+    def _comsegments(self, name: str, edl_file: str | None = None) -> bool:
+        """
+        Find show segments to keep during the transcode
+
+        The start of each segment is moved to the first keyframe at or after
+        it. The concat demuxer reads from the keyframe before its inpoint,
+        so otherwise frames of the commercial would be decoded, and the
+        audio, which is copied, would start early. Up to one GOP at the
+        start of each segment is dropped instead.
+
+        Arguments:
+            name (str): Name of series or movie for comskip.ini lookup
+
+        Keyword arguments:
+            edl_file (str): Path to .edl file with commercial breaks that
+                were already found; comskip is not run if set
+
+        Returns:
+            bool : True if commercial detection succeeded, False othewise
+
+        """
+
+        segments = self.comsegments(
+            self.infile,
+            name=name,
+            edl_file=edl_file,
+        )
+        if segments is None:
+            self.transcode_status = 5
+            if isRunning():
+                self.__log.error(
+                    "Error detecting commercials, assuming bad file...",
+                )
+                self._prog_file = self._clean_up(self._prog_file)
+            return False
+
+        segments = self._keyframe_segments(segments)
+        if segments != [(0.0, None)]:
+            self.__log.info(
+                "Dropping commercials during transcode; keeping %d segments",
+                len(segments),
+            )
+            self.cut_segments = segments
+        return True
+
+    def _keyframe_segments(
+        self,
+        segments: list[tuple[float, float | None]],
+    ) -> list[tuple[float, float | None]]:
+        """
+        Move start of segments to the next keyframe; see _comsegments()
+
+        Segments that contain no keyframe are dropped.
+
+        """
+
+        out = []
+        for start, end in segments:
+            if start > 0.0:
+                keyframe = get_keyframe_time(self.infile, start, after=True)
+                if keyframe is None:
+                    self.__log.warning(
+                        "Failed to find keyframe after %0.3f s; commercial "
+                        "frames may be kept",
+                        start,
+                    )
+                    keyframe = start
+                start = keyframe
+            if end is None or start < end:
+                out.append((start, end))
+        return out
+
     def _compression_ratio(self, outfile: str) -> None:
         """
         Calculate and log outfile compression ratio
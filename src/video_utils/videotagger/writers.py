@@ -12,6 +12,7 @@ from subprocess import run, STDOUT, DEVNULL
 from mutagen import mp4
 
 from ..utils.check_cli import check_cli
+from ..utils.timing import timed
 from .utils import download_cover
 from .tags import COMMON2MP4, COMMON2MKV
 
@@ -438,6 +439,7 @@ def mkv_tagger(fpath: str, metadata: dict) -> int:
     return 0
 
 
+@timed('tagging')
 def write_tags(fpath: str, metadata: dict, **kwargs) -> bool:
     """
     Wrapper for mp4_tagger and mkv_tagger
@@ -15,13 +15,14 @@ import argparse
 
 from threading import Thread
 
-from .. import __version__, log
+from .. import __version__, log, POPENPOOL
 from ..videoconverter import VideoConverter
 from ..plex.plex_media_scanner import plex_media_scanner
 from ..config import BASEPARSER, MakeMKVFMT, get_transcode_log, get_comskip_log
 from ..utils import isRunning
 from ..utils.handlers import send_email, init_log_file, EMailHandler
 from ..utils.pid_check import pid_running
+from ..utils.load_control import LoadController
 from .base import BaseWatchdog
 
 """
@@ -123,9 +124,11 @@ class MakeMKV_Watchdog(BaseWatchdog):
             self.log.exception('Failed to convert file')
             return
 
-        if isinstance(out_file, str) and isRunning():
+        # Library section is unknown without metadata, so cannot scan
+        metadata = self.converter.metadata
+        if isinstance(out_file, str) and metadata and isRunning():
             plex_media_scanner(
-                'TV Shows' if self.converter.metadata.isEpisode else 'Movies',
+                'TV Shows' if metadata.isEpisode else 'Movies',
                 path=os.path.dirname(out_file)
             )
 
@@ -197,6 +200,9 @@ def cli():
     if email:
         log.addHandler(email)
 
+    if args.adaptive:
+        LoadController(POPENPOOL).start()
+
     try:
         wd = MakeMKV_Watchdog(
             *args.indir,
@@ -204,6 +210,7 @@ def cli():
             outdir=args.outdir,
             threads=args.threads,
             cpulimit=args.cpulimit,
+            segments=args.segments,
             lang=args.lang,
             remove=not args.no_remove,
             srt=not args.no_srt,
@@ -21,20 +21,24 @@ from threading import Thread, Timer, Event, Lock
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-from .. import log
+from .. import log, POPENPOOL
 from ..config import (
     plex_dvr, BASEPARSER, plexFMT, get_transcode_log, get_comskip_log
 )
 
 from ..utils import isRunning  # _sigintEvent, _sigtermEvent
 from ..utils.pid_check import pid_running
+from ..utils.load_control import LoadController
 from ..utils.handlers import send_email, EMailHandler, init_log_file
+from ..live_comdetect import LiveComDetect
 from ..plex.dvr_converter import DVRconverter
 from ..plex.utils import DVRqueue, get_dvr_section_dir
 
 RECORDTIMEOUT = timedelta(days=1)
 TIMEOUT = 1.0
 SLEEP = 1.0
+# Seconds to wait for live commercial detection to finish the recording
+LIVE_TIMEOUT = 600.0
 
 """
 The following code 'attempts' to add what should be the
@@ -78,6 +82,15 @@ class PlexDVRWatchdog(FileSystemEventHandler):
         if not self.script:
             self.converter = DVRconverter(**kwargs)
 
+        # Live commercial detection only makes sense if commercial
+        # detection is enabled; detectors are keyed by recording path
+        self.live = (
+            kwargs.get('live', False)
+            and self.converter is not None
+            and self.converter.comdetect
+        )
+        self.detectors = {}
+
         self.__lock = Lock()
         self.__stop = Event()
 
@@ -122,6 +135,13 @@ class PlexDVRWatchdog(FileSystemEventHandler):
             self.recordings.append(
                 os.path.split(event.src_path) + (time.time(),),
             )
+            if self.live:
+                detector = LiveComDetect(
+                    event.src_path,
+                    comskip_log=self.converter.comskip_log,
+                )
+                detector.start()
+                self.detectors[event.src_path] = detector
         self.log.debug('A recording started : %s', event.src_path)
 
     def on_moved(self, event):
@@ -167,6 +187,11 @@ class PlexDVRWatchdog(FileSystemEventHandler):
                         src,
                         fpath,
                     )
+                    # Detector follows the recording to its new path
+                    detector = self.detectors.pop(src, None)
+                    if detector is not None:
+                        detector.fpath = fpath
+                        self.detectors[fpath] = detector
                     # Append to converting list; this will trigger
                     # update of queue file
                     self.converting.append(
@@ -182,6 +207,9 @@ class PlexDVRWatchdog(FileSystemEventHandler):
                         time_delta,
                         os.path.join(*self.recordings[i][:2]),
                     )
+                    self.__drop_detector(
+                        os.path.join(*self.recordings[i][:2]),
+                    )
                     self.recordings.pop(i)
                 else:
                     i += 1
@@ -275,6 +303,7 @@ class PlexDVRWatchdog(FileSystemEventHandler):
                         self.__pretty_time(self.record_timeout),
                         fpath,
                     )
+                    self.__drop_detector(fpath)
                     self.recordings.pop(i)
                     continue
 
@@ -291,6 +320,32 @@ class PlexDVRWatchdog(FileSystemEventHandler):
         )
         self.__purge_timer.start()
 
+    def __drop_detector(self, fpath):
+        """Stop live commercial detection for recording that failed"""
+
+        detector = self.detectors.pop(fpath, None)
+        if detector is not None:
+            detector.finish()
+
+    def _live_edl(self, fpath):
+        """
+        Get commercial breaks found while file was recording
+
+        Arguments:
+            fpath (str): Path of the finished recording
+
+        Returns:
+            str: Path to .edl file if live commercial detection covered the
+                whole recording, None otherwise
+
+        """
+
+        with self.__lock:
+            detector = self.detectors.pop(fpath, None)
+        if detector is None:
+            return None
+        return detector.result(timeout=LIVE_TIMEOUT)
+
     def _run_script(self, file):
         """Method to apply custom script to file"""
 
@@ -322,11 +377,21 @@ class PlexDVRWatchdog(FileSystemEventHandler):
             self._run_script(fpath)
             return
 
+        edl_file = self._live_edl(fpath)
         try:
-            _ = self.converter.convert(fpath, section=section)
+            _ = self.converter.convert(
+                fpath,
+                section=section,
+                edl_file=edl_file,
+            )
         except:
             self.log.exception('Failed to convert file')
 
+        # EDL file is removed once used, but may be left if the file
+        # could not be converted
+        if edl_file and os.path.isfile(edl_file):
+            os.remove(edl_file)
+
     def __run(self):
         """
         A thread to dequeue video file paths and convert them
@@ -408,6 +473,17 @@ def cli():
         ),
     )
 
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help=(
+            "Detect commercials while the file is still recording, so that "
+            "transcoding can start sooner once recording finishes. Uses "
+            "black frames and silence rather than comskip; requires "
+            "--comdetect"
+        ),
+    )
+
     args = parser.parse_args()
 
     if pid_running(plexFMT['pidFile']):
@@ -420,17 +496,22 @@ def cli():
     if email:
         log.addHandler(email)
 
+    if args.adaptive:
+        LoadController(POPENPOOL).start()
+
     try:
         wd = PlexDVRWatchdog(
             *args.dir,
             threads=args.threads,
             cpulimit=args.cpulimit,
+            segments=args.segments,
             script=args.script,
             lang=args.lang,
             transcode_log=get_transcode_log(parser.prog),
             comskip_log=get_comskip_log(parser.prog),
             comdetect=args.comdetect,
             destructive=args.destructive,
+            live=args.live,
             no_remove=args.no_remove,
             no_srt=args.no_srt,
         )